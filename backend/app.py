@@ -1,16 +1,39 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, stream_with_context, g
 from flask_cors import CORS
 from flask_restful import Api, Resource
 from dotenv import load_dotenv
 import openai
 import os
+import json
+import logging
 import sqlite3
+import time
+import uuid
 from datetime import datetime
+from contextlib import contextmanager
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
 from datetime import timedelta
-from sqlalchemy import func
+from sqlalchemy import func, event
+from question_pool import QuestionPool
+from worker_pool import WorkerPool
+from migrate import migrate
+from content_cache import ContentCache
+from sqlite_profile import sqlite_engine_options, install_sqlite_pragmas
+from mcq_validation import ValidationError, validate_mcq, mcq_content_hash
+from near_duplicates import NearDuplicateIndex, signature, mcq_text
+from pagination import wants_cursor, encode_cursor, decode_cursor, keyset_page
+from search import SORTS as SEARCH_SORTS, parse_after, search_mcqs, search_responses
+from llm_cache import LLMCache
+from token_revocation import RevocationStore
+from password_hashing import PasswordHasher, HashingBusyError
+from mcq_sampler import MCQSampleIndex
+from leaderboard import WINDOWS as LEADERBOARD_WINDOWS, Leaderboards, record_score_day, score_day
+from grading import GRADING_FORMAT, MAX_SCORE, SUB_SCORES, parse_grading, score_column
+from practice import DEFAULT_EASE, update_mastery, difficulty_order, schedule_review
+from llm_client import LLMClient, LLMUnavailableError, LLMBusyError, CircuitOpenError
+from structured_log import configure_logging, parse_sample_rates, RequestSampler, request_id
+from metrics import Registry, LLM_BUCKETS, clear_directory, start_timing, stop_timing, add_time, install_db_timing
 
 # Load environment variables
 load_dotenv()
@@ -18,20 +41,27 @@ load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 
-# Configure CORS
-CORS(app, resources={
-    r"/api/*": {
-        "origins": ["http://localhost:5174", "http://localhost:5173"],  # Add both Vite default ports
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Type", "Authorization"],
-        "supports_credentials": True
-    }
-})
+# Configure CORS (async_app.py applies the same settings to its own routes)
+CORS_SETTINGS = {
+    "origins": ["http://localhost:5174", "http://localhost:5173"],  # Add both Vite default ports
+    "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    "allow_headers": ["Content-Type", "Authorization"],
+    "expose_headers": ["Content-Type", "Authorization"],
+    "supports_credentials": True
+}
+CORS(app, resources={r"/api/*": CORS_SETTINGS})
 
 # Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///nexthire.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///nexthire.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# SQLite tuning; use SQLITE_PROFILE=production when running several workers
+# (see sqlite_profile.py for what each profile sets)
+app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'development')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['SQLITE_POOL_SIZE'] = int(os.environ.get('SQLITE_POOL_SIZE', 5))
+app.config['SQLITE_MAX_OVERFLOW'] = int(os.environ.get('SQLITE_MAX_OVERFLOW', 10))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options(app.config)
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'dev_jwt_secret_key_12345')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=1)
 app.config['JWT_TOKEN_LOCATION'] = ['headers']
@@ -39,13 +69,178 @@ app.config['JWT_HEADER_NAME'] = 'Authorization'
 app.config['JWT_HEADER_TYPE'] = 'Bearer'
 app.config['JWT_ERROR_MESSAGE_KEY'] = 'message'
 
+# Logout and password changes revoke tokens. Revocations are stored in the
+# database and mirrored in each worker's memory, which picks up other
+# workers' revocations every TOKEN_REVOCATION_REFRESH_SECONDS and purges
+# expired ones every TOKEN_REVOCATION_PURGE_SECONDS (see token_revocation.py)
+app.config['TOKEN_REVOCATION_REFRESH_SECONDS'] = float(os.environ.get('TOKEN_REVOCATION_REFRESH_SECONDS', 2))
+app.config['TOKEN_REVOCATION_PURGE_SECONDS'] = float(os.environ.get('TOKEN_REVOCATION_PURGE_SECONDS', 3600))
+app.config['TOKEN_REVOCATION_CAPACITY'] = int(os.environ.get('TOKEN_REVOCATION_CAPACITY', 10000))
+
+# Interview question pool: questions are pre-generated per role/difficulty and
+# refilled in the background once a pool drops below the low-water mark
+app.config['QUESTION_POOL_SIZE'] = int(os.environ.get('QUESTION_POOL_SIZE', 5))
+app.config['QUESTION_POOL_LOW_WATER'] = int(os.environ.get('QUESTION_POOL_LOW_WATER', 2))
+app.config['QUESTION_POOL_SYNC_FALLBACK'] = os.environ.get('QUESTION_POOL_SYNC_FALLBACK', 'true').lower() == 'true'
+# Roles questions can be asked for (the frontend's role ids, and the legacy
+# SDE default); anything else is a 400 rather than a new pool to fill
+app.config['QUESTION_ROLES'] = tuple(role.strip() for role in os.environ.get(
+    'QUESTION_ROLES', 'software-engineer,product-manager,data-scientist,ux-designer,SDE').split(',') if role.strip())
+
+# Answer evaluation runs asynchronously on a bounded worker pool
+app.config['EVALUATION_WORKERS'] = int(os.environ.get('EVALUATION_WORKERS', 4))
+app.config['EVALUATION_MAX_ATTEMPTS'] = int(os.environ.get('EVALUATION_MAX_ATTEMPTS', 3))
+app.config['EVALUATION_JOB_STALE_SECONDS'] = int(os.environ.get('EVALUATION_JOB_STALE_SECONDS', 300))
+app.config['EVALUATION_MAX_WAIT_SECONDS'] = 30
+
+# Largest quiz accepted by the batch MCQ check endpoint
+app.config['QUIZ_MAX_ANSWERS'] = int(os.environ.get('QUIZ_MAX_ANSWERS', 100))
+
+# Quizzes are drawn from an in-memory index of MCQ ids per role, topic and
+# difficulty; each worker picks up MCQs added by others within this many seconds
+app.config['MCQ_SAMPLE_REFRESH_SECONDS'] = float(os.environ.get('MCQ_SAMPLE_REFRESH_SECONDS', 5))
+
+# Leaderboards rank users by average evaluation score per role and window
+# once they have LEADERBOARD_MIN_RESPONSES scored responses in it. Each worker
+# folds in new responses every LEADERBOARD_REFRESH_SECONDS and rebuilds from
+# scratch every LEADERBOARD_REBUILD_SECONDS (see leaderboard.py)
+app.config['LEADERBOARD_MIN_RESPONSES'] = int(os.environ.get('LEADERBOARD_MIN_RESPONSES', 3))
+app.config['LEADERBOARD_REFRESH_SECONDS'] = float(os.environ.get('LEADERBOARD_REFRESH_SECONDS', 60))
+app.config['LEADERBOARD_REBUILD_SECONDS'] = float(os.environ.get('LEADERBOARD_REBUILD_SECONDS', 3600))
+
+# Adaptive practice: a topic's mastery is a weighted average of the user's
+# answers with this weight on the newest one (see practice.py)
+app.config['PRACTICE_MASTERY_WEIGHT'] = float(os.environ.get('PRACTICE_MASTERY_WEIGHT', 0.3))
+
+# MCQ generation asks for several questions per completion and stores them all
+app.config['MCQ_GENERATION_BATCH_SIZE'] = int(os.environ.get('MCQ_GENERATION_BATCH_SIZE', 5))
+app.config['MCQ_GENERATION_MAX_COUNT'] = int(os.environ.get('MCQ_GENERATION_MAX_COUNT', 10))
+app.config['MCQ_GENERATION_RETRIES'] = int(os.environ.get('MCQ_GENERATION_RETRIES', 1))
+
+# New MCQs that paraphrase an existing question of the same role are rejected,
+# stored with near_duplicate_of set ('flag'), or let through ('off')
+app.config['NEAR_DUPLICATE_ACTION'] = os.environ.get('NEAR_DUPLICATE_ACTION', 'reject')
+app.config['NEAR_DUPLICATE_THRESHOLD'] = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.85))
+
+# In-process cache for roadmap/topic responses. The TTL bounds staleness after
+# writes made by other processes; max-age is what clients are told to cache for
+app.config['CONTENT_CACHE_TTL'] = int(os.environ.get('CONTENT_CACHE_TTL', 60))
+app.config['CONTENT_CACHE_MAX_AGE'] = int(os.environ.get('CONTENT_CACHE_MAX_AGE', 60))
+
+# Password hashes are computed on a pool of PASSWORD_HASH_WORKERS processes
+# per server worker (0 hashes in the request thread), with at most
+# PASSWORD_HASH_MAX_QUEUE more waiting; beyond that sign-in routes answer 503.
+# Stored hashes made with other parameters than PASSWORD_HASH_METHOD (a
+# werkzeug method, e.g. "pbkdf2:sha256:600000" or "scrypt:32768:8:1") are
+# re-hashed on the user's next successful login (see password_hashing.py)
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_MAX_QUEUE'] = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+# All OpenAI calls share one client (see llm_client.py): pooled connections,
+# a cap on concurrent calls, retries with backoff and a circuit breaker
+app.config['LLM_MAX_CONCURRENCY'] = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+app.config['LLM_TIMEOUT'] = float(os.environ.get('LLM_TIMEOUT', 30))
+app.config['LLM_MAX_RETRIES'] = int(os.environ.get('LLM_MAX_RETRIES', 3))
+app.config['LLM_BACKOFF_BASE'] = float(os.environ.get('LLM_BACKOFF_BASE', 0.5))
+app.config['LLM_BACKOFF_MAX'] = float(os.environ.get('LLM_BACKOFF_MAX', 8))
+app.config['LLM_ACQUIRE_TIMEOUT'] = float(os.environ.get('LLM_ACQUIRE_TIMEOUT', 10))
+app.config['LLM_BREAKER_THRESHOLD'] = int(os.environ.get('LLM_BREAKER_THRESHOLD', 5))
+app.config['LLM_BREAKER_RESET_SECONDS'] = float(os.environ.get('LLM_BREAKER_RESET_SECONDS', 30))
+
+# async_app.py serves the LLM-bound routes as coroutines, with up to
+# ASYNC_LLM_MAX_CONCURRENCY upstream calls and ASYNC_EVALUATION_CONCURRENCY
+# evaluation jobs in flight per process. Database and other blocking work,
+# and every other route (through this Flask app), run on a pool of
+# ASYNC_EXECUTOR_WORKERS threads; keep it within the SQLite connection pool
+app.config['ASYNC_LLM_MAX_CONCURRENCY'] = int(os.environ.get('ASYNC_LLM_MAX_CONCURRENCY', 256))
+app.config['ASYNC_EVALUATION_CONCURRENCY'] = int(os.environ.get('ASYNC_EVALUATION_CONCURRENCY', 64))
+app.config['ASYNC_EXECUTOR_WORKERS'] = int(os.environ.get('ASYNC_EXECUTOR_WORKERS', 12))
+
+# Completions are cached on disk by prompt (see llm_cache.py). Question and MCQ
+# generation rely on sampling to produce something new each call, so they
+# bypass the cache unless removed from LLM_CACHE_DISABLED_ENDPOINTS
+app.config['LLM_CACHE_ENABLED'] = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+app.config['LLM_CACHE_PATH'] = os.environ.get('LLM_CACHE_PATH', os.path.join(app.instance_path, 'llm_cache.db'))
+app.config['LLM_CACHE_MAX_ENTRIES'] = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 10000))
+app.config['LLM_CACHE_TTL'] = int(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600))
+app.config['LLM_CACHE_DISABLED_ENDPOINTS'] = [
+    endpoint.strip() for endpoint in
+    os.environ.get('LLM_CACHE_DISABLED_ENDPOINTS', 'questions,mcq_generation').split(',') if endpoint.strip()
+]
+
+# Request metrics are served at /api/metrics. Each worker process writes a
+# snapshot to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds, and the
+# endpoint sums them (see metrics.py)
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR', os.path.join(app.instance_path, 'metrics'))
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+# Logs are JSON lines written by a background thread (see structured_log.py).
+# Successful requests get an access log line at LOG_SAMPLE_RATE, overridden
+# per route by LOG_SAMPLE_RATES ("/api/health=0,/api/mcq/<role>=0.1"); errors
+# and requests slower than LOG_SLOW_REQUEST_MS are always logged
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO').upper()
+app.config['LOG_QUEUE_SIZE'] = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+app.config['LOG_SAMPLE_RATE'] = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+app.config['LOG_SAMPLE_RATES'] = parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', '/api/health=0,/api/metrics=0'))
+app.config['LOG_SLOW_REQUEST_MS'] = float(os.environ.get('LOG_SLOW_REQUEST_MS', 1000))
+
+configure_logging(app.config['LOG_LEVEL'], app.config['LOG_QUEUE_SIZE'])
+logger = logging.getLogger('nexthire')
+access_log = logging.getLogger('nexthire.access')
+access_sampler = RequestSampler(
+    app.config['LOG_SAMPLE_RATE'],
+    app.config['LOG_SAMPLE_RATES'],
+    app.config['LOG_SLOW_REQUEST_MS']
+)
+
 # Initialize extensions
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
 
+metrics = Registry(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+REQUEST_DURATION = metrics.histogram(
+    'http_request_duration_seconds', 'Time from receiving a request to the end of its response body',
+    ('method', 'route', 'status'))
+REQUESTS_IN_FLIGHT = metrics.gauge('http_requests_in_flight', 'Requests being served', ('route',))
+REQUEST_DB_TIME = metrics.histogram(
+    'http_request_db_seconds', 'Time a request spent executing database statements', ('route',))
+REQUEST_LLM_TIME = metrics.histogram(
+    'http_request_llm_seconds', 'Time a request spent waiting on the LLM, for requests that called it',
+    ('route',), buckets=LLM_BUCKETS)
+LLM_CALLS = metrics.counter(
+    'llm_requests_total', 'Completions requested from the LLM API (cache misses)', ('endpoint', 'outcome'))
+LLM_DURATION = metrics.histogram(
+    'llm_request_duration_seconds', 'Time to a full completion from the LLM API, retries included',
+    ('endpoint',), buckets=LLM_BUCKETS)
+LLM_TOKENS = metrics.counter('llm_tokens_total', 'Tokens used by LLM completions', ('endpoint', 'type'))
+
+with app.app_context():
+    install_sqlite_pragmas(db.engine, app.config)
+    install_db_timing(db.engine)
+    token_revocations = RevocationStore(
+        db.engine.begin,
+        refresh_interval=app.config['TOKEN_REVOCATION_REFRESH_SECONDS'],
+        purge_interval=app.config['TOKEN_REVOCATION_PURGE_SECONDS'],
+        capacity=app.config['TOKEN_REVOCATION_CAPACITY']
+    )
+    mcq_sample_index = MCQSampleIndex(db.engine.begin, refresh_interval=app.config['MCQ_SAMPLE_REFRESH_SECONDS'])
+    leaderboards = Leaderboards(
+        db.engine.begin,
+        min_responses=app.config['LEADERBOARD_MIN_RESPONSES'],
+        refresh_interval=app.config['LEADERBOARD_REFRESH_SECONDS'],
+        rebuild_interval=app.config['LEADERBOARD_REBUILD_SECONDS']
+    )
+
 # Add Response model
 class Response(db.Model):
     __tablename__ = 'responses'
+    __table_args__ = (
+        db.Index('ix_responses_user_created', 'user_id', 'created_at'),
+        db.Index('ix_responses_user_role_created', 'user_id', 'role', 'created_at'),
+        db.Index('ix_responses_role_score', 'role', 'score'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     question = db.Column(db.Text, nullable=False)
     answer = db.Column(db.Text, nullable=False)
@@ -53,10 +248,21 @@ class Response(db.Model):
     role = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    # Scores out of 10 parsed from the grader's reply (see grading.py); NULL when it gave none
+    score = db.Column(db.Float, nullable=True)
+    correctness_score = db.Column(db.Float, nullable=True)
+    completeness_score = db.Column(db.Float, nullable=True)
+    communication_score = db.Column(db.Float, nullable=True)
+
+def serialize_scores(response):
+    return {name: getattr(response, score_column(name)) for name in ('score',) + SUB_SCORES}
 
 # Add Roadmap model
 class Roadmap(db.Model):
     __tablename__ = 'roadmaps'
+    __table_args__ = (
+        db.Index('ix_roadmaps_role', 'role'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     role = db.Column(db.String(50), nullable=False)
     title = db.Column(db.String(200), nullable=False)
@@ -66,8 +272,16 @@ class Roadmap(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 # Add MCQ model
+def default_mcq_content_hash(context):
+    params = context.get_current_parameters()
+    return mcq_content_hash(params['role'], params['question'], params['options'])
+
 class MCQ(db.Model):
     __tablename__ = 'mcqs'
+    __table_args__ = (
+        db.Index('ix_mcqs_role_topic_difficulty', 'role', 'topic', 'difficulty'),
+        db.Index('ix_mcqs_content_hash', 'content_hash', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     role = db.Column(db.String(50), nullable=False)
     question = db.Column(db.Text, nullable=False)
@@ -77,6 +291,8 @@ class MCQ(db.Model):
     difficulty = db.Column(db.String(20), nullable=False)  # easy, medium, hard
     topic = db.Column(db.String(100), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    content_hash = db.Column(db.String(64), nullable=True, default=default_mcq_content_hash)
+    near_duplicate_of = db.Column(db.Integer, db.ForeignKey('mcqs.id'), nullable=True)
 
 # Update User model to include responses relationship
 class User(db.Model):
@@ -88,6 +304,135 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     responses = db.relationship('Response', backref='user', lazy=True)
 
+# A graded batch of MCQ answers submitted together
+class QuizSubmission(db.Model):
+    __tablename__ = 'quiz_submissions'
+    __table_args__ = (
+        db.Index('ix_quiz_submissions_user_created', 'user_id', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    total = db.Column(db.Integer, nullable=False)
+    correct = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class MCQAttempt(db.Model):
+    __tablename__ = 'mcq_attempts'
+    __table_args__ = (
+        db.Index('ix_mcq_attempts_user_created', 'user_id', 'created_at'),
+        db.Index('ix_mcq_attempts_submission', 'submission_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    mcq_id = db.Column(db.Integer, db.ForeignKey('mcqs.id'), nullable=False)
+    submission_id = db.Column(db.Integer, db.ForeignKey('quiz_submissions.id'), nullable=True)
+    answer = db.Column(db.String(1), nullable=False)
+    is_correct = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Adaptive practice state (see practice.py), updated in the transaction that
+# records each answer (see record_mcq_answers) and rebuilt by rebuild_practice.py
+class TopicMastery(db.Model):
+    __tablename__ = 'topic_mastery'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    role = db.Column(db.String(50), primary_key=True)
+    topic = db.Column(db.String(100), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    mastery = db.Column(db.Float, nullable=False, default=0.0)
+    new_cursors = db.Column(db.JSON, nullable=False, default=dict)  # {difficulty: MCQ id answered up to}
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class MCQReview(db.Model):
+    __tablename__ = 'mcq_reviews'
+    __table_args__ = (
+        db.Index('ix_mcq_reviews_user_role_due', 'user_id', 'role', 'due_at'),
+        db.Index('ix_mcq_reviews_user_role_topic_due', 'user_id', 'role', 'topic', 'due_at'),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    mcq_id = db.Column(db.Integer, db.ForeignKey('mcqs.id'), primary_key=True)
+    role = db.Column(db.String(50), nullable=False)
+    topic = db.Column(db.String(100), nullable=False)
+    repetitions = db.Column(db.Integer, nullable=False, default=0)
+    interval_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    ease = db.Column(db.Float, nullable=False, default=DEFAULT_EASE)
+    lapses = db.Column(db.Integer, nullable=False, default=0)
+    due_at = db.Column(db.DateTime, nullable=False)
+    last_reviewed_at = db.Column(db.DateTime, nullable=False)
+
+# Per-user dashboard rollup, updated in the same transaction that inserts a
+# Response (see record_response_stats), filled for existing history by migration
+# 0012 and rebuilt on demand by rebuild_user_stats.py
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_responses = db.Column(db.Integer, nullable=False, default=0)
+    role_counts = db.Column(db.JSON, nullable=False, default=dict)  # {role: count}
+    last_practice_at = db.Column(db.DateTime, nullable=True)
+    recent_activity = db.Column(db.JSON, nullable=False, default=list)  # Newest first, at most RECENT_ACTIVITY_SIZE
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    scored_responses = db.Column(db.Integer, nullable=False, default=0)
+    score_total = db.Column(db.Float, nullable=False, default=0.0)  # sum of the scored responses' scores
+
+RECENT_ACTIVITY_SIZE = 5
+
+def recent_activity_entry(response):
+    return {
+        'id': response.id,
+        'question': response.question,
+        'role': response.role,
+        'created_at': response.created_at.isoformat()
+    }
+
+def record_response_stats(response):
+    """Fold a newly flushed Response into its user's stats row.
+
+    Must run inside the transaction that inserts the response. The insert
+    already holds SQLite's write lock, so this read-modify-write can't race.
+    """
+    if response.user_id is None:
+        return
+    stats = db.session.get(UserStats, response.user_id)
+    if stats is None:
+        stats = UserStats(user_id=response.user_id, total_responses=0, role_counts={}, recent_activity=[],
+                          scored_responses=0, score_total=0.0)
+        db.session.add(stats)
+
+    role_counts = dict(stats.role_counts)
+    role_counts[response.role] = role_counts.get(response.role, 0) + 1
+
+    # JSON columns are replaced rather than mutated in place so the change is detected
+    stats.total_responses += 1
+    stats.role_counts = role_counts
+    if response.score is not None:
+        stats.scored_responses += 1
+        stats.score_total += response.score
+    stats.recent_activity = ([recent_activity_entry(response)] + stats.recent_activity)[:RECENT_ACTIVITY_SIZE]
+    if stats.last_practice_at is None or response.created_at > stats.last_practice_at:
+        stats.last_practice_at = response.created_at
+    stats.updated_at = datetime.utcnow()
+
+# Queued answer evaluations; rows survive restarts and are drained by the
+# evaluation worker pool
+class EvaluationJob(db.Model):
+    __tablename__ = 'evaluation_jobs'
+    __table_args__ = (
+        db.Index('ix_evaluation_jobs_status_created', 'status', 'created_at'),
+    )
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    question = db.Column(db.Text, nullable=False)
+    answer = db.Column(db.Text, nullable=False)
+    role = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    feedback = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    response_id = db.Column(db.Integer, db.ForeignKey('responses.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)  # when the current worker claimed it
+
 # Configure OpenAI
 openai.api_key = os.getenv('OPENAI_API_KEY')
 
@@ -99,102 +444,523 @@ def get_db():
 
 def init_db():
     with app.app_context():
-        # This will create all tables
-        db.create_all()
-        print("Database tables created successfully!")
+        # Schema changes ship as versioned migrations (see migrate.py)
+        migrate(db.engine)
+        logger.info("Database schema is up to date")
+        # MCQs stored before content hashes or the near-duplicate index
+        # existed, or inserted without the index (seed_data.py), would go
+        # unseen by the duplicate checks of /api/mcq/generate. The hash
+        # needs Python, so it can't be filled by migration 0003 itself.
+        hashed = backfill_content_hashes()
+        if hashed:
+            logger.info("Backfilled content hashes for %d existing MCQs", hashed)
+        indexed = index_unindexed_mcqs()
+        if indexed:
+            logger.info("Added %d existing MCQs to the near-duplicate index", indexed)
+
+llm_cache = LLMCache(
+    app.config['LLM_CACHE_PATH'],
+    max_entries=app.config['LLM_CACHE_MAX_ENTRIES'],
+    ttl=app.config['LLM_CACHE_TTL'],
+    disabled_endpoints=app.config['LLM_CACHE_DISABLED_ENDPOINTS'],
+    enabled=app.config['LLM_CACHE_ENABLED']
+)
+
+password_hasher = PasswordHasher(
+    method=app.config['PASSWORD_HASH_METHOD'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_queue=app.config['PASSWORD_HASH_MAX_QUEUE'],
+    timeout=app.config['PASSWORD_HASH_TIMEOUT']
+)
+
+def hashing_busy_response(e):
+    logger.warning("Password hashing busy: %s", e)
+    response = jsonify({'message': 'Too many sign-in requests right now, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+llm_client = LLMClient(
+    max_concurrency=app.config['LLM_MAX_CONCURRENCY'],
+    timeout=app.config['LLM_TIMEOUT'],
+    max_retries=app.config['LLM_MAX_RETRIES'],
+    backoff_base=app.config['LLM_BACKOFF_BASE'],
+    backoff_max=app.config['LLM_BACKOFF_MAX'],
+    acquire_timeout=app.config['LLM_ACQUIRE_TIMEOUT'],
+    breaker_threshold=app.config['LLM_BREAKER_THRESHOLD'],
+    breaker_reset=app.config['LLM_BREAKER_RESET_SECONDS']
+)
+
+@contextmanager
+def observe_llm_call(endpoint):
+    """Record an upstream completion's outcome and duration, also as LLM time of the current request."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    except LLMUnavailableError:
+        outcome = 'unavailable'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        add_time('llm', elapsed)
+        LLM_CALLS.inc((endpoint, outcome))
+        LLM_DURATION.observe((endpoint,), elapsed)
+
+def chat_completion(endpoint, messages, model="gpt-3.5-turbo"):
+    """Text of a chat completion, served from the LLM cache when the prompt was seen before."""
+    def create():
+        with observe_llm_call(endpoint):
+            response = llm_client.complete(model, messages)
+        usage = response.get('usage') or {}
+        LLM_TOKENS.inc((endpoint, 'prompt'), usage.get('prompt_tokens', 0))
+        LLM_TOKENS.inc((endpoint, 'completion'), usage.get('completion_tokens', 0))
+        return response.choices[0].message.content
+    return llm_cache.completion(endpoint, model, messages, create)
+
+def stream_chat_completion(endpoint, messages, model="gpt-3.5-turbo"):
+    """Yield a chat completion's text as the model produces it; cached like chat_completion."""
+    def create_stream():
+        # Streamed responses carry no usage; each chunk is one completion token
+        chunks = 0
+        with observe_llm_call(endpoint):
+            for content in llm_client.stream(model, messages):
+                chunks += 1
+                yield content
+        LLM_TOKENS.inc((endpoint, 'completion'), chunks)
+    return llm_cache.stream_completion(endpoint, model, messages, create_stream)
+
+def question_messages(role, difficulty):
+    return [{
+        "role": "system",
+        "content": "You are an expert technical interviewer. Generate a challenging interview question."
+    }, {
+        "role": "user",
+        "content": f"Generate a {difficulty}-level interview question for a {role} role."
+    }]
+
+def generate_question(role, difficulty='medium'):
+    return chat_completion('questions', question_messages(role, difficulty))
+
+question_pool = QuestionPool(
+    generate_question,
+    target_size=app.config['QUESTION_POOL_SIZE'],
+    low_water=app.config['QUESTION_POOL_LOW_WATER']
+)
+
+def question_params(args):
+    """(role, difficulty) of a question request; raises ValueError with the message for a 400."""
+    role = args.get('role', 'SDE')  # Default to SDE if no role specified
+    difficulty = args.get('difficulty', 'medium')
+    if role not in app.config['QUESTION_ROLES']:
+        raise ValueError('Unknown role')
+    if difficulty not in ('easy', 'medium', 'hard'):
+        raise ValueError('Invalid difficulty')
+    return role, difficulty
 
 # API Resources
 class QuestionResource(Resource):
     def get(self):
-        role = request.args.get('role', 'SDE')  # Default to SDE if no role specified
+        try:
+            role, difficulty = question_params(request.args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
         try:
             if not openai.api_key:
-                print("OpenAI API key is not configured")
+                logger.error("OpenAI API key is not configured")
                 return {"error": "OpenAI API key is not configured"}, 500
 
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "system",
-                    "content": "You are an expert technical interviewer. Generate a challenging interview question."
-                }, {
-                    "role": "user",
-                    "content": f"Generate a medium-level interview question for a {role} role."
-                }]
-            )
-            question = response.choices[0].message.content
-            return {"question": question, "role": role}
+            question = question_pool.get(role, difficulty)
+            if question is None:
+                if not app.config['QUESTION_POOL_SYNC_FALLBACK']:
+                    return {"error": "No questions ready yet, please retry shortly"}, 503
+                question = generate_question(role, difficulty)
+            return {"question": question, "role": role, "difficulty": difficulty}
+        except LLMUnavailableError as e:
+            logger.warning("Question generation unavailable: %s", e)
+            return {"error": "Question generation is temporarily unavailable, please retry shortly"}, 503
         except Exception as e:
             error_message = str(e)
-            print(f"Error generating question: {error_message}")
+            logger.exception("Error generating question")
             if "api_key" in error_message.lower():
                 return {"error": "OpenAI API key is invalid or not configured properly"}, 500
             return {"error": f"Failed to generate question: {error_message}"}, 500
 
+class QuestionPoolStatsResource(Resource):
+    def get(self):
+        return question_pool.stats()
+
+class LLMCacheStatsResource(Resource):
+    def get(self):
+        return llm_cache.stats()
+
+class LLMClientStatsResource(Resource):
+    def get(self):
+        return llm_client.stats()
+
+def evaluation_messages(question, answer, role):
+    return [{
+        "role": "system",
+        "content": "You are an expert interviewer. Evaluate the candidate's answer."
+    }, {
+        "role": "user",
+        "content": f"Question: {question}\nAnswer: {answer}\nRole: {role}\n\nProvide feedback, then end with "
+                   f"one line of JSON scoring the answer out of 10 overall and for {', '.join(SUB_SCORES)}, "
+                   f"like: {GRADING_FORMAT}"
+    }]
+
+def grade_answer(question, answer, role):
+    return chat_completion('evaluate', evaluation_messages(question, answer, role))
+
+def store_evaluated_response(question, answer, role, user_id, reply):
+    """Add the Response row and its user_stats update to the session, without committing.
+
+    The stored feedback and scores are parsed from the grader's `reply`.
+    """
+    feedback, scores = parse_grading(reply)
+    new_response = Response(
+        question=question,
+        answer=answer,
+        feedback=feedback,
+        role=role,
+        user_id=user_id,
+        **{score_column(name): value for name, value in scores.items()}
+    )
+    db.session.add(new_response)
+    db.session.flush()
+    record_response_stats(new_response)
+    if user_id is not None and new_response.score is not None:
+        record_score_day(db.session, user_id, role, score_day(new_response.created_at), 1, new_response.score)
+    return new_response
+
+def claim_evaluation_job():
+    """Atomically move the oldest claimable job to 'running' and return it."""
+    stale_before = datetime.utcnow() - timedelta(seconds=app.config['EVALUATION_JOB_STALE_SECONDS'])
+    # Jobs left 'running' by a worker that died (e.g. a restart) become claimable again
+    claimable = db.or_(
+        EvaluationJob.status == 'queued',
+        db.and_(EvaluationJob.status == 'running', EvaluationJob.updated_at < stale_before)
+    )
+    while True:
+        # Two index-ordered lookups rather than one OR query, which would need a sort
+        job = EvaluationJob.query.filter_by(status='queued').order_by(EvaluationJob.created_at).first() or \
+            EvaluationJob.query.filter(EvaluationJob.status == 'running', EvaluationJob.updated_at < stale_before)\
+            .order_by(EvaluationJob.created_at).first()
+        if not job:
+            return None
+        now = datetime.utcnow()
+        claimed = EvaluationJob.query.filter(EvaluationJob.id == job.id, claimable).update({
+            'status': 'running',
+            'attempts': EvaluationJob.attempts + 1,
+            'updated_at': now,
+            'claimed_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            db.session.refresh(job)
+            return job
+        # Another worker claimed it first; try the next one
+
+def run_next_evaluation_job():
+    with app.app_context():
+        job = claim_evaluation_job()
+        if not job:
+            return False
+
+        claimed_at = job.claimed_at
+        try:
+            feedback = grade_answer(job.question, job.answer, job.role)
+            complete_evaluation_job(job, claimed_at, feedback)
+        except Exception as e:
+            return evaluation_failed(job, claimed_at, e)
+        finally:
+            evaluation_workers.job_finished()
+        return True
+
+def update_claimed_job(job_id, claimed_at, values):
+    """Apply `values` to the job only while it is still under the claim made at `claimed_at`.
+
+    A job left running past EVALUATION_JOB_STALE_SECONDS is claimed again by
+    another worker; the earlier, slow worker must not finish or requeue it
+    after that. Returns whether the job was updated.
+    """
+    return EvaluationJob.query.filter_by(id=job_id, status='running', claimed_at=claimed_at)\
+        .update(values, synchronize_session=False) > 0
+
+def complete_evaluation_job(job, claimed_at, feedback):
+    """Store the response and finish the job in a single transaction; returns False if the claim was lost."""
+    # The update comes first: it takes SQLite's write lock, so the claim
+    # can't change before the response is stored
+    if not update_claimed_job(job.id, claimed_at, {
+        'status': 'done',
+        'feedback': feedback,
+        'error': None,
+        'updated_at': datetime.utcnow()
+    }):
+        db.session.rollback()
+        logger.warning("Dropping the grade of a job claimed again", extra={'job_id': job.id})
+        return False
+    new_response = store_evaluated_response(job.question, job.answer, job.role, job.user_id, feedback)
+    EvaluationJob.query.filter_by(id=job.id).update({'response_id': new_response.id}, synchronize_session=False)
+    db.session.commit()
+    return True
+
+def evaluation_failed(job, claimed_at, error):
+    """Requeue or fail `job` after `error`; returns False when the caller should back off before the next job."""
+    db.session.rollback()
+    values = {'error': str(error), 'updated_at': datetime.utcnow()}
+    if isinstance(error, (CircuitOpenError, LLMBusyError)):
+        # The call never reached the upstream: requeue the job without
+        # using up an attempt, and let this worker back off a poll interval
+        update_claimed_job(job.id, claimed_at, dict(values, status='queued', attempts=EvaluationJob.attempts - 1))
+        db.session.commit()
+        return False
+    logger.error("Error evaluating job", exc_info=error, extra={'job_id': job.id, 'attempts': job.attempts})
+    status = 'failed' if job.attempts >= app.config['EVALUATION_MAX_ATTEMPTS'] else 'queued'
+    update_claimed_job(job.id, claimed_at, dict(values, status=status))
+    db.session.commit()
+    return True
+
+evaluation_workers = WorkerPool(
+    run_next_evaluation_job,
+    num_workers=app.config['EVALUATION_WORKERS'],
+    name='evaluation'
+)
+
+def serialize_evaluation_job(job):
+    data = {
+        'job_id': job.id,
+        'status': job.status,
+        'created_at': job.created_at.isoformat()
+    }
+    if job.status == 'done':
+        # The job keeps the grader's whole reply; the response row has it split
+        data['feedback'], data['scores'] = parse_grading(job.feedback)
+        data['response_id'] = job.response_id
+    elif job.status == 'failed':
+        data['error'] = job.error
+    return data
+
+def enqueue_evaluation_job(user_id, question, answer, role):
+    job = EvaluationJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        question=question,
+        answer=answer,
+        role=role
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
 class EvaluateResource(Resource):
     @jwt_required()
     def post(self):
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         data = request.get_json()
         question = data.get('question')
         answer = data.get('answer')
         role = data.get('role', 'SDE')
 
+        if not question or not answer:
+            return {"error": "Missing question or answer"}, 400
+
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "system",
-                    "content": "You are an expert interviewer. Evaluate the candidate's answer."
-                }, {
-                    "role": "user",
-                    "content": f"Question: {question}\nAnswer: {answer}\nRole: {role}\n\nProvide feedback and a score out of 10."
-                }]
-            )
-            feedback = response.choices[0].message.content
-            
-            # Create new response in database
-            new_response = Response(
-                question=question,
-                answer=answer,
-                feedback=feedback,
-                role=role,
-                user_id=user_id
-            )
-            db.session.add(new_response)
-            db.session.commit()
-            
-            return {"feedback": feedback}
+            job = enqueue_evaluation_job(user_id, question, answer, role)
+            evaluation_workers.notify()
+
+            return serialize_evaluation_job(job), 202, {'Location': f'/api/evaluate/{job.id}'}
         except Exception as e:
             db.session.rollback()
             return {"error": str(e)}, 500
 
+class EvaluationJobResource(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        user_id = int(get_jwt_identity())
+        # Long-poll: ?wait=<seconds> holds the request until the job finishes
+        wait = min(max(request.args.get('wait', 0, type=float), 0), app.config['EVALUATION_MAX_WAIT_SECONDS'])
+        deadline = time.monotonic() + wait
+
+        while True:
+            job = EvaluationJob.query.filter_by(id=job_id, user_id=user_id).first()
+            if not job:
+                return {"error": "Evaluation job not found"}, 404
+            remaining = deadline - time.monotonic()
+            if job.status in ('done', 'failed') or remaining <= 0:
+                return serialize_evaluation_job(job)
+            # End the read transaction so the next poll sees the worker's commit
+            db.session.rollback()
+            evaluation_workers.wait_for_finish(min(remaining, 1.0))
+
 # Register resources
 api = Api(app)
 api.add_resource(QuestionResource, '/api/questions')
+api.add_resource(QuestionPoolStatsResource, '/api/questions/pool')
+api.add_resource(LLMCacheStatsResource, '/api/llm/cache')
+api.add_resource(LLMClientStatsResource, '/api/llm/client')
 api.add_resource(EvaluateResource, '/api/evaluate')
+api.add_resource(EvaluationJobResource, '/api/evaluate/<string:job_id>')
+
+# Streaming variants: the completion is relayed as Server-Sent Events while
+# the model produces it, so users wait for the first token, not the last
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return app.response_class(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        # Proxies (e.g. nginx) must pass events through as they are written
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/questions/stream', methods=['GET'])
+def stream_question():
+    try:
+        role, difficulty = question_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not openai.api_key:
+        logger.error("OpenAI API key is not configured")
+        return jsonify({"error": "OpenAI API key is not configured"}), 500
+
+    def events():
+        try:
+            question = question_pool.get(role, difficulty)
+            if question is not None:
+                yield sse_event('token', {'content': question})
+            else:
+                parts = []
+                for content in stream_chat_completion('questions', question_messages(role, difficulty)):
+                    parts.append(content)
+                    yield sse_event('token', {'content': content})
+                question = ''.join(parts)
+            yield sse_event('done', {"question": question, "role": role, "difficulty": difficulty})
+        except Exception as e:
+            logger.exception("Error streaming question")
+            yield sse_event('error', {"error": f"Failed to generate question: {str(e)}"})
+
+    return sse_response(events())
+
+@app.route('/api/evaluate/stream', methods=['POST'])
+@jwt_required()
+def stream_evaluation():
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+    question = data.get('question')
+    answer = data.get('answer')
+    role = data.get('role', 'SDE')
+
+    if not question or not answer:
+        return jsonify({"error": "Missing question or answer"}), 400
+
+    def events():
+        parts = []
+        try:
+            for content in stream_chat_completion('evaluate', evaluation_messages(question, answer, role)):
+                parts.append(content)
+                yield sse_event('token', {'content': content})
+            # Persisted only once the stream has finished; a client that
+            # disconnects midway stops the generator before this point
+            new_response = store_evaluated_response(question, answer, role, user_id, ''.join(parts))
+            db.session.commit()
+            yield sse_event('done', {'feedback': new_response.feedback, 'scores': serialize_scores(new_response),
+                                     'response_id': new_response.id})
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error streaming evaluation")
+            yield sse_event('error', {"error": str(e)})
+
+    return sse_response(events())
+
+# Near-static content (roadmaps, MCQ topic lists) is served from pre-serialized
+# bytes with a strong ETag; the cache is invalidated when the rows change
+content_cache = ContentCache(ttl=app.config['CONTENT_CACHE_TTL'])
+
+CACHED_MODELS = {Roadmap: 'roadmap', MCQ: 'mcq'}
+
+@event.listens_for(db.session, 'after_flush')
+def track_cached_model_changes(session, flush_context):
+    changed = session.info.setdefault('changed_cache_namespaces', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        namespace = CACHED_MODELS.get(type(obj))
+        if namespace:
+            changed.add(namespace)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_content_cache(session):
+    # Bump after commit so a concurrent reader can't cache pre-commit rows under the new version
+    for namespace in session.info.pop('changed_cache_namespaces', ()):
+        content_cache.bump(namespace)
+        if namespace == 'mcq':
+            mcq_sample_index.invalidate()
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_cached_model_changes(session):
+    session.info.pop('changed_cache_namespaces', None)
+
+def cached_json_entry(namespace, key, build):
+    """The content cache entry for `key`, filled from `build()` (returning (data, status)) on a miss."""
+    entry = content_cache.get(namespace, key)
+    if entry is None:
+        version = content_cache.version(namespace)
+        data, status = build()
+        body = json.dumps(data, sort_keys=True, separators=(',', ':')).encode()
+        entry = content_cache.put(namespace, key, body, status, version)
+    return entry
+
+def cached_json_response(namespace, key, build):
+    """Serve `build()` (returning (data, status)) from the content cache.
+
+    A matching If-None-Match is answered with 304 straight from memory.
+    """
+    entry = cached_json_entry(namespace, key, build)
+
+    if entry.status != 200:
+        return app.response_class(entry.body, status=entry.status, mimetype='application/json')
+
+    headers = {
+        'ETag': f'"{entry.etag}"',
+        'Cache-Control': f"public, max-age={app.config['CONTENT_CACHE_MAX_AGE']}"
+    }
+    if request.if_none_match.contains_weak(entry.etag):
+        return app.response_class(status=304, headers=headers)
+    return app.response_class(entry.body, status=200, headers=headers, mimetype='application/json')
 
 # Roadmap endpoints
 @app.route('/api/roadmap/<role>', methods=['GET'])
 def get_roadmap(role):
-    try:
+    def build():
         roadmap = Roadmap.query.filter_by(role=role).first()
         if not roadmap:
-            return jsonify({'message': 'Roadmap not found'}), 404
-        
-        return jsonify({
+            return {'message': 'Roadmap not found'}, 404
+
+        return {
             'id': roadmap.id,
             'role': roadmap.role,
             'title': roadmap.title,
             'description': roadmap.description,
             'topics': roadmap.topics,
             'resources': roadmap.resources
-        }), 200
+        }, 200
+
+    try:
+        return cached_json_response('roadmap', role, build)
     except Exception as e:
-        print(f"Error fetching roadmap: {str(e)}")
+        logger.exception("Error fetching roadmap")
         return jsonify({'message': 'Error fetching roadmap'}), 500
 
 # MCQ endpoints
+def serialize_mcq(mcq):
+    return {
+        'id': mcq.id,
+        'question': mcq.question,
+        'options': mcq.options,
+        'topic': mcq.topic,
+        'difficulty': mcq.difficulty
+    }
+
 @app.route('/api/mcq/<role>', methods=['GET'])
 def get_mcqs(role):
     try:
@@ -209,88 +975,628 @@ def get_mcqs(role):
             query = query.filter_by(topic=topic)
         if difficulty:
             query = query.filter_by(difficulty=difficulty)
-            
+
+        if wants_cursor(request.args):
+            # Keyset paging on id: no COUNT(*) and no OFFSET scan
+            filtered = query
+            after = request.args.get('after')
+            if after:
+                try:
+                    (after_id,) = decode_cursor(after)
+                    query = query.filter(MCQ.id > int(after_id))
+                except (ValueError, TypeError):
+                    return jsonify({'message': 'Invalid cursor'}), 400
+
+            items, next_cursor = keyset_page(
+                query.order_by(MCQ.id), per_page, lambda mcq: encode_cursor(mcq.id)
+            )
+            response_data = {
+                'mcqs': [serialize_mcq(mcq) for mcq in items],
+                'next_cursor': next_cursor
+            }
+            if request.args.get('include_total') == 'true':
+                response_data['total'] = filtered.order_by(None).count()
+            return jsonify(response_data), 200
+
         mcqs = query.paginate(page=page, per_page=per_page)
         
         return jsonify({
-            'mcqs': [{
-                'id': mcq.id,
-                'question': mcq.question,
-                'options': mcq.options,
-                'topic': mcq.topic,
-                'difficulty': mcq.difficulty
-            } for mcq in mcqs.items],
+            'mcqs': [serialize_mcq(mcq) for mcq in mcqs.items],
             'total': mcqs.total,
             'pages': mcqs.pages,
             'current_page': mcqs.page
         }), 200
     except Exception as e:
-        print(f"Error fetching MCQs: {str(e)}")
+        logger.exception("Error fetching MCQs")
         return jsonify({'message': 'Error fetching MCQs'}), 500
 
+def build_mcq_topics(role):
+    topics = db.session.query(MCQ.topic).filter_by(role=role).distinct().all()
+    return {
+        'topics': [topic[0] for topic in topics]
+    }, 200
+
+def mcq_topics(role):
+    """A role's MCQ topics, read from the topics endpoint's cache entry."""
+    return json.loads(cached_json_entry('mcq', f'topics:{role}', lambda: build_mcq_topics(role)).body)['topics']
+
 @app.route('/api/mcq/<role>/topics', methods=['GET'])
 def get_mcq_topics(role):
     try:
-        topics = db.session.query(MCQ.topic).filter_by(role=role).distinct().all()
+        return cached_json_response('mcq', f'topics:{role}', lambda: build_mcq_topics(role))
+    except Exception as e:
+        logger.exception("Error fetching MCQ topics")
+        return jsonify({'message': 'Error fetching topics'}), 500
+
+@app.route('/api/mcq/<role>/quiz', methods=['GET'])
+@jwt_required(optional=True)
+def build_mcq_quiz(role):
+    """K random MCQs of a role, spread evenly over its topics and difficulties."""
+    count = request.args.get('count', 10, type=int)
+    topic = request.args.get('topic', None)
+    difficulty = request.args.get('difficulty', None)
+    exclude_seen = request.args.get('exclude_seen') == 'true'
+    if not 1 <= count <= app.config['QUIZ_MAX_ANSWERS']:
+        return jsonify({'message': f"count must be between 1 and {app.config['QUIZ_MAX_ANSWERS']}"}), 400
+    identity = get_jwt_identity()
+    if exclude_seen and identity is None:
+        return jsonify({'message': 'exclude_seen needs a signed-in user'}), 401
+
+    def seen(mcq_ids):
+        return {row[0] for row in db.session.query(MCQReview.mcq_id)
+                .filter(MCQReview.user_id == int(identity), MCQReview.mcq_id.in_(mcq_ids))}
+
+    try:
+        mcq_ids = mcq_sample_index.sample(role, count, topic, difficulty, exclude=seen if exclude_seen else None)
+        if not mcq_ids:
+            return jsonify({'message': 'No MCQs found for this quiz'}), 404
+        mcqs = {mcq.id: mcq for mcq in MCQ.query.filter(MCQ.id.in_(mcq_ids))}
         return jsonify({
-            'topics': [topic[0] for topic in topics]
+            'mcqs': [serialize_mcq(mcqs[mcq_id]) for mcq_id in mcq_ids if mcq_id in mcqs],
+            'requested': count
         }), 200
     except Exception as e:
-        print(f"Error fetching MCQ topics: {str(e)}")
-        return jsonify({'message': 'Error fetching topics'}), 500
+        logger.exception("Error building MCQ quiz")
+        return jsonify({'message': 'Error building quiz'}), 500
+
+def search_params(default_sort):
+    """(sort, after key) of a search request; raises ValueError on a bad sort or cursor."""
+    sort = request.args.get('sort', default_sort)
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SEARCH_SORTS)}")
+    after = request.args.get('after')
+    try:
+        return sort, parse_after(decode_cursor(after), sort) if after else None
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+@app.route('/api/search/mcqs', methods=['GET'])
+def search_mcq_bank():
+    query = request.args.get('q', '')
+    try:
+        sort, after = search_params('relevance')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    try:
+        hits, next_cursor = search_mcqs(
+            db.session, query,
+            role=request.args.get('role'),
+            topic=request.args.get('topic'),
+            difficulty=request.args.get('difficulty'),
+            sort=sort,
+            per_page=request.args.get('per_page', 10, type=int),
+            after=after
+        )
+        mcqs = {mcq.id: mcq for mcq in MCQ.query.filter(MCQ.id.in_([mcq_id for mcq_id, _ in hits]))}
+        return jsonify({
+            'mcqs': [dict(serialize_mcq(mcqs[mcq_id]), role=mcqs[mcq_id].role, snippet=snippet)
+                     for mcq_id, snippet in hits if mcq_id in mcqs],
+            'next_cursor': next_cursor
+        }), 200
+    except Exception as e:
+        logger.exception("Error searching MCQs")
+        return jsonify({'message': 'Error searching MCQs'}), 500
 
 @app.route('/api/mcq/check/<int:mcq_id>', methods=['POST'])
 @jwt_required()
 def check_mcq_answer(mcq_id):
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    user_answer = data.get('answer')
+    if not isinstance(user_answer, str) or len(user_answer.strip()) != 1:
+        return jsonify({'message': 'answer must be a single letter'}), 400
+
     try:
-        data = request.get_json()
-        user_answer = data.get('answer')
-        
         mcq = MCQ.query.get(mcq_id)
         if not mcq:
             return jsonify({'message': 'MCQ not found'}), 404
             
-        is_correct = user_answer.upper() == mcq.correct_answer.upper()
+        user_answer = user_answer.strip().upper()
+        is_correct = user_answer == mcq.correct_answer.upper()
+
+        db.session.add(MCQAttempt(user_id=user_id, mcq_id=mcq.id, answer=user_answer, is_correct=is_correct))
+        db.session.flush()
+        reviews, masteries = record_mcq_answers(user_id, [(mcq, is_correct)])
+        db.session.commit()
         
         return jsonify({
             'correct': is_correct,
             'correct_answer': mcq.correct_answer,
-            'explanation': mcq.explanation
+            'explanation': mcq.explanation,
+            'mastery': masteries[(mcq.role, mcq.topic)].mastery,
+            'next_review_at': reviews[mcq.id].due_at.isoformat()
         }), 200
     except Exception as e:
-        print(f"Error checking MCQ answer: {str(e)}")
+        db.session.rollback()
+        logger.exception("Error checking MCQ answer")
         return jsonify({'message': 'Error checking answer'}), 500
 
+@app.route('/api/mcq/check', methods=['POST'])
+@jwt_required()
+def check_mcq_answers():
+    """Grade a whole quiz at once and persist it as a QuizSubmission."""
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    answers = data.get('answers')
+
+    if not isinstance(answers, list) or not answers:
+        return jsonify({'message': 'answers must be a non-empty list'}), 400
+    if len(answers) > app.config['QUIZ_MAX_ANSWERS']:
+        return jsonify({'message': f"At most {app.config['QUIZ_MAX_ANSWERS']} answers per submission"}), 400
+    for item in answers:
+        if not isinstance(item, dict) or not isinstance(item.get('mcq_id'), int) or isinstance(item['mcq_id'], bool) \
+                or not isinstance(item.get('answer'), str) or len(item['answer'].strip()) != 1:
+            return jsonify({'message': 'Each answer needs an integer mcq_id and a single-letter answer'}), 400
+
+    try:
+        # One IN query for the whole quiz
+        mcq_ids = {item['mcq_id'] for item in answers}
+        mcqs = {mcq.id: mcq for mcq in MCQ.query.filter(MCQ.id.in_(mcq_ids))}
+
+        results = []
+        attempts = []
+        graded = []
+        for item in answers:
+            mcq = mcqs.get(item['mcq_id'])
+            if not mcq:
+                results.append({'mcq_id': item['mcq_id'], 'error': 'MCQ not found'})
+                continue
+            user_answer = item['answer'].strip().upper()
+            is_correct = user_answer == mcq.correct_answer.upper()
+            results.append({
+                'mcq_id': mcq.id,
+                'answer': user_answer,
+                'correct': is_correct,
+                'correct_answer': mcq.correct_answer,
+                'explanation': mcq.explanation
+            })
+            attempts.append(MCQAttempt(user_id=user_id, mcq_id=mcq.id, answer=user_answer, is_correct=is_correct))
+            graded.append((mcq, is_correct))
+
+        if not attempts:
+            return jsonify({'message': 'None of the MCQs were found', 'results': results}), 404
+
+        correct = sum(attempt.is_correct for attempt in attempts)
+        submission = QuizSubmission(user_id=user_id, total=len(attempts), correct=correct)
+        db.session.add(submission)
+        db.session.flush()
+        for attempt in attempts:
+            attempt.submission_id = submission.id
+        db.session.add_all(attempts)
+        db.session.flush()
+        record_mcq_answers(user_id, graded)
+        db.session.commit()
+
+        return jsonify({
+            'submission_id': submission.id,
+            'results': results,
+            'total': len(attempts),
+            'correct': correct,
+            'score': round(correct / len(attempts) * 100, 1)
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Error checking MCQ answers")
+        return jsonify({'message': 'Error checking answers'}), 500
+
+def record_mcq_answers(user_id, graded, now=None):
+    """Fold answered MCQs, as (mcq, is_correct) in answer order, into the user's mastery and review schedule.
+
+    Must run inside the transaction that inserts their MCQAttempt rows, after
+    a flush. The insert already holds SQLite's write lock, so this
+    read-modify-write can't race. Returns the touched rows as
+    ({mcq_id: MCQReview}, {(role, topic): TopicMastery}).
+    """
+    now = now or datetime.utcnow()
+    masteries = {(row.role, row.topic): row for row in TopicMastery.query.filter_by(user_id=user_id)}
+    reviews = {row.mcq_id: row for row in MCQReview.query.filter(
+        MCQReview.user_id == user_id, MCQReview.mcq_id.in_({mcq.id for mcq, _ in graded}))}
+
+    for mcq, is_correct in graded:
+        mastery = masteries.get((mcq.role, mcq.topic))
+        if mastery is None:
+            mastery = TopicMastery(user_id=user_id, role=mcq.role, topic=mcq.topic, attempts=0, correct=0,
+                                   mastery=0.0, new_cursors={})
+            db.session.add(mastery)
+            masteries[(mcq.role, mcq.topic)] = mastery
+        mastery.attempts += 1
+        mastery.correct += int(is_correct)
+        mastery.mastery = update_mastery(mastery.mastery, mastery.attempts, is_correct,
+                                         app.config['PRACTICE_MASTERY_WEIGHT'])
+        mastery.updated_at = now
+
+        review = reviews.get(mcq.id)
+        if review is None:
+            review = MCQReview(user_id=user_id, mcq_id=mcq.id, role=mcq.role, topic=mcq.topic, repetitions=0,
+                               interval_seconds=0.0, ease=DEFAULT_EASE, lapses=0)
+            db.session.add(review)
+            reviews[mcq.id] = review
+        review.repetitions, review.interval_seconds, review.ease, review.due_at = schedule_review(
+            review.repetitions, review.interval_seconds, review.ease, is_correct, now)
+        if not is_correct:
+            review.lapses += 1
+        review.last_reviewed_at = now
+    return reviews, masteries
+
+# Candidate ids fetched per index seek when looking for an unanswered MCQ
+PRACTICE_NEW_BATCH = 20
+
+def unseen_mcq_id(user_id, role, topic, difficulty, mastery):
+    """Smallest id of an MCQ the user hasn't answered in (role, topic, difficulty), or None.
+
+    Seeks past the topic's cursor for that difficulty and moves the cursor
+    over the answered ids it finds, so each one is skipped only once.
+    """
+    start = cursor = mastery.new_cursors.get(difficulty, 0) if mastery is not None else 0
+    found = None
+    while found is None:
+        candidates = [row[0] for row in db.session.query(MCQ.id)
+                      .filter(MCQ.role == role, MCQ.topic == topic, MCQ.difficulty == difficulty, MCQ.id > cursor)
+                      .order_by(MCQ.id).limit(PRACTICE_NEW_BATCH)]
+        if not candidates:
+            break
+        answered = {row[0] for row in db.session.query(MCQReview.mcq_id)
+                    .filter(MCQReview.user_id == user_id, MCQReview.mcq_id.in_(candidates))}
+        for mcq_id in candidates:
+            if mcq_id not in answered:
+                found = mcq_id
+                break
+            cursor = mcq_id
+    if cursor != start:
+        mastery.new_cursors = dict(mastery.new_cursors, **{difficulty: cursor})
+    return found
+
+def next_new_mcq(user_id, role, topic=None):
+    """An MCQ the user hasn't answered, from their weakest topic, at the difficulty their mastery of it calls for."""
+    masteries = {row.topic: row for row in TopicMastery.query.filter_by(user_id=user_id, role=role)}
+    topics = [topic] if topic else mcq_topics(role)
+    # Topics not practised yet rank as middling, between weak and strong ones
+    topics.sort(key=lambda t: (masteries[t].mastery, masteries[t].attempts) if t in masteries else (0.5, 0))
+    for t in topics:
+        mastery = masteries.get(t)
+        for difficulty in difficulty_order(mastery.mastery if mastery is not None else None):
+            mcq_id = unseen_mcq_id(user_id, role, t, difficulty, mastery)
+            if mcq_id is not None:
+                return db.session.get(MCQ, mcq_id)
+    return None
+
+def next_practice_mcq(user_id, role, topic=None, now=None):
+    """(mcq, reason, review) to practise next, or None when the role has no MCQs.
+
+    reason is 'due' for the most overdue review, 'new' for an unanswered
+    question (see next_new_mcq) when nothing is due, and 'ahead' for the
+    review due soonest once every question has been answered. Due reviews
+    come off the (user_id, role[, topic], due_at) index in one seek. May
+    advance new-question cursors; the caller commits.
+    """
+    now = now or datetime.utcnow()
+    reviews = MCQReview.query.filter_by(user_id=user_id, role=role)
+    if topic:
+        reviews = reviews.filter_by(topic=topic)
+    reviews = reviews.order_by(MCQReview.due_at)
+
+    review = reviews.filter(MCQReview.due_at <= now).first()
+    if review is not None:
+        return db.session.get(MCQ, review.mcq_id), 'due', review
+    mcq = next_new_mcq(user_id, role, topic)
+    if mcq is not None:
+        return mcq, 'new', None
+    review = reviews.first()
+    if review is not None:
+        return db.session.get(MCQ, review.mcq_id), 'ahead', review
+    return None
+
+@app.route('/api/practice/next', methods=['GET'])
+@jwt_required()
+def get_next_practice_mcq():
+    user_id = int(get_jwt_identity())
+    role = request.args.get('role')
+    topic = request.args.get('topic')
+    if not role:
+        return jsonify({'message': 'Missing role'}), 400
+
+    try:
+        picked = next_practice_mcq(user_id, role, topic)
+        db.session.commit()
+        if picked is None:
+            return jsonify({'message': 'No MCQs found for this role'}), 404
+
+        mcq, reason, review = picked
+        mastery = db.session.get(TopicMastery, (user_id, mcq.role, mcq.topic))
+        return jsonify({
+            'mcq': dict(serialize_mcq(mcq), role=mcq.role),
+            'reason': reason,
+            'due_at': review.due_at.isoformat() if review is not None else None,
+            'mastery': mastery.mastery if mastery is not None else None
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Error picking next practice MCQ")
+        return jsonify({'message': 'Error picking next question'}), 500
+
+@app.route('/api/practice/mastery', methods=['GET'])
+@jwt_required()
+def get_topic_mastery():
+    user_id = int(get_jwt_identity())
+    role = request.args.get('role')
+
+    try:
+        query = TopicMastery.query.filter_by(user_id=user_id)
+        if role:
+            query = query.filter_by(role=role)
+        return jsonify({
+            'topics': [{
+                'role': row.role,
+                'topic': row.topic,
+                'attempts': row.attempts,
+                'correct': row.correct,
+                'mastery': row.mastery,
+                'updated_at': row.updated_at.isoformat()
+            } for row in query.order_by(TopicMastery.role, TopicMastery.mastery)]
+        }), 200
+    except Exception as e:
+        logger.exception("Error fetching topic mastery")
+        return jsonify({'message': 'Error fetching topic mastery'}), 500
+
+MCQ_GENERATION_FORMAT = (
+    '{"questions": [{"question": "...", "options": {"A": "...", "B": "...", "C": "...", "D": "..."}, '
+    '"correct_answer": "A", "explanation": "...", "difficulty": "easy|medium|hard", "topic": "..."}]}'
+)
+
+def parse_generated_mcqs(content):
+    """Return the list of question objects in a completion, or [] if it isn't valid JSON."""
+    text = content.strip()
+    # Models sometimes wrap the JSON in a markdown code fence
+    if text.startswith('```'):
+        text = text.split('\n', 1)[-1].rsplit('```', 1)[0]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return []
+    items = data.get('questions') if isinstance(data, dict) else data
+    return items if isinstance(items, list) else []
+
+def mcq_generation_messages(role, topic, difficulty, count):
+    about = f" about {topic}" if topic else ""
+    level = f"{difficulty}-level" if difficulty else "challenging"
+    return [{
+        "role": "system",
+        "content": "You are an expert technical interviewer. Generate MCQ questions. "
+                   f"Reply with JSON only, no other text, in exactly this format: {MCQ_GENERATION_FORMAT}"
+    }, {
+        "role": "user",
+        "content": f"Generate {count} distinct {level} MCQs for a {role} role{about}. "
+                   "Each needs 4 options, the letter of the correct answer, and a short explanation."
+    }]
+
+def request_mcqs(role, topic, difficulty, count):
+    content = chat_completion('mcq_generation', mcq_generation_messages(role, topic, difficulty, count))
+    return parse_generated_mcqs(content)
+
+near_duplicate_index = NearDuplicateIndex(threshold=app.config['NEAR_DUPLICATE_THRESHOLD'])
+
+def store_mcq_rows(rows, action=None):
+    """Insert validated MCQ rows (see mcq_validation.validate_mcq) without committing.
+
+    Rows whose content hash is already stored are skipped. Rows resembling a
+    stored question, or an earlier row of the batch, are handled according to
+    NEAR_DUPLICATE_ACTION. Returns (inserted, near_duplicates, kept_hashes).
+    """
+    action = action or app.config['NEAR_DUPLICATE_ACTION']
+    if not rows:
+        return 0, 0, []
+
+    hashes = [row['content_hash'] for row in rows]
+    seen = {h for (h,) in db.session.query(MCQ.content_hash).filter(MCQ.content_hash.in_(hashes))}
+    fresh = []
+    for row in rows:
+        if row['content_hash'] not in seen:
+            seen.add(row['content_hash'])
+            fresh.append(row)
+
+    near_duplicates = 0
+    kept, signatures, flagged_in_batch = [], [], []
+    if action == 'off':
+        kept = fresh
+        signatures = [signature(mcq_text(row['question'], row['options'])) for row in fresh]
+    else:
+        matches, fresh_signatures = near_duplicate_index.check_batch(
+            db.session, [(row['role'], row['question'], row['options']) for row in fresh]
+        )
+        for row, sig, match in zip(fresh, fresh_signatures, matches):
+            if match and action == 'reject':
+                near_duplicates += 1
+                continue
+            if match and match[0] == 'mcq':
+                row = dict(row, near_duplicate_of=match[1])
+            elif match:
+                # Matched an earlier row of this batch, whose id isn't known until it's inserted
+                flagged_in_batch.append((row['content_hash'], fresh[match[1]]['content_hash']))
+            kept.append(row)
+            signatures.append(sig)
+
+    inserted = 0
+    if kept:
+        now = datetime.utcnow()
+        result = db.session.execute(
+            MCQ.__table__.insert().prefix_with('OR IGNORE'),
+            [dict(row, created_at=row.get('created_at', now), near_duplicate_of=row.get('near_duplicate_of'))
+             for row in kept]
+        )
+        inserted = result.rowcount
+
+        ids = dict(db.session.query(MCQ.content_hash, MCQ.id).filter(
+            MCQ.content_hash.in_([row['content_hash'] for row in kept])
+        ))
+        near_duplicate_index.add(db.session, [
+            (ids[row['content_hash']], row['role'], sig)
+            for row, sig in zip(kept, signatures) if row['content_hash'] in ids
+        ])
+        for content_hash, original_hash in flagged_in_batch:
+            MCQ.query.filter_by(content_hash=content_hash)\
+                .update({'near_duplicate_of': ids.get(original_hash)}, synchronize_session=False)
+
+    return inserted, near_duplicates, hashes
+
+def backfill_content_hashes(batch_size=2000):
+    """Hash MCQs stored before content hashes existed; returns rows updated."""
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(MCQ.id, MCQ.role, MCQ.question, MCQ.options)\
+            .filter(MCQ.content_hash.is_(None), MCQ.id > last_id)\
+            .order_by(MCQ.id).limit(batch_size).all()
+        if not rows:
+            return updated
+        for row in rows:
+            # OR IGNORE leaves a pre-existing duplicate unhashed instead of failing
+            result = db.session.execute(
+                db.text('UPDATE OR IGNORE mcqs SET content_hash = :hash WHERE id = :id'),
+                {'hash': mcq_content_hash(row.role, row.question, row.options), 'id': row.id}
+            )
+            updated += result.rowcount
+        last_id = rows[-1].id
+        db.session.commit()
+
+def index_unindexed_mcqs(batch_size=2000):
+    """Add MCQs stored before the near-duplicate index existed; returns rows indexed."""
+    indexed = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(MCQ.id, MCQ.role, MCQ.question, MCQ.options)\
+            .filter(MCQ.id > last_id)\
+            .filter(db.text('NOT EXISTS (SELECT 1 FROM mcq_signatures WHERE mcq_signatures.mcq_id = mcqs.id)'))\
+            .order_by(MCQ.id).limit(batch_size).all()
+        if not rows:
+            return indexed
+        near_duplicate_index.add(db.session, [
+            (row.id, row.role, signature(mcq_text(row.question, row.options))) for row in rows
+        ])
+        db.session.commit()
+        indexed += len(rows)
+        last_id = rows[-1].id
+
+def generate_mcqs(role, topic, difficulty, count):
+    """Generate up to `count` validated MCQ rows.
+
+    Malformed items are dropped one by one; the shortfall is requested again
+    up to MCQ_GENERATION_RETRIES times. Returns (rows, dropped).
+    """
+    rows, seen, dropped = [], set(), 0
+    for _ in range(1 + app.config['MCQ_GENERATION_RETRIES']):
+        missing = count - len(rows)
+        if missing <= 0:
+            break
+        dropped += collect_mcq_rows(request_mcqs(role, topic, difficulty, missing), role, topic, difficulty, rows, seen)
+    return rows[:count], dropped
+
+def collect_mcq_rows(items, role, topic, difficulty, rows, seen):
+    """Validate generated items onto `rows`, skipping content hashes in `seen`; returns how many were dropped."""
+    dropped = 0
+    for item in items:
+        if not isinstance(item, dict):
+            dropped += 1
+            continue
+        # The request decides role, and topic/difficulty when given
+        item = dict(item, role=role)
+        item['topic'] = topic or item.get('topic')
+        item['difficulty'] = difficulty or item.get('difficulty')
+        try:
+            row = validate_mcq(item)
+        except ValidationError as e:
+            logger.debug("Dropping generated MCQ: %s", e)
+            dropped += 1
+            continue
+        if row['content_hash'] in seen:
+            dropped += 1
+            continue
+        seen.add(row['content_hash'])
+        rows.append(row)
+    return dropped
+
+def mcq_generation_params(data):
+    """(role, topic, difficulty, count) of a generation request; raises ValueError with the message for a 400."""
+    role = data.get('role')
+    topic = data.get('topic')
+    difficulty = data.get('difficulty')
+    count = data.get('count', app.config['MCQ_GENERATION_BATCH_SIZE'])
+
+    if not role or not isinstance(role, str):
+        raise ValueError('Missing role')
+    if topic is not None and not isinstance(topic, str):
+        raise ValueError('topic must be a string')
+    if difficulty and difficulty not in ('easy', 'medium', 'hard'):
+        raise ValueError('Invalid difficulty')
+    # bool is an int subclass; reject true/false as a count
+    if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= app.config['MCQ_GENERATION_MAX_COUNT']:
+        raise ValueError(f"count must be between 1 and {app.config['MCQ_GENERATION_MAX_COUNT']}")
+    return role, topic, difficulty, count
+
+def store_generated_mcqs(rows, count, dropped):
+    """Persist a generated batch in one transaction and return the response body."""
+    # Questions already in the bank are skipped
+    inserted, near_duplicates, hashes = store_mcq_rows(rows)
+    db.session.commit()
+    # Core inserts bypass the session hooks that invalidate cached topic lists
+    content_cache.bump('mcq')
+    mcq_sample_index.invalidate()
+
+    mcqs = MCQ.query.filter(MCQ.content_hash.in_(hashes)).order_by(MCQ.id).all()
+    return {
+        'mcqs': [dict(serialize_mcq(mcq), correct_answer=mcq.correct_answer, explanation=mcq.explanation)
+                 for mcq in mcqs],
+        'requested': count,
+        'stored': inserted,
+        'duplicates': len(rows) - inserted - near_duplicates,
+        'near_duplicates': near_duplicates,
+        'dropped': dropped
+    }
+
 @app.route('/api/mcq/generate', methods=['POST'])
 @jwt_required()
 def generate_mcq():
     try:
-        data = request.get_json()
-        role = data.get('role')
-        topic = data.get('topic')
+        try:
+            role, topic, difficulty, count = mcq_generation_params(request.get_json())
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         if not openai.api_key:
             return jsonify({'message': 'OpenAI API key not configured'}), 500
 
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{
-                "role": "system",
-                "content": "You are an expert technical interviewer. Generate an MCQ question."
-            }, {
-                "role": "user",
-                "content": f"Generate a challenging MCQ for {role} role about {topic}. Include 4 options, correct answer, and explanation."
-            }]
-        )
-        
-        # Process the AI response and format it as an MCQ
-        # You'll need to parse the AI response and structure it properly
-        
-        return jsonify({
-            'question': response.choices[0].message.content
-        }), 200
+        rows, dropped = generate_mcqs(role, topic, difficulty, count)
+        if not rows:
+            return jsonify({'message': 'The model did not return any valid MCQs'}), 502
+
+        return jsonify(store_generated_mcqs(rows, count, dropped)), 200
+    except LLMUnavailableError as e:
+        db.session.rollback()
+        logger.warning("MCQ generation unavailable: %s", e)
+        return jsonify({'message': 'MCQ generation is temporarily unavailable, please retry shortly'}), 503
     except Exception as e:
-        print(f"Error generating MCQ: {str(e)}")
+        db.session.rollback()
+        logger.exception("Error generating MCQ")
         return jsonify({'message': 'Error generating MCQ'}), 500
 
 @app.route('/api/health')
@@ -315,58 +1621,88 @@ def signup():
         user = User(
             name=data['name'],
             email=data['email'],
-            password=generate_password_hash(data['password'])
+            password=password_hasher.hash(data['password'])
         )
         
         db.session.add(user)
         db.session.commit()
         
         return jsonify({'message': 'User created successfully'}), 201
+    except HashingBusyError as e:
+        db.session.rollback()
+        return hashing_busy_response(e)
     except Exception as e:
         db.session.rollback()
-        print(f"Error during signup: {str(e)}")
+        logger.exception("Error during signup")
         return jsonify({'message': 'An error occurred during signup'}), 500
 
+def issue_token(user):
+    # Create access token with additional claims
+    token_data = {
+        'user_id': str(user.id),  # Convert user ID to string
+        'email': user.email
+    }
+    return create_access_token(
+        identity=str(user.id),  # Convert user ID to string for the identity
+        additional_claims=token_data
+    )
+
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
-    print(f"Login attempt for email: {data.get('email')}")
-    
+
     # Validate input
     if not all(k in data for k in ('email', 'password')):
-        print("Missing required fields")
         return jsonify({'message': 'Missing required fields'}), 400
     
     # Find user
     user = User.query.filter_by(email=data['email']).first()
     
     # Verify password
-    if not user or not check_password_hash(user.password, data['password']):
-        print("Invalid email or password")
-        return jsonify({'message': 'Invalid email or password'}), 401
-    
-    # Create access token with additional claims
-    token_data = {
-        'user_id': str(user.id),  # Convert user ID to string
-        'email': user.email
-    }
-    access_token = create_access_token(
-        identity=str(user.id),  # Convert user ID to string for the identity
-        additional_claims=token_data
-    )
-    print(f"Generated token for user {user.id}: {access_token}")
+    try:
+        if not user or not password_hasher.verify(user.password, data['password']):
+            logger.info("Login failed", extra={'user_id': user.id if user else None})
+            return jsonify({'message': 'Invalid email or password'}), 401
+    except HashingBusyError as e:
+        return hashing_busy_response(e)
+
+    # Hashed with older parameters: upgrade it while we have the password
+    if password_hasher.needs_rehash(user.password):
+        try:
+            user.password = password_hasher.hash(data['password'])
+            db.session.commit()
+            logger.info("Upgraded password hash", extra={'user_id': user.id, 'method': password_hasher.method})
+        except HashingBusyError:
+            # Not worth failing the login over; it is upgraded on a later one
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error upgrading password hash")
     
     response_data = {
-        'token': access_token,
+        'token': issue_token(user),
         'user': {
             'id': user.id,
             'name': user.name,
             'email': user.email
         }
     }
-    print(f"Sending login response: {response_data}")
     return jsonify(response_data), 200
 
+@app.route('/api/auth/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    claims = get_jwt()
+    try:
+        token_revocations.revoke_token(db.session, claims['jti'], int(claims['sub']), claims['exp'])
+        db.session.commit()
+        token_revocations.refresh()
+        return jsonify({'message': 'Logged out'}), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Error during logout")
+        return jsonify({'message': 'An error occurred during logout'}), 500
+
 @app.route('/api/auth/user', methods=['GET'])
 @jwt_required()
 def get_user():
@@ -389,54 +1725,166 @@ def get_dashboard_stats():
     try:
         # Get current user from JWT token and convert to int
         current_user_id = int(get_jwt_identity())
-        print(f"Processing dashboard stats request for user {current_user_id}")
-        
+
         if not current_user_id:
-            print("No user ID found in token")
             return jsonify({'message': 'Invalid user token'}), 401
         
-        # Get total responses
-        total_responses = Response.query.filter_by(user_id=current_user_id).count()
-        
-        # Get responses by role
-        role_stats = db.session.query(
-            Response.role,
-            func.count(Response.id).label('count')
-        ).filter_by(user_id=current_user_id).group_by(Response.role).all()
-        
-        # Get recent activity
-        recent_responses = Response.query.filter_by(user_id=current_user_id)\
-            .order_by(Response.created_at.desc())\
-            .limit(5)\
-            .all()
+        stats = db.session.get(UserStats, current_user_id) or UserStats(role_counts={}, recent_activity=[])
         
         response_data = {
-            'total_responses': total_responses,
+            'total_responses': stats.total_responses or 0,
             'role_stats': [{
-                'role': stat.role,
-                'count': stat.count
-            } for stat in role_stats],
-            'recent_activity': [{
-                'id': response.id,
-                'question': response.question,
-                'role': response.role,
-                'created_at': response.created_at.isoformat()
-            } for response in recent_responses]
+                'role': role,
+                'count': count
+            } for role, count in sorted(stats.role_counts.items())],
+            'recent_activity': stats.recent_activity
         }
-        print(f"Sending stats response: {response_data}")
         return jsonify(response_data), 200
     except Exception as e:
-        print(f"Error fetching dashboard stats: {str(e)}")
+        logger.exception("Error fetching dashboard stats")
         return jsonify({'message': 'Error fetching dashboard statistics'}), 500
 
+def score_averages(query):
+    """Row count and average of every score column over `query`'s responses, in one aggregate."""
+    names = ('score',) + SUB_SCORES
+    row = query.with_entities(
+        func.count(Response.score), *[func.avg(getattr(Response, score_column(name))) for name in names]
+    ).order_by(None).one()
+    return row[0], {name: round(value, 2) if value is not None else None for name, value in zip(names, row[1:])}
+
+@app.route('/api/dashboard/scores', methods=['GET'])
+@jwt_required()
+def get_dashboard_scores():
+    """The user's average scores overall and per role, and their daily average over the last `days` days."""
+    user_id = int(get_jwt_identity())
+    days = min(max(request.args.get('days', 30, type=int), 1), 365)
+
+    try:
+        responses = Response.query.filter_by(user_id=user_id)
+        scored, averages = score_averages(responses)
+        by_role = db.session.query(Response.role, func.count(Response.score), func.avg(Response.score))\
+            .filter(Response.user_id == user_id).group_by(Response.role)
+        day = func.date(Response.created_at)
+        trend = db.session.query(day, func.count(Response.score), func.avg(Response.score))\
+            .filter(Response.user_id == user_id, Response.created_at >= datetime.utcnow() - timedelta(days=days),
+                    Response.score.isnot(None))\
+            .group_by(day).order_by(day)
+        return jsonify({
+            'scored_responses': scored,
+            'averages': averages,
+            'roles': [{'role': role, 'scored_responses': count, 'average': round(average, 2)}
+                      for role, count, average in by_role if count],
+            'trend': [{'date': date, 'scored_responses': count, 'average': round(average, 2)}
+                      for date, count, average in trend]
+        }), 200
+    except Exception as e:
+        logger.exception("Error fetching dashboard scores")
+        return jsonify({'message': 'Error fetching scores'}), 500
+
+@app.route('/api/scores/roles', methods=['GET'])
+@jwt_required()
+def get_role_score_distribution():
+    """Per role: how many responses were scored, their average, and a histogram of whole-point buckets."""
+    role = request.args.get('role')
+
+    try:
+        # Counts per distinct (role, score) come straight off the (role, score)
+        # index in order; there are only a few dozen per role to bucket here
+        query = db.session.query(Response.role, Response.score, func.count())\
+            .filter(Response.score.isnot(None))
+        if role:
+            query = query.filter(Response.role == role)
+        roles = {}
+        for row_role, score, count in query.group_by(Response.role, Response.score):
+            entry = roles.setdefault(row_role, {'role': row_role, 'scored_responses': 0, 'total': 0.0,
+                                                # histogram[i] counts scores in [i, i + 1); the last bucket includes MAX_SCORE
+                                                'histogram': [0] * MAX_SCORE})
+            entry['scored_responses'] += count
+            entry['total'] += score * count
+            entry['histogram'][min(int(score), MAX_SCORE - 1)] += count
+        for entry in roles.values():
+            entry['average'] = round(entry.pop('total') / entry['scored_responses'], 2)
+        return jsonify({'roles': list(roles.values())}), 200
+    except Exception as e:
+        logger.exception("Error fetching role score distribution")
+        return jsonify({'message': 'Error fetching score distribution'}), 500
+
+def leaderboard_params():
+    """(window, error response or None) of a leaderboard request."""
+    window = request.args.get('window', '30d')
+    if window not in LEADERBOARD_WINDOWS:
+        return window, (jsonify({'message': f"window must be one of {', '.join(LEADERBOARD_WINDOWS)}"}), 400)
+    return window, None
+
+@app.route('/api/leaderboard/<role>', methods=['GET'])
+@jwt_required()
+def get_leaderboard(role):
+    """Top users of a role by average score in the window, from the in-memory snapshot."""
+    window, error = leaderboard_params()
+    if error:
+        return error
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+
+    try:
+        board = leaderboards.board(role, window)
+        entries = board.top(offset, limit) if board is not None else []
+        names = dict(db.session.query(User.id, User.name).filter(User.id.in_([e['user_id'] for e in entries])))
+        return jsonify({
+            'role': role,
+            'window': window,
+            'entries': [dict(entry, name=names.get(entry['user_id'])) for entry in entries],
+            'ranked_users': board.ranked if board is not None else 0,
+            'min_responses': app.config['LEADERBOARD_MIN_RESPONSES'],
+            'built_at': datetime.utcfromtimestamp(leaderboards.built_at).isoformat()
+        }), 200
+    except Exception as e:
+        logger.exception("Error fetching leaderboard")
+        return jsonify({'message': 'Error fetching leaderboard'}), 500
+
+@app.route('/api/leaderboard/<role>/me', methods=['GET'])
+@jwt_required()
+def get_leaderboard_rank(role):
+    """The user's rank and percentile in a role's leaderboard."""
+    user_id = int(get_jwt_identity())
+    window, error = leaderboard_params()
+    if error:
+        return error
+
+    try:
+        board = leaderboards.board(role, window)
+        entry = board.entry(user_id) if board is not None else None
+        if entry is None:
+            return jsonify({'message': 'No scored responses for this role in this window'}), 404
+        return jsonify(dict(
+            entry,
+            role=role,
+            window=window,
+            ranked_users=board.ranked,
+            min_responses=app.config['LEADERBOARD_MIN_RESPONSES'],
+            built_at=datetime.utcfromtimestamp(leaderboards.built_at).isoformat()
+        )), 200
+    except Exception as e:
+        logger.exception("Error fetching leaderboard rank")
+        return jsonify({'message': 'Error fetching leaderboard rank'}), 500
+
+def serialize_response(response):
+    return {
+        'id': response.id,
+        'question': response.question,
+        'answer': response.answer,
+        'feedback': response.feedback,
+        'scores': serialize_scores(response),
+        'role': response.role,
+        'created_at': response.created_at.isoformat()
+    }
+
 @app.route('/api/dashboard/responses', methods=['GET'])
 @jwt_required()
 def get_user_responses():
     # Convert string user ID to int
     user_id = int(get_jwt_identity())
-    print(f"Fetching responses for user {user_id}")
-    print(f"Request headers: {dict(request.headers)}")
-    
+
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     role = request.args.get('role', None)
@@ -446,33 +1894,79 @@ def get_user_responses():
         
         if role:
             query = query.filter_by(role=role)
+
+        if wants_cursor(request.args):
+            # Keyset paging on (created_at, id), newest first
+            filtered = query
+            after = request.args.get('after')
+            if after:
+                try:
+                    created_at, response_id = decode_cursor(after)
+                    key = (datetime.fromisoformat(created_at), int(response_id))
+                    query = query.filter(db.tuple_(Response.created_at, Response.id) < key)
+                except (ValueError, TypeError):
+                    return jsonify({'message': 'Invalid cursor'}), 400
+
+            items, next_cursor = keyset_page(
+                query.order_by(Response.created_at.desc(), Response.id.desc()),
+                per_page,
+                lambda response: encode_cursor(response.created_at.isoformat(), response.id)
+            )
+            response_data = {
+                'responses': [serialize_response(response) for response in items],
+                'next_cursor': next_cursor
+            }
+            if request.args.get('include_total') == 'true':
+                response_data['total'] = filtered.order_by(None).count()
+            return jsonify(response_data), 200
         
         responses = query.order_by(Response.created_at.desc())\
             .paginate(page=page, per_page=per_page)
         
         response_data = {
-            'responses': [{
-                'id': response.id,
-                'question': response.question,
-                'answer': response.answer,
-                'feedback': response.feedback,
-                'role': response.role,
-                'created_at': response.created_at.isoformat()
-            } for response in responses.items],
+            'responses': [serialize_response(response) for response in responses.items],
             'total': responses.total,
             'pages': responses.pages,
             'current_page': responses.page
         }
-        print(f"Sending responses response: {response_data}")
         return jsonify(response_data), 200
     except Exception as e:
-        print(f"Error fetching user responses: {str(e)}")
+        logger.exception("Error fetching user responses")
         return jsonify({'message': 'Error fetching responses'}), 500
 
-# JWT error handlers with detailed logging
+@app.route('/api/search/responses', methods=['GET'])
+@jwt_required()
+def search_user_responses():
+    user_id = int(get_jwt_identity())
+    query = request.args.get('q', '')
+    try:
+        sort, after = search_params('recent')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    try:
+        hits, next_cursor = search_responses(
+            db.session, user_id, query,
+            role=request.args.get('role'),
+            sort=sort,
+            per_page=request.args.get('per_page', 10, type=int),
+            after=after
+        )
+        responses = {response.id: response for response in
+                     Response.query.filter(Response.id.in_([response_id for response_id, _ in hits]))}
+        return jsonify({
+            'responses': [dict(serialize_response(responses[response_id]), snippet=snippet)
+                          for response_id, snippet in hits if response_id in responses],
+            'next_cursor': next_cursor
+        }), 200
+    except Exception as e:
+        logger.exception("Error searching responses")
+        return jsonify({'message': 'Error searching responses'}), 500
+
+# JWT error handlers
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
-    print(f"Token expired - Header: {jwt_header}, Payload: {jwt_payload}")
+    logger.info("Rejected expired token", extra={'user_id': jwt_payload.get('sub')})
     return jsonify({
         'status': 401,
         'message': 'The token has expired'
@@ -480,7 +1974,7 @@ def expired_token_callback(jwt_header, jwt_payload):
 
 @jwt.invalid_token_loader
 def invalid_token_callback(error):
-    print(f"Invalid token error: {error}")
+    logger.info("Rejected invalid token: %s", error)
     return jsonify({
         'status': 422,
         'message': f'Invalid token: {error}'
@@ -488,7 +1982,7 @@ def invalid_token_callback(error):
 
 @jwt.unauthorized_loader
 def missing_token_callback(error):
-    print(f"Missing token error: {error}")
+    logger.debug("Missing token: %s", error)
     return jsonify({
         'status': 401,
         'message': f'Missing authorization token: {error}'
@@ -496,19 +1990,69 @@ def missing_token_callback(error):
 
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
-    print(f"Checking if token is revoked - Header: {jwt_header}, Payload: {jwt_payload}")
-    return False
+    return token_revocations.is_revoked(jwt_payload)
+
+@jwt.revoked_token_loader
+def revoked_token_callback(jwt_header, jwt_payload):
+    logger.info("Rejected revoked token", extra={'user_id': jwt_payload.get('sub')})
+    return jsonify({
+        'status': 401,
+        'message': 'The token has been revoked'
+    }), 401
 
 @app.before_request
-def log_request_info():
-    if request.path.startswith('/api/'):
-        print("\n=== Request Info ===")
-        print(f"Path: {request.path}")
-        print(f"Method: {request.method}")
-        print(f"Headers: {dict(request.headers)}")
-        if request.is_json:
-            print(f"JSON Data: {request.get_json()}")
-        print("==================\n")
+def start_request_tracking():
+    metrics.start()
+    rule = request.url_rule
+    route = rule.rule if rule is not None else 'unmatched'
+    rid = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    request_id.set(rid)
+    # One tuple on g: every access to g or request goes through a context-local proxy
+    g.tracking = (request.method, route, rid, time.perf_counter())
+    REQUESTS_IN_FLIGHT.inc((route,))
+    start_timing()
+
+@app.after_request
+def finish_request_tracking(response):
+    started = g.pop('tracking', None)
+    if started is None:
+        return response
+    method, route, rid, start = started
+    response.headers['X-Request-ID'] = rid
+
+    def finish():
+        # Runs once the body has been sent, so streamed responses count in full
+        duration = time.perf_counter() - start
+        record_request(method, route, response.status_code, duration, stop_timing() or {'db': 0.0, 'llm': 0.0})
+        request_id.set(None)
+    response.call_on_close(finish)
+    return response
+
+def record_request(method, route, status, duration, timings):
+    """Metrics and the sampled access log line for a finished request."""
+    REQUESTS_IN_FLIGHT.dec((route,))
+    REQUEST_DURATION.observe((method, route, str(status)), duration)
+    REQUEST_DB_TIME.observe((route,), timings['db'])
+    if timings['llm']:
+        REQUEST_LLM_TIME.observe((route,), timings['llm'])
+    if access_log.isEnabledFor(logging.INFO) and access_sampler.should_log(route, status, duration * 1000):
+        access_log.info('%s %s %s', method, route, status, extra={
+            'method': method,
+            'route': route,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'db_ms': round(timings['db'] * 1000, 2),
+            'llm_ms': round(timings['llm'] * 1000, 2),
+        })
+
+@app.route('/api/metrics')
+def prometheus_metrics():
+    return app.response_class(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.before_request
+def start_background_workers():
+    # Idempotent; also resumes jobs that were queued before a restart
+    evaluation_workers.start()
 
 # User profile endpoints
 @app.route('/api/user/profile', methods=['GET', 'PUT'])
@@ -561,13 +2105,19 @@ def change_password():
     if not all(k in data for k in ('currentPassword', 'newPassword')):
         return jsonify({'message': 'Missing required fields'}), 400
     
-    if not check_password_hash(user.password, data['currentPassword']):
-        return jsonify({'message': 'Current password is incorrect'}), 401
-    
     try:
-        user.password = generate_password_hash(data['newPassword'])
+        if not password_hasher.verify(user.password, data['currentPassword']):
+            return jsonify({'message': 'Current password is incorrect'}), 401
+        user.password = password_hasher.hash(data['newPassword'])
+        # Sign out every session, this one included; it carries on with the new token below
+        expires_at = time.time() + app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds()
+        token_revocations.revoke_user(db.session, user.id, expires_at)
         db.session.commit()
-        return jsonify({'message': 'Password updated successfully'}), 200
+        token_revocations.refresh()
+        return jsonify({'message': 'Password updated successfully', 'token': issue_token(user)}), 200
+    except HashingBusyError as e:
+        db.session.rollback()
+        return hashing_busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error updating password'}), 500
@@ -582,24 +2132,7 @@ def get_user_details():
         if not user:
             return jsonify({'message': 'User not found'}), 404
             
-        # Get total responses count
-        total_responses = Response.query.filter_by(user_id=user_id).count()
-        
-        # Get responses by role
-        role_stats = db.session.query(
-            Response.role,
-            func.count(Response.id).label('count')
-        ).filter_by(user_id=user_id).group_by(Response.role).all()
-        
-        # Get latest response date
-        latest_response = Response.query.filter_by(user_id=user_id)\
-            .order_by(Response.created_at.desc()).first()
-            
-        # Get average feedback scores (assuming feedback contains a score)
-        recent_responses = Response.query.filter_by(user_id=user_id)\
-            .order_by(Response.created_at.desc())\
-            .limit(5)\
-            .all()
+        stats = db.session.get(UserStats, user_id) or UserStats(role_counts={}, recent_activity=[], scored_responses=0)
         
         return jsonify({
             'user': {
@@ -609,21 +2142,24 @@ def get_user_details():
                 'joined_date': user.created_at.isoformat() if hasattr(user, 'created_at') else None,
             },
             'stats': {
-                'total_responses': total_responses,
-                'roles_practiced': [{'role': stat.role, 'count': stat.count} for stat in role_stats],
-                'latest_practice': latest_response.created_at.isoformat() if latest_response else None,
+                'total_responses': stats.total_responses or 0,
+                'average_score': round(stats.score_total / stats.scored_responses, 2) if stats.scored_responses else None,
+                'roles_practiced': [{'role': role, 'count': count} for role, count in sorted(stats.role_counts.items())],
+                'latest_practice': stats.last_practice_at.isoformat() if stats.last_practice_at else None,
                 'recent_responses': [{
-                    'question': resp.question,
-                    'role': resp.role,
-                    'created_at': resp.created_at.isoformat()
-                } for resp in recent_responses]
+                    'question': entry['question'],
+                    'role': entry['role'],
+                    'created_at': entry['created_at']
+                } for entry in stats.recent_activity]
             }
         }), 200
         
     except Exception as e:
-        print(f"Error fetching user details: {str(e)}")
+        logger.exception("Error fetching user details")
         return jsonify({'message': 'Error fetching user details'}), 500
 
 if __name__ == '__main__':
     init_db()
+    clear_directory(app.config['METRICS_DIR'])
+    evaluation_workers.start()
     app.run(debug=True)
\ No newline at end of file
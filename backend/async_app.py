@@ -0,0 +1,545 @@
+"""Async server: the LLM-bound routes as coroutines, every other route through the Flask app.
+
+    python async_app.py [--host 127.0.0.1] [--port 5000]
+    gunicorn async_app:web_app --worker-class aiohttp.GunicornWebWorker --workers 2
+
+Under app.py's threaded server, a request waiting on OpenAI holds a thread
+for the whole call, so every concurrent interview session costs a thread.
+Here the routes that mostly wait on the LLM (question generation,
+evaluation and MCQ generation, and the streaming variants) are aiohttp
+handlers awaiting AsyncLLMClient, so a waiting session costs a coroutine.
+
+Their blocking work (checking the token, reading and writing rows) runs on
+a bounded thread pool of ASYNC_EXECUTOR_WORKERS threads, using app.py's own
+functions. So does every other route: it is passed to the Flask app as a
+WSGI call, and its response is buffered. Status codes, bodies, metrics and
+logs match what app.py serves.
+
+Evaluation jobs come from the same evaluation_jobs queue. Here the event
+loop claims and grades them, up to ASYNC_EVALUATION_CONCURRENCY at a time,
+instead of app.py's worker threads.
+"""
+import argparse
+import asyncio
+import contextvars
+import logging
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+
+import openai
+from aiohttp import web
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from multidict import CIMultiDict
+from werkzeug.test import EnvironBuilder
+
+from app import (
+    app, db, init_db, metrics, llm_cache, question_pool, evaluation_workers, EvaluationJob, CORS_SETTINGS,
+    REQUESTS_IN_FLIGHT, LLM_CALLS, LLM_DURATION, LLM_TOKENS, record_request, sse_event,
+    question_params, question_messages, evaluation_messages, mcq_generation_messages, parse_generated_mcqs,
+    collect_mcq_rows, mcq_generation_params, store_generated_mcqs, store_evaluated_response, enqueue_evaluation_job,
+    serialize_evaluation_job, claim_evaluation_job, complete_evaluation_job, evaluation_failed, serialize_scores
+)
+from llm_client import AsyncLLMClient, LLMUnavailableError
+from metrics import start_timing, stop_timing, clear_directory
+from structured_log import request_id
+
+logger = logging.getLogger('nexthire.async')
+
+executor = ThreadPoolExecutor(app.config['ASYNC_EXECUTOR_WORKERS'], thread_name_prefix='async-executor')
+
+llm_client = AsyncLLMClient(
+    max_concurrency=app.config['ASYNC_LLM_MAX_CONCURRENCY'],
+    timeout=app.config['LLM_TIMEOUT'],
+    max_retries=app.config['LLM_MAX_RETRIES'],
+    backoff_base=app.config['LLM_BACKOFF_BASE'],
+    backoff_max=app.config['LLM_BACKOFF_MAX'],
+    acquire_timeout=app.config['LLM_ACQUIRE_TIMEOUT'],
+    breaker_threshold=app.config['LLM_BREAKER_THRESHOLD'],
+    breaker_reset=app.config['LLM_BREAKER_RESET_SECONDS']
+)
+
+# DB and LLM seconds of the request being handled, summed over its executor calls
+request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _call_in_app_context(fn, args):
+    start_timing()
+    try:
+        with app.app_context():
+            return fn(*args)
+    finally:
+        totals = request_timings.get()
+        timings = stop_timing()
+        if totals is not None:
+            totals['db'] += timings['db']
+
+
+async def run_sync(fn, *args):
+    """Run blocking `fn(*args)` on the bounded executor, in an app context and with this task's context variables."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(executor, context.run, _call_in_app_context, fn, args)
+
+
+@asynccontextmanager
+async def observe_llm_call(endpoint):
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    except LLMUnavailableError:
+        outcome = 'unavailable'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        totals = request_timings.get()
+        if totals is not None:
+            totals['llm'] += elapsed
+        LLM_CALLS.inc((endpoint, outcome))
+        LLM_DURATION.observe((endpoint,), elapsed)
+
+
+async def chat_completion(endpoint, messages, model="gpt-3.5-turbo"):
+    """app.chat_completion, awaiting the upstream."""
+    async def create():
+        async with observe_llm_call(endpoint):
+            response = await llm_client.complete(model, messages)
+        usage = response.get('usage') or {}
+        LLM_TOKENS.inc((endpoint, 'prompt'), usage.get('prompt_tokens', 0))
+        LLM_TOKENS.inc((endpoint, 'completion'), usage.get('completion_tokens', 0))
+        return response.choices[0].message.content
+    return await llm_cache.acompletion(endpoint, model, messages, create, executor)
+
+
+def stream_chat_completion(endpoint, messages, model="gpt-3.5-turbo"):
+    """app.stream_chat_completion as an async iterator."""
+    async def create_stream():
+        chunks = 0
+        async with observe_llm_call(endpoint):
+            async for content in llm_client.stream(model, messages):
+                chunks += 1
+                yield content
+        LLM_TOKENS.inc((endpoint, 'completion'), chunks)
+    return llm_cache.astream_completion(endpoint, model, messages, create_stream, executor)
+
+
+def to_web_response(response):
+    headers = CIMultiDict((k, v) for k, v in response.headers.items() if k.lower() != 'content-length')
+    return web.Response(body=response.get_data(), status=response.status_code, headers=headers)
+
+
+def authenticate(authorization):
+    """(user_id, None) for a valid token, else (None, the response app.py's JWT handlers give)."""
+    with app.test_request_context(headers={'Authorization': authorization} if authorization else {}):
+        try:
+            verify_jwt_in_request()
+        except Exception as e:
+            return None, to_web_response(app.make_response(app.handle_user_exception(e)))
+        return int(get_jwt_identity()), None
+
+
+def jwt_required(handler):
+    async def wrapper(request):
+        user_id, error = await run_sync(authenticate, request.headers.get('Authorization'))
+        if error is not None:
+            return error
+        return await handler(request, user_id)
+    return wrapper
+
+
+async def json_body(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def sse_response(request):
+    response = web.StreamResponse(headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.content_type = 'text/event-stream'
+    response.charset = 'utf-8'
+    await response.prepare(request)
+    return response
+
+
+async def send_event(response, event, data):
+    await response.write(sse_event(event, data).encode())
+
+
+class EvaluationRunner:
+    """Claims queued evaluation jobs and grades them on the event loop, `concurrency` at a time."""
+
+    def __init__(self, concurrency, poll_interval=2.0):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks = set()
+        self._waiters = {}  # job_id -> [event, number of requests waiting on it]
+
+    def start(self):
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in [self._task, *self._tasks]:
+            task.cancel()
+        for task in [self._task, *self._tasks]:
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def wait_for_job(self, job_id, timeout):
+        """Wait until this process finishes `job_id` or `timeout` expires."""
+        waiter = self._waiters.setdefault(job_id, [asyncio.Event(), 0])
+        waiter[1] += 1
+        try:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(waiter[0].wait(), timeout)
+        finally:
+            waiter[1] -= 1
+            if not waiter[1] and self._waiters.get(job_id) is waiter:
+                del self._waiters[job_id]
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            # Cleared before claiming, so a job enqueued from here on wakes the wait below
+            self._wakeup.clear()
+            try:
+                job = await run_sync(claim_job)
+            except Exception:
+                logger.exception("Error claiming evaluation job")
+                job = None
+            if job is None:
+                self._slots.release()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                continue
+            task = asyncio.create_task(self._evaluate(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _evaluate(self, job):
+        back_off = False
+        try:
+            feedback = await chat_completion('evaluate', evaluation_messages(job['question'], job['answer'], job['role']))
+            await run_sync(finish_job, job['id'], job['claimed_at'], feedback)
+        except Exception as e:
+            try:
+                back_off = not await run_sync(fail_job, job['id'], job['claimed_at'], e)
+            except Exception:
+                logger.exception("Error recording evaluation failure", extra={'job_id': job['id']})
+        finally:
+            waiter = self._waiters.pop(job['id'], None)
+            if waiter is not None:
+                waiter[0].set()
+        if back_off:
+            await asyncio.sleep(self.poll_interval)
+        self._slots.release()
+
+
+def claim_job():
+    job = claim_evaluation_job()
+    return job and {'id': job.id, 'question': job.question, 'answer': job.answer, 'role': job.role,
+                   'claimed_at': job.claimed_at}
+
+
+def finish_job(job_id, claimed_at, feedback):
+    complete_evaluation_job(db.session.get(EvaluationJob, job_id), claimed_at, feedback)
+
+
+def fail_job(job_id, claimed_at, error):
+    return evaluation_failed(db.session.get(EvaluationJob, job_id), claimed_at, error)
+
+
+def find_job(job_id, user_id):
+    job = EvaluationJob.query.filter_by(id=job_id, user_id=user_id).first()
+    return serialize_evaluation_job(job) if job else None
+
+
+def store_response(question, answer, role, user_id, reply):
+    new_response = store_evaluated_response(question, answer, role, user_id, reply)
+    db.session.commit()
+    return {'feedback': new_response.feedback, 'scores': serialize_scores(new_response),
+            'response_id': new_response.id}
+
+
+evaluations = EvaluationRunner(app.config['ASYNC_EVALUATION_CONCURRENCY'])
+
+
+async def get_question(request):
+    try:
+        role, difficulty = question_params(request.query)
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    try:
+        if not openai.api_key:
+            logger.error("OpenAI API key is not configured")
+            return web.json_response({"error": "OpenAI API key is not configured"}, status=500)
+
+        question = question_pool.get(role, difficulty)
+        if question is None:
+            if not app.config['QUESTION_POOL_SYNC_FALLBACK']:
+                return web.json_response({"error": "No questions ready yet, please retry shortly"}, status=503)
+            question = await chat_completion('questions', question_messages(role, difficulty))
+        return web.json_response({"question": question, "role": role, "difficulty": difficulty})
+    except LLMUnavailableError as e:
+        logger.warning("Question generation unavailable: %s", e)
+        return web.json_response({"error": "Question generation is temporarily unavailable, please retry shortly"},
+                                 status=503)
+    except Exception as e:
+        error_message = str(e)
+        logger.exception("Error generating question")
+        if "api_key" in error_message.lower():
+            return web.json_response({"error": "OpenAI API key is invalid or not configured properly"}, status=500)
+        return web.json_response({"error": f"Failed to generate question: {error_message}"}, status=500)
+
+
+async def stream_question(request):
+    try:
+        role, difficulty = question_params(request.query)
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    if not openai.api_key:
+        logger.error("OpenAI API key is not configured")
+        return web.json_response({"error": "OpenAI API key is not configured"}, status=500)
+
+    response = await sse_response(request)
+    try:
+        question = question_pool.get(role, difficulty)
+        if question is not None:
+            await send_event(response, 'token', {'content': question})
+        else:
+            parts = []
+            async for content in stream_chat_completion('questions', question_messages(role, difficulty)):
+                parts.append(content)
+                await send_event(response, 'token', {'content': content})
+            question = ''.join(parts)
+        await send_event(response, 'done', {"question": question, "role": role, "difficulty": difficulty})
+    except ConnectionResetError:
+        return response
+    except Exception as e:
+        logger.exception("Error streaming question")
+        await send_event(response, 'error', {"error": f"Failed to generate question: {str(e)}"})
+    return response
+
+
+@jwt_required
+async def evaluate(request, user_id):
+    data = await json_body(request) or {}
+    question = data.get('question')
+    answer = data.get('answer')
+    role = data.get('role', 'SDE')
+
+    if not question or not answer:
+        return web.json_response({"error": "Missing question or answer"}, status=400)
+
+    try:
+        job = await run_sync(lambda: serialize_evaluation_job(enqueue_evaluation_job(user_id, question, answer, role)))
+    except Exception as e:
+        return web.json_response({"error": str(e)}, status=500)
+    evaluations.notify()
+    return web.json_response(job, status=202, headers={'Location': f"/api/evaluate/{job['job_id']}"})
+
+
+@jwt_required
+async def get_evaluation_job(request, user_id):
+    job_id = request.match_info['job_id']
+    # Long-poll: ?wait=<seconds> holds the request until the job finishes
+    try:
+        wait = float(request.query.get('wait', 0))
+    except ValueError:
+        wait = 0
+    wait = min(max(wait, 0), app.config['EVALUATION_MAX_WAIT_SECONDS'])
+    deadline = time.monotonic() + wait
+
+    while True:
+        job = await run_sync(find_job, job_id, user_id)
+        if job is None:
+            return web.json_response({"error": "Evaluation job not found"}, status=404)
+        remaining = deadline - time.monotonic()
+        if job['status'] in ('done', 'failed') or remaining <= 0:
+            return web.json_response(job)
+        # Jobs graded by other processes are seen on the next poll
+        await evaluations.wait_for_job(job_id, min(remaining, 1.0))
+
+
+@jwt_required
+async def stream_evaluation(request, user_id):
+    data = await json_body(request) or {}
+    question = data.get('question')
+    answer = data.get('answer')
+    role = data.get('role', 'SDE')
+
+    if not question or not answer:
+        return web.json_response({"error": "Missing question or answer"}, status=400)
+
+    response = await sse_response(request)
+    parts = []
+    try:
+        async for content in stream_chat_completion('evaluate', evaluation_messages(question, answer, role)):
+            parts.append(content)
+            await send_event(response, 'token', {'content': content})
+        # Persisted only once the stream has finished; a client that
+        # disconnects midway fails a write before this point
+        done = await run_sync(store_response, question, answer, role, user_id, ''.join(parts))
+        await send_event(response, 'done', done)
+    except ConnectionResetError:
+        return response
+    except Exception as e:
+        logger.exception("Error streaming evaluation")
+        await send_event(response, 'error', {"error": str(e)})
+    return response
+
+
+@jwt_required
+async def generate_mcq(request, user_id):
+    try:
+        try:
+            role, topic, difficulty, count = mcq_generation_params(await json_body(request) or {})
+        except ValueError as e:
+            return web.json_response({'message': str(e)}, status=400)
+
+        if not openai.api_key:
+            return web.json_response({'message': 'OpenAI API key not configured'}, status=500)
+
+        # app.generate_mcqs, awaiting each batch
+        rows, seen, dropped = [], set(), 0
+        for _ in range(1 + app.config['MCQ_GENERATION_RETRIES']):
+            missing = count - len(rows)
+            if missing <= 0:
+                break
+            content = await chat_completion('mcq_generation', mcq_generation_messages(role, topic, difficulty, missing))
+            dropped += collect_mcq_rows(parse_generated_mcqs(content), role, topic, difficulty, rows, seen)
+        rows = rows[:count]
+        if not rows:
+            return web.json_response({'message': 'The model did not return any valid MCQs'}, status=502)
+
+        return web.json_response(await run_sync(store_generated_mcqs, rows, count, dropped))
+    except LLMUnavailableError as e:
+        logger.warning("MCQ generation unavailable: %s", e)
+        return web.json_response({'message': 'MCQ generation is temporarily unavailable, please retry shortly'},
+                                 status=503)
+    except Exception:
+        logger.exception("Error generating MCQ")
+        return web.json_response({'message': 'Error generating MCQ'}, status=500)
+
+
+# Served here; the label is the Flask rule, so metrics and logs name routes as app.py does
+ROUTES = [
+    ('GET', '/api/questions', get_question),
+    ('GET', '/api/questions/stream', stream_question),
+    ('POST', '/api/evaluate', evaluate),
+    ('POST', '/api/evaluate/stream', stream_evaluation),
+    ('GET', '/api/evaluate/<string:job_id>', get_evaluation_job),
+    ('POST', '/api/mcq/generate', generate_mcq),
+]
+route_labels = {}
+
+
+def _call_wsgi(environ):
+    started = []
+    result = app(environ, lambda status, headers, exc_info=None: started.extend((status, headers)))
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return started[0], started[1], body
+
+
+async def call_flask(request):
+    """Serve any other route with the Flask app, on the executor."""
+    environ = EnvironBuilder(
+        path=request.path, method=request.method, headers=list(request.headers.items()),
+        query_string=request.query_string, data=await request.read(),
+        environ_base={'REMOTE_ADDR': request.remote or ''}
+    ).get_environ()
+    status, headers, body = await asyncio.get_running_loop().run_in_executor(executor, _call_wsgi, environ)
+    code, _, reason = status.partition(' ')
+    headers = CIMultiDict((k, v) for k, v in headers if k.lower() != 'content-length')
+    return web.Response(body=body, status=int(code), reason=reason, headers=headers)
+
+
+@web.middleware
+async def track_requests(request, handler):
+    route = route_labels.get(request.match_info.route)
+    if route is None:
+        # The Flask app's request hooks track the routes it serves
+        return await handler(request)
+    metrics.start()
+    rid = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    request_id.set(rid)
+    request['request_id'] = rid
+    timings = {'db': 0.0, 'llm': 0.0}
+    request_timings.set(timings)
+    REQUESTS_IN_FLIGHT.inc((route,))
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        record_request(request.method, route, status, time.perf_counter() - start, timings)
+
+
+async def add_response_headers(request, response):
+    rid = request.get('request_id')
+    if rid is None:
+        return
+    response.headers['X-Request-ID'] = rid
+    # What flask_cors adds to the Flask app's responses; preflight requests are answered by the Flask app
+    origin = request.headers.get('Origin')
+    if origin in CORS_SETTINGS['origins']:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Expose-Headers'] = ', '.join(CORS_SETTINGS['expose_headers'])
+        if CORS_SETTINGS['supports_credentials']:
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+        response.headers['Vary'] = 'Origin'
+
+
+async def start_background_work(web_app):
+    metrics.start()
+    # Jobs are graded on the event loop here, not by app.py's worker threads
+    evaluation_workers.num_workers = 0
+    evaluations.start()
+
+
+async def stop_background_work(web_app):
+    await evaluations.stop()
+    await llm_client.close()
+
+
+def create_app():
+    web_app = web.Application(middlewares=[track_requests])
+    for method, rule, handler in ROUTES:
+        route = web_app.router.add_route(method, re.sub(r'<(?:\w+:)?(\w+)>', r'{\1}', rule), handler)
+        route_labels[route] = rule
+    web_app.router.add_route('*', '/{tail:.*}', call_flask)
+    web_app.on_response_prepare.append(add_response_headers)
+    web_app.on_startup.append(start_background_work)
+    web_app.on_cleanup.append(stop_background_work)
+    return web_app
+
+
+web_app = create_app()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    init_db()
+    clear_directory(app.config['METRICS_DIR'])
+    web.run_app(web_app, host=args.host, port=args.port, access_log=None)
@@ -0,0 +1,82 @@
+"""Backfill the score columns of responses stored before they existed.
+
+    python backfill_scores.py [--batch-size 1000] [--after-id 0] [--rescore]
+
+Walks the responses table in id order, parses each unscored row's feedback
+with grading.parse_grading and writes the scores back, along with the
+per-user aggregates leaderboards and profiles read, one short transaction per
+batch so the server keeps writing in between. Old feedback
+has no JSON line, so these rows get the overall score only, from the
+"Score: 7/10" the old prompt asked for. The feedback text itself is left
+as it is. Stop it at any time and resume with --after-id set to the last
+id printed.
+"""
+import argparse
+import time
+from app import app, db, init_db
+from grading import SUB_SCORES, parse_grading, score_column
+from leaderboard import record_score_days
+
+def backfill_batch(after_id, batch_size, rescore=False):
+    """Score the next batch of rows after `after_id`; returns (last id seen or None, rows scored)."""
+    rows = db.session.execute(db.text(
+        "SELECT id, feedback, score, user_id, role, "
+        "CAST(julianday(created_at) - julianday('1970-01-01') AS INTEGER) FROM responses WHERE id > :after"
+        + ("" if rescore else " AND score IS NULL")
+        + " ORDER BY id LIMIT :limit"
+    ), {'after': after_id, 'limit': batch_size}).all()
+    if not rows:
+        return None, 0
+
+    columns = [score_column(name) for name in ('score',) + SUB_SCORES]
+    updates = []
+    days = []
+    for response_id, feedback, old_score, user_id, role, day in rows:
+        _, scores = parse_grading(feedback)
+        if scores['score'] is not None:
+            updates.append(dict({score_column(name): value for name, value in scores.items()}, id=response_id))
+            if user_id is not None:
+                # A rescored row only moves its day's total
+                days.append({'role': role, 'user_id': user_id, 'day': day, 'responses': int(old_score is None),
+                             'score_total': scores['score'] - (old_score or 0)})
+    if updates:
+        db.session.execute(db.text(
+            f"UPDATE responses SET {', '.join(f'{column} = :{column}' for column in columns)} WHERE id = :id"
+        ), updates)
+    if days:
+        record_score_days(db.session, days)
+        db.session.execute(db.text(
+            "UPDATE user_stats SET scored_responses = scored_responses + :responses, "
+            "score_total = score_total + :score_total WHERE user_id = :user_id"
+        ), days)
+    db.session.commit()
+    return rows[-1][0], len(updates)
+
+def backfill(batch_size=1000, after_id=0, rescore=False):
+    init_db()
+    with app.app_context():
+        start = time.perf_counter()
+        batches = scored = 0
+        try:
+            while True:
+                last_id, batch_scored = backfill_batch(after_id, batch_size, rescore)
+                if last_id is None:
+                    break
+                after_id = last_id
+                scored += batch_scored
+                batches += 1
+                if batches % 100 == 0:
+                    print(f"Scored {scored} responses so far (up to id {after_id})")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error backfilling scores after id {after_id}: {str(e)}")
+            raise
+        print(f"Scored {scored} responses in {time.perf_counter() - start:.1f}s (up to id {after_id})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows read per transaction")
+    parser.add_argument('--after-id', type=int, default=0, help="Resume after this response id")
+    parser.add_argument('--rescore', action='store_true', help="Also re-parse rows that already have a score")
+    args = parser.parse_args()
+    backfill(args.batch_size, args.after_id, args.rescore)
@@ -0,0 +1,164 @@
+"""Benchmark interview sessions served by one process: threaded Flask app vs async_app.py.
+
+    python bench_async.py [--sessions 50 200 500] [--duration 30] [--llm-latency-ms 1000]
+
+Seeds a scratch database with `--users` users and starts a fake_openai.py
+server that answers every completion after `--llm-latency-ms`. For each
+mode it starts one server process:
+
+- "sync": `gunicorn app:app`, gthread worker with `--server-threads` threads
+  and EVALUATION_WORKERS=`--server-threads`.
+- "async": `gunicorn async_app:web_app` with the aiohttp worker.
+
+Then, for each count in `--sessions`, that many concurrent clients each run
+interview sessions back to back for `--duration` seconds. A session asks
+for a question, submits an answer and long-polls the evaluation job until
+it is graded, then generates MCQs. Every session makes three LLM calls.
+LLM_MAX_CONCURRENCY is raised for both modes, so the server is the only
+limit, and the LLM cache is off, so every call reaches the fake server.
+Both servers keep idle connections open for 75s, longer than a long poll.
+
+Reports completed sessions/s, session p50/p95, failed sessions, and the
+peak number of completions the fake server had in flight. That peak is how
+many sessions the process kept waiting on the LLM at once.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+import numpy as np
+
+from fake_openai import start_fake_openai
+from loadtest import ANSWER, free_port, wait_until_up
+from seed_data import LOADTEST_PASSWORD, ROLES, TOPICS
+
+MODES = ('sync', 'async')
+
+
+class SessionFailed(Exception):
+    pass
+
+
+async def call(http, method, url, expect, **kwargs):
+    async with http.request(method, url, **kwargs) as response:
+        body = await response.json(content_type=None)
+        if response.status not in expect:
+            raise SessionFailed(f'{method} {url} -> {response.status}')
+        return body
+
+
+async def interview_session(http, base_url, headers, rng):
+    role = rng.choice(ROLES)
+    body = await call(http, 'GET', base_url + '/api/questions', (200,), headers=headers,
+                      params={'role': role, 'difficulty': rng.choice(('easy', 'medium', 'hard'))})
+    job = await call(http, 'POST', base_url + '/api/evaluate', (202,), headers=headers,
+                     json={'question': body['question'], 'answer': ANSWER, 'role': role})
+    while job['status'] not in ('done', 'failed'):
+        job = await call(http, 'GET', f"{base_url}/api/evaluate/{job['job_id']}", (200,), headers=headers,
+                         params={'wait': 30})
+    if job['status'] != 'done':
+        raise SessionFailed('evaluation failed')
+    await call(http, 'POST', base_url + '/api/mcq/generate', (200,), headers=headers,
+               json={'role': role, 'topic': rng.choice(TOPICS), 'difficulty': 'medium', 'count': 2})
+
+
+async def client_loop(http, base_url, headers, deadline, samples, seed):
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            await interview_session(http, base_url, headers, rng)
+            ok = True
+        except (SessionFailed, aiohttp.ClientError, asyncio.TimeoutError, KeyError):
+            ok = False
+        # Sessions still running at the deadline finish, but don't count
+        if time.monotonic() <= deadline:
+            samples.append(((time.perf_counter() - start) * 1000, ok))
+
+
+async def log_in(http, base_url, users):
+    tokens = []
+    for i in range(users):
+        body = await call(http, 'POST', base_url + '/api/auth/login', (200,),
+                          json={'email': f'loadtest{i + 1}@example.com', 'password': LOADTEST_PASSWORD})
+        tokens.append(body['token'])
+    return tokens
+
+
+async def run_sessions(base_url, sessions, duration, users):
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+        tokens = await log_in(http, base_url, users)
+        samples = []
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(
+            client_loop(http, base_url, {'Authorization': f'Bearer {tokens[n % len(tokens)]}'}, deadline, samples, n)
+            for n in range(sessions)
+        ))
+    return samples
+
+
+def server_command(mode, threads):
+    if mode == 'sync':
+        return ['app:app', '--worker-class', 'gthread', '--threads', str(threads)]
+    return ['async_app:web_app', '--worker-class', 'aiohttp.GunicornWebWorker']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--llm-latency-ms', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--server-threads', type=int, default=32)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-async-')
+    database = os.path.join(workdir, 'async.db')
+    backend = os.path.dirname(os.path.abspath(__file__))
+    fake = start_fake_openai(latency_ms=args.llm_latency_ms, token_ms=0)
+    env = dict(os.environ, SQLITE_PROFILE='production', LLM_CACHE_ENABLED='false', LOG_LEVEL='WARNING',
+               LLM_CACHE_PATH=os.path.join(workdir, 'llm_cache.db'), METRICS_DIR=os.path.join(workdir, 'metrics'),
+               OPENAI_API_BASE=fake.url, OPENAI_API_KEY='fake', QUESTION_POOL_SIZE='0',
+               QUESTION_POOL_LOW_WATER='0', LLM_MAX_CONCURRENCY='10000', ASYNC_LLM_MAX_CONCURRENCY='10000',
+               ASYNC_EVALUATION_CONCURRENCY='10000', PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    subprocess.run([sys.executable, 'seed_data.py', '--database', database, '--users', str(args.users),
+                    '--responses', '0', '--mcqs', '0'], cwd=backend, env=env, check=True, stdout=subprocess.DEVNULL)
+    env['DATABASE_URL'] = 'sqlite:///' + database
+    print(f"LLM latency {args.llm_latency_ms}ms, 3 LLM calls per session, one server process, "
+          f"{args.server_threads} threads in sync mode, {os.cpu_count()} CPUs")
+    print(f"{'mode':<6} {'sessions':>8} {'done/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7} {'LLM peak':>9}")
+
+    for mode in args.modes:
+        port = free_port()
+        log = open(os.path.join(workdir, f'server-{mode}.log'), 'w')
+        server = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', '1',
+            '--timeout', '120', '--keep-alive', '75', *server_command(mode, args.server_threads)
+        ], cwd=backend, env=dict(env, EVALUATION_WORKERS=str(args.server_threads)), stdout=log, stderr=subprocess.STDOUT)
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            wait_until_up(base_url + '/api/health', server)
+            for sessions in args.sessions:
+                with fake.lock:
+                    fake.counters['max_in_flight'] = fake.counters['in_flight']
+                samples = asyncio.run(run_sessions(base_url, sessions, args.duration, args.users))
+                latencies = [latency for latency, ok in samples if ok]
+                failed = len(samples) - len(latencies)
+                p50, p95 = np.percentile(latencies, [50, 95]) if latencies else (float('nan'), float('nan'))
+                print(f"{mode:<6} {sessions:>8} {len(latencies) / args.duration:>7.1f} {p50:>8.0f} {p95:>8.0f}"
+                      f" {failed:>7} {fake.counters['max_in_flight']:>9}")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark building and reading leaderboards with many users.
+
+    python bench_leaderboard.py [--users 1000000] [--days 3] [--changed 1000] [--samples 200]
+
+Fills a scratch database's user_score_days with `--days` random days of
+scores in the last 60 for each of `--users` users, each in one role, then
+reports:
+
+- rebuild: a full build of every role's boards from scratch, and the
+  memory the boards take.
+- refresh: an incremental refresh after `--changed` users each store one
+  more scored response.
+- p50/p95/p99 latency of a user's rank and percentile (entry), of a page
+  of the leaderboard (top) and of GET /api/leaderboard/<role>/me, all
+  served from the snapshot.
+- sql: the same rank and percentile computed on demand with one query
+  over the role's aggregates, for comparison.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from seed_data import ROLES
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=3, help="Days with scores per user")
+    parser.add_argument('--changed', type=int, default=1000, help="Users with new responses before the refresh")
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=100000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'leaderboard.db')
+    os.environ.setdefault('SQLITE_PROFILE', 'production')
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+    from app import app, db, init_db, leaderboards, store_evaluated_response
+    from leaderboard import Leaderboards, record_score_days, score_day
+
+    rng = random.Random(13)
+    today = score_day(datetime.utcnow())
+    role_of = [rng.choice(ROLES) for _ in range(args.users + 1)]
+    init_db()
+    with app.app_context():
+        start = time.perf_counter()
+        for first in range(1, args.users + 1, args.batch_size):
+            rows = []
+            for user_id in range(first, min(first + args.batch_size, args.users + 1)):
+                for day in rng.sample(range(today - 59, today + 1), args.days):
+                    responses = rng.randint(1, 4)
+                    rows.append({'role': role_of[user_id], 'user_id': user_id, 'day': day, 'responses': responses,
+                                 'score_total': sum(rng.randint(2, 10) for _ in range(responses))})
+            record_score_days(db.session, rows)
+            db.session.commit()
+        print(f"users={args.users} days={args.days} filled in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        leaderboards.refresh(full=True)
+        elapsed = time.perf_counter() - start
+        size = sum(getattr(board, name).nbytes for board in leaderboards._boards.values()
+                   for name in ('user_ids', 'responses', 'totals', 'order', 'rank_of', 'ranked_averages'))
+        print(f"rebuild   {elapsed:.2f}s, {len(leaderboards._boards)} boards, {size / 2 ** 20:.0f} MiB")
+
+        changed = rng.sample(range(1, args.users + 1), args.changed)
+        for user_id in changed:
+            store_evaluated_response('Question?', 'Answer.', role_of[user_id], user_id,
+                                     f'Good.\n{{"score": {rng.randint(2, 10)}}}')
+        db.session.commit()
+        start = time.perf_counter()
+        leaderboards.refresh()
+        print(f"refresh   {(time.perf_counter() - start) * 1000:.0f}ms ({args.changed} users changed)")
+
+        check = Leaderboards(db.engine.begin, leaderboards.min_responses)
+        check.refresh()
+        assert all(check._boards[key].top(0, 1000) == board.top(0, 1000)
+                   for key, board in leaderboards._boards.items())
+
+    with app.app_context(), app.test_request_context():
+        from flask_jwt_extended import create_access_token
+        client = app.test_client()
+        since = today - 29
+
+        def me():
+            user_id = rng.randint(1, args.users)
+            token = create_access_token(identity=str(user_id))
+            response = client.get(f'/api/leaderboard/{role_of[user_id]}/me',
+                                  headers={'Authorization': f'Bearer {token}'})
+            assert response.status_code in (200, 404), response.get_json()
+
+        def sql():
+            user_id = rng.randint(1, args.users)
+            return db.session.execute(db.text(
+                "WITH averages AS (SELECT user_id, SUM(score_total) * 1.0 / SUM(responses) AS average "
+                "FROM user_score_days WHERE role = :role AND day >= :since GROUP BY user_id "
+                "HAVING SUM(responses) >= :min_responses) "
+                "SELECT (SELECT COUNT(*) FROM averages WHERE average > mine.average), "
+                "(SELECT COUNT(*) FROM averages WHERE average <= mine.average), (SELECT COUNT(*) FROM averages) "
+                "FROM averages AS mine WHERE user_id = :user_id"
+            ), {'role': role_of[user_id], 'since': since, 'min_responses': leaderboards.min_responses,
+                'user_id': user_id}).all()
+
+        cases = {
+            'entry': lambda: leaderboards.board(rng.choice(ROLES), '30d').entry(rng.randint(1, args.users)),
+            'top': lambda: leaderboards.board(rng.choice(ROLES), '30d').top(rng.randrange(0, 10000), 20),
+            'me': me,
+            'sql': sql,
+        }
+        for name, case in cases.items():
+            timings = []
+            for _ in range(args.samples if name != 'sql' else min(args.samples, 10)):
+                start = time.perf_counter()
+                case()
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{name:<9} p50={percentile(timings, 50):.3f}ms p95={percentile(timings, 95):.3f}ms "
+                  f"p99={percentile(timings, 99):.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark login throughput at N concurrent clients, hashing inline vs on the process pool.
+
+    python bench_login.py [--clients 1 8 32] [--duration 15] [--pool-workers 2]
+
+Seeds a scratch database with `--users` users, then for each hashing mode
+starts the app under gunicorn and, for each client count, has that many
+clients log in back to back for `--duration` seconds. Meanwhile one more
+client requests a roadmap in a loop, to show what a login storm does to
+the rest of the API. Reports logins/s, login p50/p95, how many logins were
+turned away with 503, and the bystander's p50/p95.
+
+"inline" runs with PASSWORD_HASH_WORKERS=0 (hashing in the request thread,
+as before the pool); "pool" with `--pool-workers` hashing processes.
+`--method` sets PASSWORD_HASH_METHOD for both.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+from loadtest import free_port, wait_until_up
+from seed_data import LOADTEST_PASSWORD
+
+MODES = ('inline', 'pool')
+
+
+def timed(samples, send):
+    start = time.perf_counter()
+    try:
+        status = send().status_code
+    except requests.RequestException:
+        status = 0
+    samples.append(((time.perf_counter() - start) * 1000, status))
+
+
+def login_loop(base_url, deadline, samples, users, offset):
+    session = requests.Session()
+    i = offset
+    while time.monotonic() < deadline:
+        i += 1
+        body = {'email': f'loadtest{i % users + 1}@example.com', 'password': LOADTEST_PASSWORD}
+        timed(samples, lambda: session.post(base_url + '/api/auth/login', json=body, timeout=60))
+
+
+def bystander_loop(base_url, deadline, samples):
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        timed(samples, lambda: session.get(base_url + '/api/roadmap/software-engineer', timeout=60))
+
+
+def run_clients(base_url, clients, duration, users):
+    logins, bystander = [], []
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=login_loop, args=(base_url, deadline, logins, users, n * 7919))
+               for n in range(clients)]
+    threads.append(threading.Thread(target=bystander_loop, args=(base_url, deadline, bystander)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return logins, bystander
+
+
+def percentiles(samples, status=None):
+    latencies = [latency for latency, s in samples if status is None or s == status]
+    if not latencies:
+        return float('nan'), float('nan')
+    return tuple(np.percentile(latencies, [50, 95]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--pool-workers', type=int, default=2)
+    parser.add_argument('--max-queue', type=int, default=32)
+    parser.add_argument('--method', default='pbkdf2:sha256:600000')
+    parser.add_argument('--server-workers', type=int, default=1)
+    parser.add_argument('--server-threads', type=int, default=32)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-login-')
+    database = os.path.join(workdir, 'login.db')
+    backend = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PASSWORD_HASH_METHOD=args.method, PASSWORD_HASH_MAX_QUEUE=str(args.max_queue),
+               SQLITE_PROFILE='production', LLM_CACHE_PATH=os.path.join(workdir, 'llm_cache.db'),
+               METRICS_DIR=os.path.join(workdir, 'metrics'), LOG_LEVEL='WARNING')
+    subprocess.run([sys.executable, 'seed_data.py', '--database', database, '--users', str(args.users),
+                    '--responses', '0', '--mcqs', '0'], cwd=backend, env=env, check=True, stdout=subprocess.DEVNULL)
+    env['DATABASE_URL'] = 'sqlite:///' + database
+    print(f"{args.users} users hashed with {args.method}, {args.server_workers} gunicorn worker(s) x "
+          f"{args.server_threads} threads, {os.cpu_count()} CPUs")
+    print(f"{'mode':<8} {'clients':>7} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'503s':>6}"
+          f" {'other p50':>10} {'other p95':>10}")
+
+    for mode in args.modes:
+        workers = 0 if mode == 'inline' else args.pool_workers
+        port = free_port()
+        log = open(os.path.join(workdir, f'server-{mode}.log'), 'w')
+        server = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(args.server_workers),
+            '--worker-class', 'gthread', '--threads', str(args.server_threads), '--timeout', '120', 'app:app'
+        ], cwd=backend, env=dict(env, PASSWORD_HASH_WORKERS=str(workers)), stdout=log, stderr=subprocess.STDOUT)
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            wait_until_up(base_url + '/api/health', server)
+            # Start the hashing pool (and warm the connection pool) before timing anything
+            run_clients(base_url, 1, 1, args.users)
+            for clients in args.clients:
+                logins, bystander = run_clients(base_url, clients, args.duration, args.users)
+                succeeded = sum(1 for _, status in logins if status == 200)
+                rejected = sum(1 for _, status in logins if status == 503)
+                p50, p95 = percentiles(logins, 200)
+                other_p50, other_p95 = percentiles(bystander)
+                print(f"{mode:<8} {clients:>7} {succeeded / args.duration:>9.1f} {p50:>8.0f} {p95:>8.0f} {rejected:>6}"
+                      f" {other_p50:>10.1f} {other_p95:>10.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark near-duplicate checks as the question bank grows.
+
+    python bench_near_duplicates.py [--sizes 10000 50000 100000 200000] [--probes 200]
+
+Fills a scratch database with synthetic MCQs through store_mcq_rows (the
+bulk import path), and at each size times the LSH lookup for a batch of probe
+questions: half are paraphrases of stored questions (one word swapped, extra
+punctuation), half are new. The same probes are then checked by a linear scan
+over every stored signature, which is what the index saves us from. Recall is
+the share of planted paraphrases each method finds.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+WORDS = ('cache latency index queue thread process memory heap stack pointer buffer socket '
+         'request response server client token session cookie schema table query join shard '
+         'replica leader follower consensus quorum partition stream batch window watermark '
+         'metric trace log alert budget roadmap stakeholder sprint backlog epic feature metric '
+         'retention churn funnel cohort experiment variant hypothesis regression gradient loss '
+         'tensor vector embedding cluster outlier sample bias variance kernel lock mutex '
+         'semaphore deadlock scheduler interrupt compiler parser lexer closure iterator generator '
+         'hash tree graph heapify trie bloom filter sketch bitmap encoder decoder pipeline').split()
+ROLES = ('sde', 'pm', 'data-scientist')
+
+def synthetic_mcq(rng, i):
+    question = f"Q{i}: how does the {' '.join(rng.choices(WORDS, k=rng.randint(6, 12)))} affect the {rng.choice(WORDS)}?"
+    return {
+        'role': rng.choice(ROLES),
+        'topic': rng.choice(WORDS),
+        'difficulty': rng.choice(('easy', 'medium', 'hard')),
+        'question': question,
+        'options': {key: ' '.join(rng.choices(WORDS, k=3)) for key in 'ABCD'},
+        'correct_answer': 'A',
+        'explanation': None,
+    }
+
+def paraphrase(rng, row):
+    words = row['question'].rstrip('?').split()
+    words[rng.randrange(1, len(words))] = rng.choice(WORDS)
+    return dict(row, question=' '.join(words) + ' ??')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000])
+    parser.add_argument('--probes', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'near_duplicates.db')
+    os.environ.setdefault('SQLITE_PROFILE', 'production')
+    import numpy as np
+    from app import app, db, init_db, store_mcq_rows, near_duplicate_index
+    from mcq_validation import mcq_content_hash
+    from near_duplicates import NUM_PERM, load_signature
+
+    def with_hash(row):
+        return dict(row, content_hash=mcq_content_hash(row['role'], row['question'], row['options']))
+
+    rng = random.Random(7)
+    init_db()
+    stored = []
+    with app.app_context():
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            added = 0
+            while len(stored) < size:
+                batch = [synthetic_mcq(rng, len(stored) + i) for i in range(min(args.batch_size, size - len(stored)))]
+                inserted, _, _ = store_mcq_rows([with_hash(row) for row in batch], action='off')
+                db.session.commit()
+                stored.extend(batch)
+                added += inserted
+            fill = time.perf_counter() - start
+
+            planted = [paraphrase(rng, rng.choice(stored)) for _ in range(args.probes // 2)]
+            fresh = [synthetic_mcq(rng, -i - 1) for i in range(args.probes - len(planted))]
+            items = [(row['role'], row['question'], row['options']) for row in planted + fresh]
+
+            start = time.perf_counter()
+            matches, signatures = near_duplicate_index.check_batch(db.session, items)
+            lsh = time.perf_counter() - start
+            lsh_found = sum(1 for match in matches[:len(planted)] if match)
+            lsh_fresh = sum(1 for match in matches[len(planted):] if match)
+
+            start = time.perf_counter()
+            ids, blobs = zip(*db.session.execute(db.text('SELECT mcq_id, signature FROM mcq_signatures')))
+            matrix = np.stack([load_signature(blob) for blob in blobs])
+            scan_found = 0
+            for sig in signatures[:len(planted)]:
+                scan_found += bool(((matrix == sig).sum(axis=1) / NUM_PERM >= near_duplicate_index.threshold).any())
+            for sig in signatures[len(planted):]:
+                (matrix == sig).sum(axis=1)
+            scan = time.perf_counter() - start
+
+            print(f"size={len(stored)} fill={added / fill:.0f} rows/s "
+                  f"lsh={lsh / len(items) * 1000:.2f} ms/question recall={lsh_found}/{len(planted)} fresh_matched={lsh_fresh} "
+                  f"scan={scan / len(items) * 1000:.2f} ms/question recall={scan_found}/{len(planted)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark picking the next practice question and recording answers, at 10k MCQs x 100k users.
+
+    python bench_practice.py [--mcqs 10000] [--users 100000] [--history 20] [--heavy-users 50] [--heavy-history 2000]
+
+Fills a scratch database with MCQs spread over the roles, topics and
+difficulties, and gives every user `--history` answered questions of one
+role: their attempts, review schedules (due dates spread over the month
+around now) and topic mastery. `--heavy-users` users instead get
+`--heavy-history` each. Then reports p50/p95/p99 latency, for typical and
+heavy users separately, of:
+
+- next: next_practice_mcq, a seek in the due-date index plus, when nothing
+  is due, a seek for an unanswered question in the weakest topic.
+- scan: the same pick without the schedule tables, by replaying the user's
+  whole attempt history, which grows with the user.
+- answer: recording one answer (attempt, mastery and schedule) and committing.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from seed_data import ROLES, TOPICS, DIFFICULTIES
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def timestamp(dt):
+    return dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mcqs', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--history', type=int, default=20, help="Answered questions per user")
+    parser.add_argument('--heavy-users', type=int, default=50)
+    parser.add_argument('--heavy-history', type=int, default=2000)
+    parser.add_argument('--samples', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'practice.db')
+    os.environ.setdefault('SQLITE_PROFILE', 'production')
+    from app import (app, db, init_db, MCQ, MCQAttempt, next_practice_mcq, record_mcq_answers)
+    from practice import DEFAULT_EASE, schedule_review
+
+    rng = random.Random(5)
+    now = datetime.utcnow()
+    init_db()
+    with app.app_context():
+        start = time.perf_counter()
+        db.session.execute(db.text(
+            "INSERT INTO mcqs (role, question, options, correct_answer, explanation, difficulty, topic, created_at) "
+            "VALUES (:role, :question, '{\"A\": \"a\", \"B\": \"b\", \"C\": \"c\", \"D\": \"d\"}', 'A', '', "
+            ":difficulty, :topic, CURRENT_TIMESTAMP)"
+        ), [{'role': rng.choice(ROLES), 'question': f'Question {i}?', 'difficulty': rng.choice(DIFFICULTIES),
+             'topic': rng.choice(TOPICS)} for i in range(args.mcqs)])
+        mcqs_by_role = {role: [] for role in ROLES}
+        for mcq_id, role, topic in db.session.execute(db.text("SELECT id, role, topic FROM mcqs")):
+            mcqs_by_role[role].append((mcq_id, topic))
+
+        total_users = args.users + args.heavy_users
+        attempts, reviews, masteries = [], [], []
+        rows = 0
+
+        def flush():
+            if not attempts:
+                return
+            db.session.execute(db.text(
+                "INSERT INTO mcq_attempts (user_id, mcq_id, answer, is_correct, created_at) "
+                "VALUES (:user_id, :mcq_id, 'A', :is_correct, :at)"), attempts)
+            db.session.execute(db.text(
+                "INSERT INTO mcq_reviews (user_id, mcq_id, role, topic, repetitions, interval_seconds, ease, lapses, "
+                "due_at, last_reviewed_at) VALUES (:user_id, :mcq_id, :role, :topic, :repetitions, :interval, :ease, "
+                ":lapses, :due_at, :at)"), reviews)
+            db.session.execute(db.text(
+                "INSERT INTO topic_mastery (user_id, role, topic, attempts, correct, mastery, new_cursors, updated_at) "
+                "VALUES (:user_id, :role, :topic, :attempts, :correct, :mastery, '{}', :at)"), masteries)
+            db.session.commit()
+            attempts.clear()
+            reviews.clear()
+            masteries.clear()
+
+        db.session.execute(db.text("INSERT INTO users (name, email, password, created_at) VALUES "
+                                   "('user', 'bench' || :i || '@example.com', '-', CURRENT_TIMESTAMP)"),
+                           [{'i': i} for i in range(total_users)])
+        for user_id in range(1, total_users + 1):
+            role = ROLES[user_id % len(ROLES)]
+            history = args.history if user_id <= args.users else args.heavy_history
+            answered = rng.sample(mcqs_by_role[role], min(history, len(mcqs_by_role[role])))
+            per_topic = {}
+            for mcq_id, topic in answered:
+                at = now - timedelta(days=rng.uniform(1, 60))
+                correct = rng.random() < 0.7
+                repetitions, interval, ease, _ = schedule_review(0, 0.0, DEFAULT_EASE, correct, at)
+                due_at = now + timedelta(days=rng.uniform(-15, 15))
+                attempts.append({'user_id': user_id, 'mcq_id': mcq_id, 'is_correct': correct, 'at': timestamp(at)})
+                reviews.append({'user_id': user_id, 'mcq_id': mcq_id, 'role': role, 'topic': topic,
+                                'repetitions': repetitions, 'interval': interval, 'ease': ease,
+                                'lapses': int(not correct), 'due_at': timestamp(due_at), 'at': timestamp(at)})
+                counts = per_topic.setdefault(topic, [0, 0])
+                counts[0] += 1
+                counts[1] += correct
+            masteries.extend({'user_id': user_id, 'role': role, 'topic': topic, 'attempts': n, 'correct': c,
+                              'mastery': c / n, 'at': timestamp(now)} for topic, (n, c) in per_topic.items())
+            rows += len(answered)
+            if len(attempts) >= args.batch_size:
+                flush()
+        flush()
+        fill = time.perf_counter() - start
+        print(f"mcqs={args.mcqs} users={args.users}+{args.heavy_users} heavy, {rows} answered questions "
+              f"seeded in {fill:.1f}s")
+
+        def scan_history(user_id, role):
+            schedule = {}
+            for mcq_id, correct, at in db.session.query(MCQAttempt.mcq_id, MCQAttempt.is_correct, MCQAttempt.created_at)\
+                    .join(MCQ, MCQ.id == MCQAttempt.mcq_id)\
+                    .filter(MCQAttempt.user_id == user_id, MCQ.role == role)\
+                    .order_by(MCQAttempt.created_at):
+                repetitions, interval, ease, _ = schedule.get(mcq_id, (0, 0.0, DEFAULT_EASE, None))
+                schedule[mcq_id] = schedule_review(repetitions, interval, ease, correct, at)
+            due = min(((entry[3], mcq_id) for mcq_id, entry in schedule.items()), default=None)
+            if due is not None and due[0] <= now:
+                return due[1]
+            return db.session.query(MCQ.id).filter(MCQ.role == role, MCQ.id.notin_(list(schedule))).first()
+
+        def answer(user_id, role):
+            mcq = db.session.get(MCQ, rng.choice(mcqs_by_role[role])[0])
+            correct = rng.random() < 0.7
+            db.session.add(MCQAttempt(user_id=user_id, mcq_id=mcq.id, answer='A', is_correct=correct))
+            db.session.flush()
+            record_mcq_answers(user_id, [(mcq, correct)])
+
+        cases = {
+            'next': lambda user_id, role: next_practice_mcq(user_id, role, now=now),
+            'scan': scan_history,
+            'answer': answer,
+        }
+        groups = {'typical': (1, args.users), 'heavy': (args.users + 1, total_users)}
+        for group, (first, last) in groups.items():
+            if first > last:
+                continue
+            for name, case in cases.items():
+                timings = []
+                for _ in range(args.samples):
+                    user_id = rng.randint(first, last)
+                    start = time.perf_counter()
+                    case(user_id, ROLES[user_id % len(ROLES)])
+                    db.session.commit()
+                    timings.append((time.perf_counter() - start) * 1000)
+                    db.session.expunge_all()
+                print(f"{group:<8} {name:<7} p50={percentile(timings, 50):.2f}ms p95={percentile(timings, 95):.2f}ms "
+                      f"p99={percentile(timings, 99):.2f}ms")
+
+if __name__ == '__main__':
+    main()
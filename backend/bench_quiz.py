@@ -0,0 +1,110 @@
+"""Benchmark building a random quiz as the MCQ bank grows.
+
+    python bench_quiz.py [--sizes 10000,100000,1000000] [--count 20] [--seen 1000] [--samples 200]
+
+Grows a scratch MCQ bank to each size in turn (spread over the roles,
+topics and difficulties) and reports p50/p95/p99 latency of:
+
+- index: build_mcq_quiz's work, a stratified draw of `--count` ids from the
+  in-memory index plus one IN query for the rows.
+- exclude: the same for a user who has answered `--seen` questions of the
+  role, which are left out.
+- random: one ORDER BY RANDOM() query over the role's rows, unstratified.
+
+Also reports how long loading the index from scratch takes at each size.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from seed_data import ROLES, TOPICS, DIFFICULTIES
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--count', type=int, default=20, help="Questions per quiz")
+    parser.add_argument('--seen', type=int, default=1000, help="Answered questions of the excluding user")
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'quiz.db')
+    os.environ.setdefault('SQLITE_PROFILE', 'production')
+    from sqlalchemy import func
+    from app import app, db, init_db, MCQ, MCQReview, mcq_sample_index
+    from mcq_sampler import MCQSampleIndex
+
+    rng = random.Random(7)
+    role = ROLES[0]
+    init_db()
+    with app.app_context():
+        db.session.execute(db.text("INSERT INTO users (name, email, password, created_at) "
+                                   "VALUES ('user', 'bench@example.com', '-', CURRENT_TIMESTAMP)"))
+        db.session.commit()
+        total = 0
+        for size in (int(size) for size in args.sizes.split(',')):
+            start = time.perf_counter()
+            while total < size:
+                batch = min(args.batch_size, size - total)
+                db.session.execute(db.text(
+                    "INSERT INTO mcqs (role, question, options, correct_answer, explanation, difficulty, topic, "
+                    "created_at) VALUES (:role, :question, '{\"A\": \"a\", \"B\": \"b\", \"C\": \"c\", \"D\": \"d\"}', "
+                    "'A', '', :difficulty, :topic, CURRENT_TIMESTAMP)"
+                ), [{'role': rng.choice(ROLES), 'question': f'Question {total + i}?',
+                     'difficulty': rng.choice(DIFFICULTIES), 'topic': rng.choice(TOPICS)} for i in range(batch)])
+                db.session.commit()
+                total += batch
+
+            # The user's answers (at most half the role) are redrawn at each size
+            db.session.execute(db.text("DELETE FROM mcq_reviews"))
+            role_ids = [row[0] for row in db.session.query(MCQ.id).filter_by(role=role)]
+            seen = rng.sample(role_ids, min(args.seen, len(role_ids) // 2))
+            topics = dict(db.session.query(MCQ.id, MCQ.topic).filter(MCQ.id.in_(seen)).all()) if seen else {}
+            db.session.execute(db.text(
+                "INSERT INTO mcq_reviews (user_id, mcq_id, role, topic, repetitions, interval_seconds, ease, lapses, "
+                "due_at, last_reviewed_at) VALUES (1, :mcq_id, :role, :topic, 1, 86400, 2.5, 0, "
+                "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+            ), [{'mcq_id': mcq_id, 'role': role, 'topic': topics[mcq_id]} for mcq_id in seen])
+            db.session.commit()
+            print(f"mcqs={size} ({len(role_ids)} for {role}) filled in {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            MCQSampleIndex(db.engine.begin).refresh()
+            print(f"  index load  {(time.perf_counter() - start) * 1000:.0f}ms")
+            mcq_sample_index.invalidate()
+
+            def seen_ids(mcq_ids):
+                return {row[0] for row in db.session.query(MCQReview.mcq_id)
+                        .filter(MCQReview.user_id == 1, MCQReview.mcq_id.in_(mcq_ids))}
+
+            def from_index(exclude=None):
+                mcq_ids = mcq_sample_index.sample(role, args.count, exclude=exclude, rng=rng)
+                return MCQ.query.filter(MCQ.id.in_(mcq_ids)).all()
+
+            cases = {
+                'index': from_index,
+                'exclude': lambda: from_index(seen_ids),
+                'random': lambda: MCQ.query.filter_by(role=role).order_by(func.random()).limit(args.count).all(),
+            }
+            for name, case in cases.items():
+                timings = []
+                for _ in range(args.samples if name != 'random' else min(args.samples, 20)):
+                    start = time.perf_counter()
+                    mcqs = case()
+                    timings.append((time.perf_counter() - start) * 1000)
+                    db.session.expunge_all()
+                    assert len(mcqs) == args.count
+                print(f"  {name:<10}  p50={percentile(timings, 50):.2f}ms p95={percentile(timings, 95):.2f}ms "
+                      f"p99={percentile(timings, 99):.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
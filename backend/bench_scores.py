@@ -0,0 +1,96 @@
+"""Benchmark the score backfill and score analytics queries on a large responses table.
+
+    python bench_scores.py [--responses 1000000] [--users 10000] [--queries 50]
+
+Fills a scratch database with responses whose feedback ends in the
+"Score: N/10" the old evaluation prompt asked for, with the score columns
+empty, then times backfill_scores.py over all of them. Then reports
+p50/p95/p99 latency of:
+
+- user: one user's average and per-role averages (get_dashboard_scores).
+- roles: every role's average and score histogram (get_role_score_distribution).
+- reparse: the per-role averages without the columns, by reading and
+  parsing every response's feedback.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from seed_data import ROLES
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--responses', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'scores.db')
+    os.environ.setdefault('SQLITE_PROFILE', 'production')
+    from app import app, db, init_db
+    from backfill_scores import backfill
+    from grading import parse_grading
+
+    rng = random.Random(11)
+    init_db()
+    with app.app_context():
+        start = time.perf_counter()
+        for offset in range(0, args.responses, args.batch_size):
+            db.session.execute(db.text(
+                "INSERT INTO responses (question, answer, feedback, role, created_at, user_id) "
+                "VALUES ('Question?', 'Answer.', :feedback, :role, CURRENT_TIMESTAMP, :user_id)"
+            ), [{
+                'feedback': f'The answer covers the main idea. Score: {rng.randint(3, 10)}/10',
+                'role': rng.choice(ROLES),
+                'user_id': rng.randint(1, args.users),
+            } for _ in range(min(args.batch_size, args.responses - offset))])
+            db.session.commit()
+        print(f"responses={args.responses} users={args.users} filled in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    backfill()
+    elapsed = time.perf_counter() - start
+    print(f"backfill  {elapsed:.1f}s ({args.responses / elapsed:.0f} rows/s)")
+
+    with app.app_context(), app.test_request_context():
+        from flask_jwt_extended import create_access_token
+        client = app.test_client()
+
+        def get(path, user_id):
+            token = create_access_token(identity=str(user_id))
+            response = client.get(path, headers={'Authorization': f'Bearer {token}'})
+            assert response.status_code == 200, response.get_json()
+
+        def reparse():
+            totals = {}
+            for role, feedback in db.session.execute(db.text("SELECT role, feedback FROM responses")):
+                score = parse_grading(feedback)[1]['score']
+                if score is not None:
+                    total = totals.setdefault(role, [0, 0.0])
+                    total[0] += 1
+                    total[1] += score
+            return {role: total / count for role, (count, total) in totals.items()}
+
+        cases = {
+            'user': lambda: get('/api/dashboard/scores', rng.randint(1, args.users)),
+            'roles': lambda: get('/api/scores/roles', 1),
+            'reparse': reparse,
+        }
+        for name, case in cases.items():
+            timings = []
+            for _ in range(args.queries if name != 'reparse' else min(args.queries, 3)):
+                start = time.perf_counter()
+                case()
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{name:<9} p50={percentile(timings, 50):.2f}ms p95={percentile(timings, 95):.2f}ms "
+                  f"p99={percentile(timings, 99):.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark response search latency as the responses table grows.
+
+    python bench_search.py [--responses 1000000] [--users 10000] [--queries 200]
+
+Fills a scratch database with synthetic responses (the FTS triggers index
+them as they are inserted) and reports p50/p95/p99 latency of one user's
+first search page, for a common word, a rarer word and a two-word query
+ending in a prefix, sorted newest first (the endpoint default) and by
+relevance. A LIKE '%...%' scan over the same user's rows is timed for
+comparison.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+WORDS = ('cache latency index queue thread process memory heap stack pointer buffer socket '
+         'request response server client token session cookie schema table query join shard '
+         'replica leader follower consensus quorum partition stream batch window watermark '
+         'trace alert budget roadmap stakeholder sprint backlog epic feature retention churn '
+         'funnel cohort experiment variant hypothesis regression gradient tensor embedding '
+         'outlier sample variance kernel mutex semaphore deadlock scheduler compiler parser '
+         'closure iterator generator trie bloom sketch bitmap encoder decoder pipeline').split()
+FILLER = ('the a of to and in is that it for with as on be this by we would should could').split()
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) if rng.random() < 0.3 else rng.choice(FILLER) for _ in range(words))
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--responses', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'search.db')
+    os.environ.setdefault('SQLITE_PROFILE', 'production')
+    from app import app, db, init_db
+    from search import search_responses
+
+    rng = random.Random(3)
+    init_db()
+    with app.app_context():
+        start = time.perf_counter()
+        for offset in range(0, args.responses, args.batch_size):
+            db.session.execute(db.text(
+                "INSERT INTO responses (question, answer, feedback, role, created_at, user_id) "
+                "VALUES (:question, :answer, :feedback, 'sde', CURRENT_TIMESTAMP, :user_id)"
+            ), [{
+                'question': sentence(rng, 10) + '?',
+                'answer': sentence(rng, 40),
+                'feedback': sentence(rng, 20) + f' {rng.randint(1, 10)}/10',
+                'user_id': rng.randint(1, args.users),
+            } for _ in range(min(args.batch_size, args.responses - offset))])
+            db.session.commit()
+        db.session.execute(db.text("INSERT INTO responses_fts (responses_fts) VALUES ('optimize')"))
+        db.session.commit()
+        fill = time.perf_counter() - start
+        print(f"responses={args.responses} users={args.users} indexed in {fill:.1f}s ({args.responses / fill:.0f} rows/s)")
+
+        queries = {
+            'common word': lambda: rng.choice(WORDS[:10]),
+            'rare word': lambda: rng.choice(WORDS[-10:]),
+            'word + prefix': lambda: f"{rng.choice(WORDS)} {rng.choice(WORDS)[:rng.choice((3, 4))]}",
+        }
+        for sort in ('recent', 'relevance'):
+            for name, make_query in queries.items():
+                timings = []
+                for _ in range(args.queries):
+                    user_id, query = rng.randint(1, args.users), make_query()
+                    start = time.perf_counter()
+                    search_responses(db.session, user_id, query, sort=sort, per_page=10)
+                    timings.append((time.perf_counter() - start) * 1000)
+                print(f"fts   {sort:<9} {name:<16} p50={percentile(timings, 50):.2f}ms "
+                      f"p95={percentile(timings, 95):.2f}ms p99={percentile(timings, 99):.2f}ms")
+
+        timings = []
+        for _ in range(min(args.queries, 20)):
+            user_id, word = rng.randint(1, args.users), rng.choice(WORDS)
+            start = time.perf_counter()
+            db.session.execute(db.text(
+                "SELECT id FROM responses WHERE (question LIKE :pattern OR answer LIKE :pattern OR feedback LIKE :pattern) "
+                "AND user_id = :user_id LIMIT 10"
+            ), {'pattern': f'%{word}%', 'user_id': user_id}).all()
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"like  {'':<9} {'common word':<16} p50={percentile(timings, 50):.2f}ms p95={percentile(timings, 95):.2f}ms "
+              f"(user_id index, no ranking)")
+
+if __name__ == '__main__':
+    main()
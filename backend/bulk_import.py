@@ -0,0 +1,147 @@
+"""Stream MCQs or roadmaps from JSONL/CSV files into the database.
+
+    python bulk_import.py mcqs questions.jsonl [more.csv ...] [--batch-size 2000]
+    python bulk_import.py roadmaps roadmaps.jsonl
+
+Rows are read one at a time and inserted in batches, so memory stays flat no
+matter how large the input is. Invalid rows are reported and skipped. MCQs
+whose normalized content hash (see mcq_content_hash) is already stored are
+skipped by the unique index via INSERT OR IGNORE, and paraphrases of stored
+questions are handled per NEAR_DUPLICATE_ACTION (see near_duplicates.py).
+
+MCQ rows: role, topic, difficulty, question, correct_answer, explanation and
+either `options` (an object keyed A-D, or a list) or option_a..option_d
+columns. Roadmap rows: role, title, description, topics, resources; in CSV
+files `topics` and `resources` hold JSON text.
+"""
+import argparse
+import csv
+import json
+import time
+from datetime import datetime
+from app import app, db, init_db, Roadmap, store_mcq_rows
+from mcq_validation import ValidationError, validate_mcq, required
+
+def read_rows(path):
+    """Yield (line_number, dict) pairs from a JSONL or CSV file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, ValidationError(f'invalid JSON: {e.msg}')
+
+def mcq_row(row):
+    return dict(validate_mcq(row), created_at=datetime.utcnow())
+
+def json_field(row, field, required_field=True):
+    value = row.get(field)
+    if isinstance(value, str):
+        if not value.strip():
+            value = None
+        else:
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                raise ValidationError(f'{field} is not valid JSON')
+    if value is None and required_field:
+        raise ValidationError(f'missing {field}')
+    return value
+
+def roadmap_row(row):
+    return {
+        'role': required(row, 'role'),
+        'title': required(row, 'title'),
+        'description': required(row, 'description'),
+        'topics': json_field(row, 'topics'),
+        'resources': json_field(row, 'resources', required_field=False),
+        'created_at': datetime.utcnow()
+    }
+
+def insert_mcq_batch(batch):
+    """Insert a batch, skipping stored and near duplicates; returns (inserted, near duplicates)."""
+    inserted, near_duplicates, _ = store_mcq_rows(batch)
+    return inserted, near_duplicates
+
+def insert_roadmap_batch(batch):
+    # Roadmaps are served one per role, so an existing role is a duplicate
+    roles = {row['role'] for row in batch}
+    existing = {role for (role,) in db.session.query(Roadmap.role).filter(Roadmap.role.in_(roles))}
+    fresh, seen = [], set()
+    for row in batch:
+        if row['role'] not in existing and row['role'] not in seen:
+            seen.add(row['role'])
+            fresh.append(row)
+    if fresh:
+        db.session.execute(Roadmap.__table__.insert(), fresh)
+    return len(fresh), 0
+
+def import_files(kind, paths, batch_size=2000, max_errors=20):
+    build_row, insert_batch = {
+        'mcqs': (mcq_row, insert_mcq_batch),
+        'roadmaps': (roadmap_row, insert_roadmap_batch),
+    }[kind]
+
+    # Also hashes and indexes MCQs stored before those existed, so duplicates of them are caught
+    init_db()
+    with app.app_context():
+        read = inserted = near_duplicates = rejected = 0
+        batch = []
+        start = time.perf_counter()
+
+        def flush():
+            nonlocal inserted, near_duplicates
+            batch_inserted, batch_near_duplicates = insert_batch(batch)
+            inserted += batch_inserted
+            near_duplicates += batch_near_duplicates
+            db.session.commit()
+            batch.clear()
+
+        try:
+            for path in paths:
+                for line_number, row in read_rows(path):
+                    read += 1
+                    try:
+                        if isinstance(row, ValidationError):
+                            raise row
+                        if not isinstance(row, dict):
+                            raise ValidationError('row is not an object')
+                        batch.append(build_row(row))
+                    except ValidationError as e:
+                        rejected += 1
+                        if rejected <= max_errors:
+                            print(f"{path}:{line_number}: rejected ({e})")
+                        continue
+                    if len(batch) >= batch_size:
+                        flush()
+                        elapsed = time.perf_counter() - start
+                        print(f"{read} rows read, {inserted} inserted ({read / elapsed:.0f} rows/s)")
+            if batch:
+                flush()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error importing {kind}: {str(e)}")
+            raise
+
+        elapsed = time.perf_counter() - start
+        duplicates = read - rejected - inserted - near_duplicates
+        print(f"Imported {kind}: {read} read, {inserted} inserted, {duplicates} duplicates and "
+              f"{near_duplicates} near duplicates skipped, {rejected} rejected "
+              f"in {elapsed:.2f}s ({read / elapsed if elapsed else 0:.0f} rows/s)")
+        return {'read': read, 'inserted': inserted, 'duplicates': duplicates,
+                'near_duplicates': near_duplicates, 'rejected': rejected}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream MCQs or roadmaps from JSONL/CSV files into the database")
+    parser.add_argument('kind', choices=('mcqs', 'roadmaps'))
+    parser.add_argument('paths', nargs='+', help=".jsonl or .csv files")
+    parser.add_argument('--batch-size', type=int, default=2000, help="Rows per INSERT batch and commit")
+    parser.add_argument('--max-errors', type=int, default=20, help="Rejected rows to print before going quiet")
+    args = parser.parse_args()
+    import_files(args.kind, args.paths, args.batch_size, args.max_errors)
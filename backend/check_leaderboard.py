@@ -0,0 +1,61 @@
+"""Check leaderboard ranks and percentiles on small boards.
+
+Migrates a throwaway database, stores today's scores for a few users and
+builds the boards. A percentile is the share of ranked users with the same
+or a lower average, so the top user of every board, including a board with
+a single user, is at 100.
+
+    python check_leaderboard.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'leaderboard.db')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+from app import app, db, init_db
+from leaderboard import Leaderboards, record_score_days, score_day
+
+# role -> {user_id: (responses, score_total)}
+SCORES = {
+    'software-engineer': {1: (3, 24)},
+    'data-scientist': {2: (3, 27), 3: (3, 18), 4: (3, 18), 5: (4, 20), 6: (1, 10)},
+}
+# (role, user_id) -> (rank, percentile); user 6 has too few responses to be ranked
+EXPECTED = {
+    ('software-engineer', 1): (1, 100.0),
+    ('data-scientist', 2): (1, 100.0),
+    ('data-scientist', 3): (2, 75.0),
+    ('data-scientist', 4): (3, 75.0),
+    ('data-scientist', 5): (4, 25.0),
+    ('data-scientist', 6): (None, 100.0),
+}
+
+
+def main():
+    init_db()
+    failures = 0
+    with app.app_context():
+        today = score_day(datetime.utcnow())
+        record_score_days(db.session, [
+            {'role': role, 'user_id': user_id, 'day': today, 'responses': responses, 'score_total': total}
+            for role, users in SCORES.items() for user_id, (responses, total) in users.items()
+        ])
+        db.session.commit()
+        leaderboards = Leaderboards(db.engine.begin, min_responses=3)
+        leaderboards.refresh(full=True)
+        for window in leaderboards.windows:
+            for (role, user_id), expected in EXPECTED.items():
+                entry = leaderboards.board(role, window).entry(user_id)
+                got = (entry['rank'], entry['percentile'])
+                ok = got == expected
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {role} {window} user {user_id}: rank, percentile {got}"
+                      f"{'' if ok else f' (expected {expected})'}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
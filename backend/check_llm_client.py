@@ -0,0 +1,113 @@
+"""Exercise LLMClient against fake_openai.py with injected latency and failures.
+
+Checks that the client:
+- reuses kept-alive connections (fewer connections than requests),
+- never has more than max_concurrency calls in flight upstream,
+- recovers from intermittent 5xx and 429 responses by retrying,
+- opens its circuit when the upstream keeps failing, then fails fast,
+- closes the circuit again after a successful half-open trial call,
+- streams completions.
+
+    python check_llm_client.py [--calls 200] [--threads 32] [--max-concurrency 8]
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from fake_openai import start_fake_openai
+from llm_client import LLMClient, LLMUnavailableError, CircuitOpenError
+
+MESSAGES = [
+    {"role": "system", "content": "You are an expert interviewer for sde positions."},
+    {"role": "user", "content": "Generate a medium difficulty interview question for a sde position."},
+]
+
+def control(server, **options):
+    request = urllib.request.Request(server.url.replace('/v1', '/_control'), json.dumps(options).encode(),
+                                     {'Content-Type': 'application/json'})
+    urllib.request.urlopen(request).read()
+
+def server_stats(server):
+    return json.loads(urllib.request.urlopen(server.url.replace('/v1', '/_stats')).read())
+
+def run_calls(client, calls, threads):
+    def call(i):
+        messages = MESSAGES + [{"role": "user", "content": f"Variant {i}"}]
+        try:
+            return client.chat('gpt-3.5-turbo', messages)
+        except LLMUnavailableError as e:
+            return e
+    with ThreadPoolExecutor(threads) as executor:
+        return list(executor.map(call, range(calls)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--max-concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=int, default=20)
+    args = parser.parse_args()
+
+    server = start_fake_openai(latency_ms=args.latency_ms, token_ms=1, seed=1)
+    openai.api_base = server.url
+    openai.api_key = 'fake'
+    failures = []
+
+    def check(name, ok, detail):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+        if not ok:
+            failures.append(name)
+
+    client = LLMClient(max_concurrency=args.max_concurrency, max_retries=4, backoff_base=0.01, backoff_max=0.05,
+                       acquire_timeout=30, breaker_threshold=args.max_concurrency * 4, breaker_reset=0.5)
+
+    start = time.perf_counter()
+    results = run_calls(client, args.calls, args.threads)
+    elapsed = time.perf_counter() - start
+    stats = server_stats(server)
+    check('healthy upstream', all(isinstance(r, str) for r in results),
+          f"{args.calls} calls in {elapsed:.2f}s ({args.calls / elapsed:.0f}/s)")
+    check('keep-alive', stats['connections'] <= args.max_concurrency * 2,
+          f"{stats['requests']} requests over {stats['connections']} connections")
+    check('bounded concurrency', stats['max_in_flight'] <= args.max_concurrency,
+          f"peak {stats['max_in_flight']} in flight upstream (limit {args.max_concurrency})")
+
+    for status in (500, 429):
+        control(server, error_rate=0.3, error_status=status, reset_stats=True)
+        results = run_calls(client, args.calls, args.threads)
+        stats = server_stats(server)
+        succeeded = sum(isinstance(r, str) for r in results)
+        check(f'retries on {status}', succeeded >= args.calls * 0.98,
+              f"{succeeded}/{args.calls} succeeded, {stats['errors']} injected errors retried")
+
+    control(server, error_rate=1.0, error_status=500, reset_stats=True)
+    breaker = LLMClient(max_concurrency=args.max_concurrency, max_retries=1, backoff_base=0.01, backoff_max=0.05,
+                        breaker_threshold=5, breaker_reset=0.5)
+    results = run_calls(breaker, 50, 1)
+    rejected = sum(isinstance(r, CircuitOpenError) for r in results)
+    requests = server_stats(server)['requests']
+    check('circuit opens', breaker.breaker.state == 'open' and requests <= 6,
+          f"{rejected}/50 calls failed fast, {requests} reached the upstream")
+
+    control(server, error_rate=0.0)
+    time.sleep(0.6)
+    recovered = run_calls(breaker, 10, 1)
+    check('half-open recovery', breaker.breaker.state == 'closed' and all(isinstance(r, str) for r in recovered),
+          f"circuit {breaker.breaker.state} after the reset timeout, {sum(isinstance(r, str) for r in recovered)}/10 succeeded")
+
+    text = ''.join(client.stream('gpt-3.5-turbo', MESSAGES))
+    check('streaming', text == client.chat('gpt-3.5-turbo', MESSAGES), f"{len(text)} characters streamed")
+
+    print(f"client stats: {client.stats()}")
+    server.shutdown()
+    if failures:
+        print(f"FAILED: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Check that /api/metrics adds up requests served by several gunicorn workers.
+
+Starts the app under gunicorn with `--workers` processes on a scratch
+database, sends `--requests` requests spread over a few routes, then polls
+/api/metrics until every worker's snapshot is in. The check fails unless
+the per-route counts equal what was sent. It also times the
+instrumentation itself (the before/after request hooks, without the view)
+in this process.
+
+    python check_metrics.py [--workers 3] [--requests 600]
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROUTES = {'/api/health': '/api/health', '/api/roadmap/software-engineer': '/api/roadmap/<role>',
+          '/api/mcq/software-engineer/topics': '/api/mcq/<role>/topics'}
+
+def request_counts(text):
+    counts = {}
+    for route, count in re.findall(r'http_request_duration_seconds_count\{method="GET",route="([^"]+)",status="\d+"\} (\d+)', text):
+        counts[route] = counts.get(route, 0) + int(count)
+    return counts
+
+def hook_overhead(iterations):
+    """Microseconds the request tracking hooks add to one request, measured on a bare route."""
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from app import app, start_request_tracking, finish_request_tracking
+
+    with app.test_request_context('/api/health'):
+        response = app.response_class('ok')
+        start = time.perf_counter()
+        for _ in range(iterations):
+            start_request_tracking()
+            finish_request_tracking(response)
+            for callback in response._on_close:
+                callback()
+            response._on_close.clear()
+        return (time.perf_counter() - start) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=600)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='check-metrics-')
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'metrics.db')}", SQLITE_PROFILE='production',
+               METRICS_DIR=os.path.join(workdir, 'metrics'), METRICS_FLUSH_INTERVAL='1',
+               LLM_CACHE_PATH=os.path.join(workdir, 'llm_cache.db'))
+    backend = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, '-c', 'from app import init_db; init_db()'], cwd=backend, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+                               '--workers', str(args.workers), 'app:app'],
+                              cwd=backend, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    ok = True
+    try:
+        for _ in range(100):
+            try:
+                requests.get(base_url + '/api/health', timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.2)
+        # Counted from here on, once the readiness probes above are flushed
+        time.sleep(2)
+        baseline = request_counts(requests.get(base_url + '/api/metrics').text)
+
+        paths = list(ROUTES) * (args.requests // len(ROUTES))
+        with ThreadPoolExecutor(16) as executor:
+            statuses = list(executor.map(lambda path: requests.get(base_url + path).status_code, paths))
+        expected = {route: baseline.get(route, 0) + paths.count(path) for path, route in ROUTES.items()}
+
+        deadline = time.monotonic() + 10
+        while True:
+            counts = request_counts(requests.get(base_url + '/api/metrics').text)
+            if all(counts.get(route) == n for route, n in expected.items()) or time.monotonic() > deadline:
+                break
+            time.sleep(0.5)
+        pids = len(os.listdir(os.path.join(workdir, 'metrics')))
+        for route, n in expected.items():
+            match = counts.get(route) == n
+            ok &= match
+            print(f"{'ok  ' if match else 'FAIL'} {route}: {counts.get(route, 0)} counted, {n} expected")
+        print(f"{len(paths)} requests ({sorted(set(statuses))}), snapshots from {pids} processes")
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"request hooks (metrics and access log): {hook_overhead(20000):.1f}us per request")
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Assert that every hot endpoint query is served by an index.
+
+Migrates a throwaway database, runs EXPLAIN QUERY PLAN on each query shape the
+endpoints issue and fails if SQLite would fall back to a full table scan or a
+temporary B-tree for ORDER BY.
+
+    python check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+
+_tmpdir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'plans.db')
+
+from sqlalchemy import func
+from app import app, db, init_db, Response, MCQ, Roadmap, EvaluationJob, UserStats, MCQReview, TopicMastery
+from datetime import datetime
+
+def query_shapes():
+    stale_before = datetime.utcnow()
+    return {
+        'get_user_responses': Response.query.filter_by(user_id=1)
+            .order_by(Response.created_at.desc()).limit(10),
+        'get_user_responses (role)': Response.query.filter_by(user_id=1, role='sde')
+            .order_by(Response.created_at.desc()).limit(10),
+        'get_user_responses (cursor)': Response.query.filter_by(user_id=1)
+            .filter(db.tuple_(Response.created_at, Response.id) < (datetime.utcnow(), 100))
+            .order_by(Response.created_at.desc(), Response.id.desc()).limit(11),
+        'get_user_responses (count)': Response.query.filter_by(user_id=1).order_by(None)
+            .with_entities(func.count()),
+        'rebuild_user_stats (role counts)': db.session.query(Response.role, func.count(Response.id))
+            .filter_by(user_id=1).group_by(Response.role),
+        'get_dashboard_scores (averages)': Response.query.filter_by(user_id=1).order_by(None)
+            .with_entities(func.count(Response.score), func.avg(Response.score)),
+        'get_dashboard_scores (roles)': db.session.query(Response.role, func.count(Response.score),
+                                                         func.avg(Response.score))
+            .filter(Response.user_id == 1).group_by(Response.role),
+        'get_role_score_distribution': db.session.query(Response.role, Response.score, func.count())
+            .filter(Response.score.isnot(None)).group_by(Response.role, Response.score),
+        'get_role_score_distribution (role)': db.session.query(Response.role, Response.score, func.count())
+            .filter(Response.score.isnot(None), Response.role == 'sde').group_by(Response.role, Response.score),
+        'get_mcqs': MCQ.query.filter_by(role='software-engineer').limit(10),
+        'get_mcqs (cursor)': MCQ.query.filter_by(role='software-engineer').filter(MCQ.id > 100)
+            .order_by(MCQ.id).limit(11),
+        'get_mcqs (topic, cursor)': MCQ.query.filter_by(role='software-engineer', topic='OOP')
+            .filter(MCQ.id > 100).order_by(MCQ.id).limit(11),
+        'get_mcqs (topic, difficulty)': MCQ.query.filter_by(role='software-engineer', topic='OOP', difficulty='easy')
+            .order_by(MCQ.id).limit(11),
+        'get_mcq_topics': db.session.query(MCQ.topic).filter_by(role='software-engineer').distinct(),
+        'check_mcq_answer': MCQ.query.filter_by(id=1),
+        'get_roadmap': Roadmap.query.filter_by(role='software-engineer').limit(1),
+        'get_dashboard_stats': UserStats.query.filter_by(user_id=1),
+        'next_practice_mcq (due)': MCQReview.query.filter_by(user_id=1, role='software-engineer')
+            .filter(MCQReview.due_at <= datetime.utcnow()).order_by(MCQReview.due_at).limit(1),
+        'next_practice_mcq (topic, due)': MCQReview.query.filter_by(user_id=1, role='software-engineer', topic='OOP')
+            .filter(MCQReview.due_at <= datetime.utcnow()).order_by(MCQReview.due_at).limit(1),
+        'unseen_mcq_id (candidates)': db.session.query(MCQ.id)
+            .filter(MCQ.role == 'software-engineer', MCQ.topic == 'OOP', MCQ.difficulty == 'easy', MCQ.id > 100)
+            .order_by(MCQ.id).limit(20),
+        'unseen_mcq_id (answered)': db.session.query(MCQReview.mcq_id)
+            .filter(MCQReview.user_id == 1, MCQReview.mcq_id.in_([1, 2, 3])),
+        'next_new_mcq (mastery)': TopicMastery.query.filter_by(user_id=1, role='software-engineer'),
+        'claim_evaluation_job (queued)': EvaluationJob.query.filter_by(status='queued')
+            .order_by(EvaluationJob.created_at).limit(1),
+        'claim_evaluation_job (stale)': EvaluationJob.query
+            .filter(EvaluationJob.status == 'running', EvaluationJob.updated_at < stale_before)
+            .order_by(EvaluationJob.created_at).limit(1),
+    }
+
+def explain(query):
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}')).fetchall()
+    return [row[-1] for row in rows]
+
+def uses_index(plan):
+    for step in plan:
+        # "SCAN t USING INDEX ..." walks an index in order and is fine; a bare
+        # "SCAN t" is a full table scan
+        if step.startswith('SCAN') and 'INDEX' not in step:
+            return False
+        if 'USE TEMP B-TREE' in step:
+            return False
+    return True
+
+def main():
+    init_db()
+    failures = 0
+    with app.app_context():
+        for name, query in query_shapes().items():
+            plan = explain(query)
+            ok = uses_index(plan)
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {' | '.join(plan)}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
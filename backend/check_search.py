@@ -0,0 +1,48 @@
+"""Check that public MCQ search never reveals an answer's explanation.
+
+Migrates a throwaway database, adds MCQs whose explanations hold words
+that appear nowhere else, and searches /api/search/mcqs for them. The check
+fails if a word found only in an explanation returns a hit, or if any
+snippet quotes explanation text.
+
+    python check_search.py
+"""
+import os
+import sys
+import tempfile
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'search.db')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+from app import app, db, init_db, MCQ
+
+MCQS = [
+    ('What does a load balancer distribute?', 'Traffic is spread so that zephyrine nodes stay healthy.'),
+    ('Which cache policy evicts the least recently used entry?', 'LRU keeps quokkamatic hot keys and drops cold ones.'),
+    ('How does a load balancer detect failed nodes?', 'Health checks mark a balancer backend as down.'),
+]
+# (query, must not appear in any snippet); the first two exist only in explanations
+QUERIES = [('zephyrine', 'zephyrine'), ('quokkamatic', 'quokkamatic'), ('balancer', 'backend'), ('load', 'spread')]
+
+def main():
+    init_db()
+    failures = 0
+    with app.app_context():
+        db.session.add_all(MCQ(role='software-engineer', question=question, options={'A': 'a', 'B': 'b'},
+                               correct_answer='A', explanation=explanation, difficulty='easy', topic='Systems')
+                           for question, explanation in MCQS)
+        db.session.commit()
+    client = app.test_client()
+    for query, secret in QUERIES:
+        response = client.get('/api/search/mcqs', query_string={'q': query})
+        assert response.status_code == 200, response.get_json()
+        mcqs = response.get_json()['mcqs']
+        explanation_only = secret == query
+        leaked = [mcq['snippet'] for mcq in mcqs if secret in mcq['snippet'].lower()]
+        ok = not leaked and not (explanation_only and mcqs)
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {query!r}: {len(mcqs)} hits {[mcq['snippet'] for mcq in mcqs]}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Hammer one SQLite database with writes from several processes.
+
+Each process imports the app on its own (as a gunicorn worker would) and runs
+the write paths concurrently: storing evaluated responses together with the
+user_stats rollup, and profile updates. The check fails if any write raises
+(e.g. "database is locked") or if the rollup totals disagree with the rows
+that were written.
+
+    python check_sqlite_concurrency.py --processes 8 --writes 200
+    python check_sqlite_concurrency.py --profile development   # compare
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+def worker(worker_id, num_users, writes, ready, go, results):
+    from app import app, db, Response, User, record_response_stats
+
+    errors = []
+    ready.release()
+    go.wait()
+    with app.app_context():
+        for i in range(writes):
+            user_id = (worker_id + i) % num_users + 1
+            try:
+                if i % 5 == 4:
+                    user = db.session.get(User, user_id)
+                    user.name = f'user-{user_id}-{worker_id}-{i}'
+                else:
+                    response = Response(
+                        question=f'Question {i} from worker {worker_id}',
+                        answer='An answer',
+                        feedback='Feedback, 7/10',
+                        role=('sde', 'pm', 'data-scientist')[i % 3],
+                        user_id=user_id
+                    )
+                    db.session.add(response)
+                    db.session.flush()
+                    record_response_stats(response)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                errors.append(str(e))
+    results.put((worker_id, errors))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=200, help="Writes per process")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--profile', default='production')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'concurrency.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    os.environ['SQLITE_PROFILE'] = args.profile
+
+    from app import app, db, init_db, User, Response, UserStats
+    init_db()
+    with app.app_context():
+        db.session.add_all([User(name=f'user-{i}', email=f'user{i}@example.com', password='x') for i in range(args.users)])
+        db.session.commit()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    ready = ctx.Semaphore(0)
+    go = ctx.Event()
+    processes = [ctx.Process(target=worker, args=(i, args.users, args.writes, ready, go, results)) for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    # Start the clock once every process has imported the app
+    for _ in processes:
+        ready.acquire()
+    start = time.perf_counter()
+    go.set()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    errors = [error for _, worker_errors in outcomes for error in worker_errors]
+    total_writes = args.processes * args.writes
+    expected_responses = args.processes * sum(1 for i in range(args.writes) if i % 5 != 4)
+
+    with app.app_context():
+        stored = Response.query.count()
+        rolled_up = db.session.query(db.func.sum(UserStats.total_responses)).scalar() or 0
+
+    print(f"profile={args.profile} processes={args.processes} writes={total_writes} "
+          f"elapsed={elapsed:.2f}s throughput={total_writes / elapsed:.0f} writes/s")
+    print(f"errors={len(errors)} responses={stored} expected={expected_responses} user_stats_total={rolled_up}")
+    for error in sorted(set(errors))[:5]:
+        print(f"  {error}")
+
+    ok = not errors and stored == expected_responses and rolled_up == stored
+    print("ok" if ok else "FAIL")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedBody:
+    __slots__ = ('body', 'status', 'etag', 'version', 'stored_at')
+
+    def __init__(self, body, status, version):
+        self.body = body
+        self.status = status
+        # Strong ETag over the exact bytes, so every worker agrees on it
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.version = version
+        self.stored_at = time.monotonic()
+
+
+class ContentCache:
+    """Pre-serialized response bodies for near-static content.
+
+    Entries live under a namespace (e.g. 'roadmap', 'mcq') whose version is
+    bumped whenever rows behind it change, which invalidates every entry in
+    that namespace at once. Writes made by other processes can't bump this
+    process's versions, so entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            if entry.version != self._versions.get(namespace, 0) or time.monotonic() - entry.stored_at > self.ttl:
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return entry
+
+    def version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def put(self, namespace, key, body, status, version):
+        """Store `body`; `version` is the namespace version read before querying."""
+        entry = CachedBody(body, status, version)
+        with self._lock:
+            # A bump that happened while the body was being built makes it stale already
+            if version == self._versions.get(namespace, 0):
+                self._entries[(namespace, key)] = entry
+                self._entries.move_to_end((namespace, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def bump(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
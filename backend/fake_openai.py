@@ -0,0 +1,231 @@
+"""Deterministic stand-in for the OpenAI chat completions API.
+
+    python fake_openai.py --port 8001 --latency-ms 800 --error-rate 0.1
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake python app.py
+
+Serves POST /v1/chat/completions, plain and `stream: true` (as SSE), with
+replies derived from a hash of the prompt, so the same prompt always gets the
+same answer. Evaluation prompts get feedback ending in a JSON line of scores,
+MCQ prompts get the requested number of questions in the JSON format the app
+asks for, anything else gets an interview question.
+
+Latency (`latency_ms` plus up to `jitter_ms`, and `token_ms` between streamed
+tokens) and failures (`error_rate` of requests answered with `error_status`)
+are injectable. They can be changed while running with
+POST /_control {"error_rate": 1.0, ...}, and GET /_stats reports request,
+error and connection counts plus the peak number of requests in flight.
+Use start_fake_openai() to run one in-process, e.g. from a benchmark.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_OPTIONS = {
+    'latency_ms': 200,
+    'jitter_ms': 0,
+    'token_ms': 20,
+    'error_rate': 0.0,
+    'error_status': 500,
+    'seed': 0,
+}
+
+TOPICS = ('caching', 'indexing', 'concurrency', 'load balancing', 'sharding', 'rate limiting',
+          'message queues', 'consistency', 'observability', 'prioritisation', 'experiment design')
+
+
+def prompt_seed(messages, seed=0):
+    digest = hashlib.sha256(json.dumps([seed, messages], sort_keys=True).encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def reply_for(messages, seed=0):
+    rng = random.Random(prompt_seed(messages, seed))
+    system = next((m['content'] for m in messages if m.get('role') == 'system'), '')
+    user = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+
+    if 'Evaluate' in system:
+        score = rng.randint(3, 10)
+        topic = rng.choice(TOPICS)
+        scores = {'score': score, **{name: min(10, max(0, score + rng.randint(-2, 2)))
+                                     for name in ('correctness', 'completeness', 'communication')}}
+        return (f"The answer covers the main idea but could go deeper on {topic}. "
+                f"Consider discussing trade-offs and a concrete example.\n{json.dumps(scores)}")
+
+    if 'MCQ' in system:
+        match = re.search(r'Generate (\d+)', user)
+        count = int(match.group(1)) if match else 1
+        difficulty = next((d for d in ('easy', 'medium', 'hard') if d in user), 'medium')
+        questions = []
+        for _ in range(count):
+            topic = rng.choice(TOPICS)
+            n = rng.randint(1, 10 ** 6)
+            questions.append({
+                'question': f"Which statement about {topic} is correct? (#{n})",
+                'options': {key: f"{topic} option {key.lower()}{n}" for key in 'ABCD'},
+                'correct_answer': rng.choice('ABCD'),
+                'explanation': f"Because of how {topic} behaves under load ({n}).",
+                'difficulty': difficulty,
+                'topic': topic.title(),
+            })
+        return json.dumps({'questions': questions})
+
+    return f"How would you approach {rng.choice(TOPICS)} in a system serving {rng.randint(2, 500)}k users?"
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options=None):
+        super().__init__(address, FakeOpenAIHandler)
+        self.options = dict(DEFAULT_OPTIONS, **(options or {}))
+        self.rng = random.Random(self.options['seed'])
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'errors': 0, 'connections': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    def get_request(self):
+        request = super().get_request()
+        with self.lock:
+            self.counters['connections'] += 1
+        return request
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+            if counter == 'in_flight':
+                self.counters['max_in_flight'] = max(self.counters['max_in_flight'], self.counters['in_flight'])
+
+    def draw(self):
+        """(should_fail, latency_seconds) for the next request."""
+        with self.lock:
+            fail = self.rng.random() < self.options['error_rate']
+            jitter = self.rng.uniform(0, self.options['jitter_ms'])
+        return fail, (self.options['latency_ms'] + jitter) / 1000
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        if self.path == '/_stats':
+            with self.server.lock:
+                self.send_json(200, dict(self.server.counters, options=self.server.options))
+        else:
+            self.send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        if self.path == '/_control':
+            updates = self.read_json()
+            with self.server.lock:
+                self.server.options.update({k: v for k, v in updates.items() if k in DEFAULT_OPTIONS})
+                if updates.get('reset_stats'):
+                    self.server.counters.update(requests=0, errors=0, connections=0, max_in_flight=0)
+            self.send_json(200, self.server.options)
+            return
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {'error': {'message': 'Not found'}})
+            return
+
+        body = self.read_json()
+        self.server.count('requests')
+        self.server.count('in_flight')
+        try:
+            fail, latency = self.server.draw()
+            time.sleep(latency)
+            if fail:
+                self.server.count('errors')
+                status = self.server.options['error_status']
+                headers = {'Retry-After': '0'} if status == 429 else None
+                self.send_json(status, {'error': {'message': 'Injected failure', 'type': 'server_error'}}, headers)
+                return
+
+            messages = body.get('messages', [])
+            content = reply_for(messages, self.server.options['seed'])
+            model = body.get('model', 'gpt-3.5-turbo')
+            usage = {
+                'prompt_tokens': sum(len(m.get('content', '').split()) for m in messages),
+                'completion_tokens': len(content.split()),
+            }
+            usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+            if body.get('stream'):
+                self.stream(model, content)
+            else:
+                self.send_json(200, {
+                    'id': 'chatcmpl-fake',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                    'usage': usage,
+                })
+        finally:
+            self.server.count('in_flight', -1)
+
+    def stream(self, model, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        tokens = re.findall(r'\S+\s*', content)
+        for i, token in enumerate(tokens):
+            chunk = {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}],
+            }
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.wfile.flush()
+            if i < len(tokens) - 1:
+                time.sleep(self.server.options['token_ms'] / 1000)
+        done = {'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+        self.wfile.write(f'data: {json.dumps(done)}\n\ndata: [DONE]\n\n'.encode())
+        self.wfile.flush()
+
+
+def start_fake_openai(host='127.0.0.1', port=0, **options):
+    """Run a fake server on a daemon thread; returns the server (see `.url`)."""
+    server = FakeOpenAIServer((host, port), options)
+    threading.Thread(target=server.serve_forever, name='fake-openai', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Deterministic stand-in for the OpenAI chat completions API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    for name, default in DEFAULT_OPTIONS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=type(default), default=default)
+    args = parser.parse_args()
+    options = {name: getattr(args, name) for name in DEFAULT_OPTIONS}
+    server = FakeOpenAIServer((args.host, args.port), options)
+    print(f"Fake OpenAI API on {server.url} ({options})")
+    server.serve_forever()
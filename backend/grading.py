@@ -0,0 +1,70 @@
+"""Scores out of 10 for evaluated answers, parsed from the grader's reply.
+
+The evaluation prompt asks for prose feedback ending in one line of JSON
+shaped like GRADING_FORMAT: an overall score and one sub-score per
+SUB_SCORES entry. parse_grading splits a reply into the feedback shown to
+the user and its scores, which are stored in numeric columns on the
+response so analytics are plain SQL aggregates.
+
+Replies without the JSON line (every response stored before it was asked
+for, and a model that ignores the format) fall back to the last
+"Score: 7/10"-style mention in the text, which gives the overall score
+only.
+"""
+import json
+import re
+
+MAX_SCORE = 10
+SUB_SCORES = ('correctness', 'completeness', 'communication')
+
+GRADING_FORMAT = '{"score": 7, "correctness": 8, "completeness": 6, "communication": 7}'
+
+# The JSON object on the reply's last line, possibly inside a ```json fence
+_TRAILING_JSON = re.compile(r'(?:```(?:json)?\s*)?(\{[^{}]*\})\s*(?:```)?\s*$', re.IGNORECASE)
+_SCORE_MENTION = re.compile(r'\bscore\b\D{0,15}?(\d+(?:\.\d+)?)(?!\s*/\s*(?!10\b)\d)', re.IGNORECASE)
+_OUT_OF_TEN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:/|out of)\s*10\b', re.IGNORECASE)
+
+
+def score_column(name):
+    """Response column holding a score from GRADING_FORMAT ('score' or a SUB_SCORES entry)."""
+    return name if name == 'score' else f'{name}_score'
+
+
+def _valid(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value) if 0 <= value <= MAX_SCORE else None
+
+
+def _mentioned_score(text):
+    for pattern in (_SCORE_MENTION, _OUT_OF_TEN):
+        for match in reversed(pattern.findall(text)):
+            score = _valid(float(match))
+            if score is not None:
+                return score
+    return None
+
+
+def parse_grading(reply):
+    """(feedback, scores) of a grader reply.
+
+    feedback is the reply without its JSON line. scores maps 'score' and each
+    SUB_SCORES entry to a float in [0, MAX_SCORE], or None when the reply
+    doesn't give it.
+    """
+    scores = dict.fromkeys(('score',) + SUB_SCORES)
+    feedback = reply or ''
+    match = _TRAILING_JSON.search(feedback)
+    if match:
+        try:
+            data = json.loads(match.group(1))
+        except ValueError:
+            data = None
+        # Only a scores object is cut; any other trailing object is part of the feedback
+        if isinstance(data, dict) and any(name in data for name in scores):
+            for name in scores:
+                scores[name] = _valid(data.get(name))
+            feedback = feedback[:match.start()].rstrip()
+    if scores['score'] is None:
+        scores['score'] = _mentioned_score(feedback)
+    return feedback, scores
@@ -0,0 +1,7 @@
+"""gunicorn settings, picked up when gunicorn is started from this directory (gunicorn app:app)."""
+import os
+from metrics import clear_directory
+
+def on_starting(server):
+    # Workers of a previous run left metric snapshots behind; start from zero
+    clear_directory(os.environ.get('METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics')))
@@ -0,0 +1,285 @@
+"""Leaderboards and percentile ranks of users' average evaluation scores, per role and time window.
+
+Every scored response adds to its user's row in `user_score_days`
+(role, user, day: number of scored responses and their score total) in the
+transaction that stores it. Snapshots are built from those per-user
+aggregates, never from `responses`:
+
+- A full build reads each role's rows in primary-key order, which is user
+  order, and sums each window's days per user with np.add.reduceat.
+  Users are ranked by average score, then by number of responses, then by
+  id. Only users with at least `min_responses` in the window are ranked.
+- A RoleBoard keeps its users' ids (sorted), counts and totals, the
+  leaderboard order and each user's rank, as flat int32/float32 arrays,
+  about 24 bytes per user. Looking a user up is a binary search on the
+  ids; their percentile is a binary search of their average in the
+  ranked averages.
+- An incremental refresh takes the (role, user) pairs with responses
+  added since the last one (ids above a watermark in `responses`),
+  re-reads only those users' rows, and re-ranks the affected boards in
+  NumPy. Days leaving a window aren't seen by it, so there is a full
+  rebuild every `rebuild_interval` seconds and whenever the UTC day
+  changes.
+
+Each worker process holds its own snapshot. The first request builds it;
+after that, refreshes run on a background thread while requests keep
+reading the previous snapshot.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+# Days covered by each window, counting today; None is all time
+WINDOWS = {'7d': 7, '30d': 30, 'all': None}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def score_day(dt):
+    """Day number (days since 1970-01-01, UTC) that user_score_days files `dt` under."""
+    return (dt - _EPOCH).days
+
+
+def record_score_days(session, rows):
+    """Add to users' aggregates; each row is a dict of role, user_id, day, responses and score_total.
+
+    `responses` may be 0 when only a score changed.
+    """
+    session.execute(text(
+        'INSERT INTO user_score_days (role, user_id, day, responses, score_total) '
+        'VALUES (:role, :user_id, :day, :responses, :score_total) '
+        'ON CONFLICT (role, user_id, day) DO UPDATE SET responses = responses + excluded.responses, '
+        'score_total = score_total + excluded.score_total'
+    ), rows)
+
+
+def record_score_day(session, user_id, role, day, responses, score_total):
+    record_score_days(session, [{'role': role, 'user_id': user_id, 'day': day, 'responses': responses,
+                                 'score_total': score_total}])
+
+
+def rebuild_score_days(session):
+    """Recompute user_score_days from every scored response."""
+    session.execute(text('DELETE FROM user_score_days'))
+    session.execute(text(
+        'INSERT INTO user_score_days (role, user_id, day, responses, score_total) '
+        "SELECT role, user_id, CAST(julianday(created_at) - julianday('1970-01-01') AS INTEGER), COUNT(*), SUM(score) "
+        'FROM responses WHERE score IS NOT NULL AND user_id IS NOT NULL GROUP BY 1, 2, 3'
+    ))
+
+
+class RoleBoard:
+    __slots__ = ('user_ids', 'responses', 'totals', 'order', 'rank_of', 'ranked_averages', 'min_responses')
+
+    def __init__(self, user_ids, responses, totals, min_responses):
+        """Rank users from their aggregates; `user_ids` must be sorted."""
+        self.user_ids = user_ids.astype(np.int32, copy=False)
+        self.responses = responses.astype(np.int32, copy=False)
+        self.totals = totals.astype(np.float32, copy=False)
+        self.min_responses = min_responses
+
+        averages = self.totals / np.maximum(self.responses, 1)
+        eligible = np.flatnonzero(self.responses >= min_responses)
+        # lexsort sorts by its last key first
+        ranking = np.lexsort((self.user_ids[eligible], -self.responses[eligible], -averages[eligible]))
+        self.order = eligible[ranking].astype(np.int32)
+        self.rank_of = np.full(len(self.user_ids), -1, dtype=np.int32)
+        self.rank_of[self.order] = np.arange(len(self.order), dtype=np.int32)
+        self.ranked_averages = np.sort(averages[self.order]).astype(np.float32)
+
+    @property
+    def ranked(self):
+        return len(self.order)
+
+    def _entry(self, index, rank):
+        responses = int(self.responses[index])
+        average = float(self.totals[index]) / responses
+        return {
+            'rank': rank + 1 if rank >= 0 else None,
+            'user_id': int(self.user_ids[index]),
+            'average': round(average, 2),
+            'responses': responses,
+        }
+
+    def top(self, offset=0, limit=10):
+        return [self._entry(index, rank) for rank, index in
+                enumerate(self.order[offset:offset + limit].tolist(), start=offset)]
+
+    def entry(self, user_id):
+        """The user's rank (None below min_responses) and percentile among ranked users, or None if absent."""
+        index = int(np.searchsorted(self.user_ids, user_id))
+        if index == len(self.user_ids) or self.user_ids[index] != user_id:
+            return None
+        entry = self._entry(index, int(self.rank_of[index]))
+        average = self.totals[index] / self.responses[index]
+        # Share of ranked users with the same or a lower average, so the top user is at 100
+        at_or_below = int(np.searchsorted(self.ranked_averages, np.float32(average), side='right'))
+        entry['percentile'] = round(100 * at_or_below / self.ranked, 1) if self.ranked else None
+        return entry
+
+    def updated(self, user_ids, responses, totals):
+        """A new board with these users' aggregates replaced (or added; 0 responses removes them)."""
+        positions = np.searchsorted(self.user_ids, user_ids)
+        present = np.zeros(len(user_ids), dtype=bool)
+        inside = positions < len(self.user_ids)
+        present[inside] = self.user_ids[positions[inside]] == user_ids[inside]
+        all_ids = self.user_ids.copy()
+        all_responses = self.responses.copy()
+        all_totals = self.totals.copy()
+        all_responses[positions[present]] = responses[present]
+        all_totals[positions[present]] = totals[present]
+        new = ~present
+        all_ids = np.insert(all_ids, positions[new], user_ids[new])
+        all_responses = np.insert(all_responses, positions[new], responses[new])
+        all_totals = np.insert(all_totals, positions[new], totals[new])
+        keep = all_responses > 0
+        return RoleBoard(all_ids[keep], all_responses[keep], all_totals[keep], self.min_responses)
+
+
+def _columns(connection, sql, params):
+    """The query's rows as a (4, n) float64 array, one row per selected column."""
+    # Through the DBAPI cursor: NumPy converts its plain tuples far faster than Row objects
+    cursor = connection.connection.cursor()
+    try:
+        rows = cursor.execute(sql, params).fetchall()
+    finally:
+        cursor.close()
+    return np.array(rows, dtype=np.float64).reshape(-1, 4).T
+
+
+def window_totals(user_ids, days, responses, totals, since):
+    """Per-user sums over rows with day >= since; rows must be sorted by user id."""
+    mask = days >= since if since is not None else slice(None)
+    user_ids, responses, totals = user_ids[mask], responses[mask], totals[mask]
+    if not len(user_ids):
+        empty = np.zeros(0)
+        return empty.astype(np.int32), empty.astype(np.int32), empty
+    starts = np.flatnonzero(np.r_[True, user_ids[1:] != user_ids[:-1]])
+    return user_ids[starts], np.add.reduceat(responses, starts), np.add.reduceat(totals, starts)
+
+
+class Leaderboards:
+    def __init__(self, connect, min_responses=3, refresh_interval=60, rebuild_interval=3600, windows=WINDOWS):
+        self.connect = connect  # callable() -> context manager yielding a SQLAlchemy connection in a transaction
+        self.min_responses = min_responses
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.windows = windows
+
+        self._boards = {}  # (role, window) -> RoleBoard
+        self.built_at = None  # Unix time of the last full build or refresh
+        self._built_day = None
+        self._watermark = None  # highest responses.id folded into the boards
+        self._next_refresh = 0.0
+        self._next_rebuild = 0.0
+        self._refresh_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+
+    def board(self, role, window):
+        """The current board of `role` in `window`, or None if nobody has a score there."""
+        if self._watermark is None:
+            self.refresh()
+        elif time.monotonic() >= self._next_refresh:
+            self._refresh_in_background()
+        return self._boards.get((role, window))
+
+    def _refresh_in_background(self):
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._background_refresh, name='leaderboard-refresh', daemon=True)
+            self._thread.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except SQLAlchemyError:
+            # Keep serving the snapshot we have; try again next interval
+            logger.warning("Error refreshing leaderboards", exc_info=True)
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def refresh(self, full=False):
+        """Fold in responses added since the last refresh, or rebuild everything when that's due."""
+        with self._refresh_lock:
+            today = score_day(datetime.utcnow())
+            if full or self._watermark is None or time.monotonic() >= self._next_rebuild or today != self._built_day:
+                self._rebuild(today)
+            else:
+                self._refresh(today)
+            self.built_at = time.time()
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def _since(self, today, window):
+        days = self.windows[window]
+        return today - days + 1 if days is not None else None
+
+    def _rebuild(self, today):
+        boards = {}
+        with self.connect() as connection:
+            # Read before the aggregates, so responses committed meanwhile are folded in again, not missed
+            watermark = connection.execute(text('SELECT COALESCE(MAX(id), 0) FROM responses')).scalar()
+            # One index seek per role rather than a scan of the whole table
+            roles = connection.execute(text(
+                'WITH RECURSIVE roles(role) AS (SELECT MIN(role) FROM user_score_days '
+                'UNION ALL SELECT (SELECT MIN(role) FROM user_score_days WHERE role > roles.role) '
+                'FROM roles WHERE roles.role IS NOT NULL) SELECT role FROM roles WHERE role IS NOT NULL'
+            )).scalars().all()
+            for role in roles:
+                columns = _columns(connection, 'SELECT user_id, day, responses, score_total FROM user_score_days '
+                                               'WHERE role = ? ORDER BY user_id, day', (role,))
+                user_ids, days = columns[0].astype(np.int64), columns[1].astype(np.int64)
+                for window in self.windows:
+                    ids, responses, totals = window_totals(user_ids, days, columns[2], columns[3],
+                                                           self._since(today, window))
+                    if len(ids):
+                        boards[(role, window)] = RoleBoard(ids, responses, totals, self.min_responses)
+        self._boards = boards
+        self._watermark = watermark
+        self._built_day = today
+        self._next_rebuild = time.monotonic() + self.rebuild_interval
+
+    def _refresh(self, today):
+        with self.connect() as connection:
+            watermark = connection.execute(text('SELECT COALESCE(MAX(id), 0) FROM responses')).scalar()
+            changed = connection.execute(text(
+                'SELECT DISTINCT role, user_id FROM responses '
+                'WHERE id > :after AND id <= :until AND score IS NOT NULL AND user_id IS NOT NULL'
+            ), {'after': self._watermark, 'until': watermark}).all()
+            by_role = {}
+            for role, user_id in changed:
+                by_role.setdefault(role, []).append(user_id)
+            boards = dict(self._boards)
+            for role, user_ids in by_role.items():
+                user_ids = sorted(user_ids)
+                columns = np.hstack([np.zeros((4, 0))] + [
+                    _columns(connection, 'SELECT user_id, day, responses, score_total FROM user_score_days '
+                                         'WHERE role = ? AND user_id = ? ORDER BY day', (role, user_id))
+                    for user_id in user_ids
+                ])
+                user_ids = np.array(user_ids, dtype=np.int64)
+                for window in self.windows:
+                    ids, responses, totals = window_totals(columns[0].astype(np.int64), columns[1].astype(np.int64),
+                                                           columns[2], columns[3], self._since(today, window))
+                    # Users with no days left in the window drop out
+                    counts = np.zeros(len(user_ids), dtype=np.int64)
+                    sums = np.zeros(len(user_ids))
+                    counts[np.searchsorted(user_ids, ids)] = responses
+                    sums[np.searchsorted(user_ids, ids)] = totals
+                    board = boards.get((role, window))
+                    if board is None:
+                        keep = counts > 0
+                        if keep.any():
+                            boards[(role, window)] = RoleBoard(user_ids[keep], counts[keep], sums[keep],
+                                                               self.min_responses)
+                    else:
+                        boards[(role, window)] = board.updated(user_ids, counts, sums)
+        self._boards = boards
+        self._watermark = watermark
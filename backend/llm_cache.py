@@ -0,0 +1,240 @@
+"""Persistent cache of LLM completions in a SQLite file.
+
+Entries are keyed on a hash of the model and the normalized messages, so a
+byte-identical prompt (a resubmitted answer, a seeded question evaluated
+again) is answered from disk instead of another API call. The cache lives in
+its own database file: it's disposable, and writing to it never waits on the
+application database's write lock.
+
+Entries expire `ttl` seconds after they were stored, and once the cache holds
+more than `max_entries` the least recently used ones are evicted (checked
+every EVICT_EVERY stores, so the bound can be overshot by that many). Reads only
+refresh `last_used_at` when it is more than TOUCH_INTERVAL seconds old, so a
+hot entry doesn't cost a write on every hit.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TOUCH_INTERVAL = 60
+# Eviction runs every this many stores rather than on each one
+EVICT_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used_at);
+"""
+
+
+def normalize_content(content):
+    """Line endings and trailing whitespace don't change a prompt's meaning."""
+    lines = str(content).replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def cache_key(model, messages, **params):
+    payload = {
+        'model': model,
+        'messages': [{'role': message['role'], 'content': normalize_content(message['content'])} for message in messages],
+        'params': params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path, max_entries=10000, ttl=7 * 24 * 3600, disabled_endpoints=(), enabled=True):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disabled_endpoints = set(disabled_endpoints)
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stores = 0
+        self._counters = {}
+
+    def _connection(self):
+        # Per thread, and reopened after a fork (e.g. gunicorn --preload)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, endpoint, counter):
+        with self._lock:
+            counters = self._counters.setdefault(endpoint, {'hits': 0, 'misses': 0, 'bypassed': 0, 'errors': 0})
+            counters[counter] += 1
+
+    def get(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT content, created_at, last_used_at FROM llm_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        content, created_at, last_used_at = row
+        if now - created_at > self.ttl:
+            self._connection().execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+            return None
+        if now - last_used_at > TOUCH_INTERVAL:
+            self._connection().execute(
+                'UPDATE llm_cache SET last_used_at = ? WHERE key = ?', (now, key)
+            )
+        return content
+
+    def put(self, key, endpoint, model, content):
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO llm_cache (key, endpoint, model, content, created_at, last_used_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (key, endpoint, model, content, now, now)
+        )
+        with self._lock:
+            self._stores += 1
+            evict = self._stores % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries; returns rows removed."""
+        connection = self._connection()
+        removed = connection.execute('DELETE FROM llm_cache WHERE created_at < ?', (time.time() - self.ttl,)).rowcount
+        removed += connection.execute(
+            'DELETE FROM llm_cache WHERE key IN '
+            '(SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        ).rowcount
+        return removed
+
+    def _bypassed(self, endpoint):
+        if not self.enabled or endpoint in self.disabled_endpoints:
+            self._count(endpoint, 'bypassed')
+            return True
+        return False
+
+    def _lookup(self, endpoint, key):
+        try:
+            content = self.get(key)
+        except sqlite3.Error as e:
+            logger.warning("LLM cache read failed: %s", e)
+            self._count(endpoint, 'errors')
+            content = None
+        self._count(endpoint, 'hits' if content is not None else 'misses')
+        return content
+
+    def _store(self, endpoint, key, model, content):
+        try:
+            self.put(key, endpoint, model, content)
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write failed: %s", e)
+            self._count(endpoint, 'errors')
+
+    def completion(self, endpoint, model, messages, create, **params):
+        """Return the cached completion for this prompt, or call `create()` and cache it.
+
+        `create` returns the completion text. Cache failures are counted and
+        fall through to `create` so the cache can never take an endpoint down.
+        """
+        if self._bypassed(endpoint):
+            return create()
+        key = cache_key(model, messages, **params)
+        content = self._lookup(endpoint, key)
+        if content is None:
+            content = create()
+            self._store(endpoint, key, model, content)
+        return content
+
+    def stream_completion(self, endpoint, model, messages, create_stream, **params):
+        """Like completion(), but yields the text in chunks as `create_stream()` produces them.
+
+        A cached completion comes back as a single chunk. A streamed one is
+        only cached once the stream has run to the end.
+        """
+        if self._bypassed(endpoint):
+            yield from create_stream()
+            return
+        key = cache_key(model, messages, **params)
+        content = self._lookup(endpoint, key)
+        if content is not None:
+            yield content
+            return
+        parts = []
+        for chunk in create_stream():
+            parts.append(chunk)
+            yield chunk
+        self._store(endpoint, key, model, ''.join(parts))
+
+    async def acompletion(self, endpoint, model, messages, create, executor=None, **params):
+        """completion() for coroutines: `create()` is awaited, and the SQLite reads and writes run on `executor`."""
+        if self._bypassed(endpoint):
+            return await create()
+        loop = asyncio.get_running_loop()
+        key = cache_key(model, messages, **params)
+        content = await loop.run_in_executor(executor, self._lookup, endpoint, key)
+        if content is None:
+            content = await create()
+            await loop.run_in_executor(executor, self._store, endpoint, key, model, content)
+        return content
+
+    async def astream_completion(self, endpoint, model, messages, create_stream, executor=None, **params):
+        """stream_completion() for coroutines; `create_stream()` is an async iterator."""
+        if self._bypassed(endpoint):
+            async for chunk in create_stream():
+                yield chunk
+            return
+        loop = asyncio.get_running_loop()
+        key = cache_key(model, messages, **params)
+        content = await loop.run_in_executor(executor, self._lookup, endpoint, key)
+        if content is not None:
+            yield content
+            return
+        parts = []
+        async for chunk in create_stream():
+            parts.append(chunk)
+            yield chunk
+        await loop.run_in_executor(executor, self._store, endpoint, key, model, ''.join(parts))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM llm_cache')
+
+    def stats(self):
+        with self._lock:
+            endpoints = {endpoint: dict(counters) for endpoint, counters in self._counters.items()}
+        for counters in endpoints.values():
+            lookups = counters['hits'] + counters['misses']
+            counters['hit_rate'] = round(counters['hits'] / lookups, 3) if lookups else None
+        stats = {
+            'enabled': self.enabled,
+            'disabled_endpoints': sorted(self.disabled_endpoints),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'endpoints': endpoints,
+        }
+        if self.enabled:
+            entries, size = self._connection().execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM llm_cache'
+            ).fetchone()
+            stats.update(entries=entries, content_bytes=size)
+        return stats
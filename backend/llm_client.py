@@ -0,0 +1,335 @@
+"""Shared OpenAI client with connection reuse, bounded concurrency, retries and a circuit breaker.
+
+Every completion in the app goes through one LLMClient:
+
+- One pooled `requests.Session` is shared by all threads, so calls reuse
+  kept-alive HTTPS connections instead of handshaking per request.
+- A semaphore caps concurrent upstream calls. A caller that can't get a slot
+  within `acquire_timeout` gets LLMBusyError instead of piling up.
+- Rate limits, timeouts, connection errors and 5xx responses are retried with
+  full-jitter exponential backoff (honouring Retry-After when sent). Other
+  errors, e.g. a bad request or API key, are raised straight away.
+- After `breaker_threshold` consecutive failed attempts the circuit opens and
+  calls fail fast with CircuitOpenError for `breaker_reset` seconds. Then a
+  single trial call is let through; its outcome closes or re-opens the circuit.
+
+AsyncLLMClient applies the same policy to coroutines, over a pooled aiohttp
+session, for the async server (async_app.py).
+
+Set OPENAI_API_BASE to point the client at fake_openai.py for offline runs.
+"""
+import asyncio
+import random
+import threading
+import time
+import aiohttp
+import openai
+import requests
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.Timeout,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+)
+
+
+class LLMUnavailableError(Exception):
+    """The upstream can't serve this call right now; worth retrying later."""
+
+
+class LLMBusyError(LLMUnavailableError):
+    pass
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+def is_retryable(error):
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    # Other APIErrors are retryable when they are server-side (5xx)
+    return type(error) is openai.error.APIError and (error.http_status is None or error.http_status >= 500)
+
+
+def retry_after(error):
+    headers = getattr(error, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after') or headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, error, base, cap):
+    """Full-jitter exponential backoff, at least the upstream's Retry-After (up to `cap`)."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    hinted = retry_after(error)
+    if hinted is not None:
+        delay = max(delay, min(hinted, cap))
+    return delay
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now."""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError('LLM upstream is failing; circuit open')
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self._trial_in_flight:
+                    raise CircuitOpenError('LLM upstream is failing; waiting on a trial call')
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """The call ended without telling us anything about the upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LLMClient:
+    def __init__(self, max_concurrency=8, timeout=30, connect_timeout=5, max_retries=3,
+                 backoff_base=0.5, backoff_max=8, acquire_timeout=10,
+                 breaker_threshold=5, breaker_reset=30):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        openai.requestssession = self.session
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {'calls': 0, 'attempts': 0, 'retries': 0, 'failures': 0,
+                          'rejected_busy': 0, 'rejected_open': 0}
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _backoff(self, attempt, error):
+        return backoff_delay(attempt, error, self.backoff_base, self.backoff_max)
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self._count('rejected_busy')
+            raise LLMBusyError('Too many LLM calls in flight')
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _call(self, start):
+        """Run `start()` under the breaker with retries; returns its result."""
+        self._count('calls')
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count('rejected_open')
+                raise
+            self._count('attempts')
+            try:
+                result = start()
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered; the request itself was wrong
+                    self.breaker.release()
+                    self._count('failures')
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    self._count('failures')
+                    raise LLMUnavailableError(f'LLM call failed after {attempt + 1} attempts: {str(e)}') from e
+                self._count('retries')
+                time.sleep(self._backoff(attempt, e))
+                continue
+            self.breaker.record_success()
+            return result
+
+    def complete(self, model, messages, **params):
+        """The full chat completion response, including `usage`."""
+        self._acquire()
+        try:
+            return self._call(lambda: openai.ChatCompletion.create(
+                model=model, messages=messages,
+                request_timeout=(self.connect_timeout, self.timeout), **params
+            ))
+        finally:
+            self._release()
+
+    def chat(self, model, messages, **params):
+        """Text of a chat completion."""
+        return self.complete(model, messages, **params).choices[0].message.content
+
+    def stream(self, model, messages, **params):
+        """Yield a chat completion's text as it arrives.
+
+        Only opening the stream is retried: once text has been handed to the
+        caller, a failure is raised rather than replaying the completion.
+        """
+        self._acquire()
+        try:
+            chunks = self._call(lambda: openai.ChatCompletion.create(
+                model=model, messages=messages, stream=True,
+                request_timeout=(self.connect_timeout, self.timeout), **params
+            ))
+            try:
+                for chunk in chunks:
+                    content = chunk.choices[0].delta.get('content')
+                    if content:
+                        yield content
+            except Exception as e:
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                self._count('failures')
+                raise
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters, in_flight=self._in_flight)
+        stats.update(
+            max_concurrency=self.max_concurrency,
+            circuit=self.breaker.state,
+            circuit_opened=self.breaker.times_opened,
+            consecutive_failures=self.breaker.failures,
+        )
+        return stats
+
+
+class AsyncLLMClient:
+    """LLMClient for asyncio callers, e.g. async_app.py.
+
+    Same policy as LLMClient (an acquire timeout on a concurrency cap,
+    retries with backoff, and a circuit breaker), but a call awaits a
+    pooled aiohttp session rather than holding a thread. Waiting on the
+    upstream costs a coroutine, so max_concurrency can be in the hundreds.
+    Create and use it on one event loop.
+    """
+
+    def __init__(self, max_concurrency=256, timeout=30, connect_timeout=5, max_retries=3,
+                 backoff_base=0.5, backoff_max=8, acquire_timeout=10,
+                 breaker_threshold=5, breaker_reset=30):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.session = None
+
+    async def start(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_concurrency))
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _acquire(self):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise LLMBusyError('Too many LLM calls in flight') from None
+
+    async def _call(self, start):
+        """Await `start()` under the breaker with retries; returns its result."""
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            try:
+                # openai reads the session to use from a context variable
+                token = openai.aiosession.set(self.session)
+                try:
+                    result = await start()
+                finally:
+                    openai.aiosession.reset(token)
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise LLMUnavailableError(f'LLM call failed after {attempt + 1} attempts: {str(e)}') from e
+                await asyncio.sleep(backoff_delay(attempt, e, self.backoff_base, self.backoff_max))
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def complete(self, model, messages, **params):
+        """The full chat completion response, including `usage`."""
+        await self.start()
+        await self._acquire()
+        try:
+            return await self._call(lambda: openai.ChatCompletion.acreate(
+                model=model, messages=messages,
+                request_timeout=(self.connect_timeout, self.timeout), **params
+            ))
+        finally:
+            self._slots.release()
+
+    async def stream(self, model, messages, **params):
+        """Yield a chat completion's text as it arrives; only opening the stream is retried."""
+        await self.start()
+        await self._acquire()
+        try:
+            chunks = await self._call(lambda: openai.ChatCompletion.acreate(
+                model=model, messages=messages, stream=True,
+                request_timeout=(self.connect_timeout, self.timeout), **params
+            ))
+            try:
+                async for chunk in chunks:
+                    content = chunk.choices[0].delta.get('content')
+                    if content:
+                        yield content
+            except Exception as e:
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                raise
+        finally:
+            self._slots.release()
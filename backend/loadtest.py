@@ -0,0 +1,510 @@
+"""Drive every API route at a configurable concurrency and report latency per endpoint.
+
+    python seed_data.py --database /tmp/loadtest.db
+    python loadtest.py --database /tmp/loadtest.db --concurrency 32 --duration 60 --output results/HEAD.json
+    python loadtest.py --compare results/before.json results/after.json
+
+By default the app is started under gunicorn against `--database`, with
+OpenAI pointed at a fake_openai.py server, so LLM-backed routes cost a
+fixed `--llm-latency-ms` instead of real API calls. Pass `--url` to load an
+already running server instead (start it with OPENAI_API_BASE set to a
+fake_openai.py instance).
+
+Each of `--concurrency` virtual users logs in as a seeded user and then
+picks requests from a weighted mix (MIX) of all routes until `--duration`
+runs out. The first `--warmup` seconds are not recorded. Results hold
+throughput and p50/p95/p99 latency per endpoint plus the run's settings and
+git commit, as JSON, so two runs can be compared with `--compare`.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import requests
+
+from seed_data import LOADTEST_PASSWORD, ROLES, TOPICS, DIFFICULTIES, WORDS
+
+ANSWER = ('I would start by clarifying requirements, then sketch the main components, '
+          'discuss the data model and finish with scaling and failure modes.')
+
+
+class VirtualUser:
+    def __init__(self, base_url, rng, users, max_mcq_id, samples, recording):
+        self.base_url = base_url
+        self.rng = rng
+        self.users = users
+        self.max_mcq_id = max_mcq_id
+        self.samples = samples
+        self.recording = recording
+        self.session = requests.Session()
+        self.token = None
+
+    def request(self, name, method, path, stream=False, **kwargs):
+        """Send one request and record its latency under `name`; returns the response or None."""
+        headers = kwargs.pop('headers', {})
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=headers, timeout=60,
+                                            stream=stream, **kwargs)
+            if stream:
+                # Time to the first event, then to the end of the stream
+                lines = response.iter_lines()
+                next(lines, None)
+                self.record(f'{name} (first event)', start, response.status_code)
+                body = b'\n'.join(lines)
+                if b'event: error' in body:
+                    response.status_code = 599
+            else:
+                response.content
+        except requests.RequestException:
+            self.record(name, start, 0)
+            return None
+        self.record(name, start, response.status_code)
+        if response.status_code == 401 and 'Authorization' in headers:
+            # Revoked by a logout or password change of the same seeded user; run() logs in again
+            self.token = None
+        return response
+
+    def record(self, name, start, status):
+        if self.recording.is_set():
+            self.samples.setdefault(name, []).append(((time.perf_counter() - start) * 1000, status))
+
+    def login(self):
+        self.token = None
+        user_id = self.rng.randint(1, self.users)
+        response = self.request('POST /api/auth/login', 'POST', '/api/auth/login',
+                                json={'email': f'loadtest{user_id}@example.com', 'password': LOADTEST_PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.token = response.json()['token']
+
+    def role(self):
+        return self.rng.choice(ROLES)
+
+    def mcq_id(self):
+        return self.rng.randint(1, self.max_mcq_id)
+
+    def health(self):
+        self.request('GET /api/health', 'GET', '/api/health')
+
+    def signup(self):
+        self.request('POST /api/auth/signup', 'POST', '/api/auth/signup', json={
+            'name': 'Load Test Signup', 'email': f'signup-{uuid.uuid4().hex}@example.com', 'password': LOADTEST_PASSWORD
+        })
+
+    def current_user(self):
+        self.request('GET /api/auth/user', 'GET', '/api/auth/user')
+
+    def profile(self):
+        self.request('GET /api/user/profile', 'GET', '/api/user/profile')
+
+    def update_profile(self):
+        self.request('PUT /api/user/profile', 'PUT', '/api/user/profile', json={'name': f'Load Test {self.rng.randint(1, 10 ** 6)}'})
+
+    def logout(self):
+        response = self.request('POST /api/auth/logout', 'POST', '/api/auth/logout')
+        if response is not None and response.status_code == 200:
+            self.login()
+
+    def change_password(self):
+        # Revokes the user's tokens, this one included; carry on with the one it returns
+        response = self.request('POST /api/user/change-password', 'POST', '/api/user/change-password',
+                                json={'currentPassword': LOADTEST_PASSWORD, 'newPassword': LOADTEST_PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.token = response.json()['token']
+
+    def user_details(self):
+        self.request('GET /api/user/details', 'GET', '/api/user/details')
+
+    def dashboard_stats(self):
+        self.request('GET /api/dashboard/stats', 'GET', '/api/dashboard/stats')
+
+    def dashboard_responses(self):
+        # First page, then follow the cursor once, as scrolling the history would
+        response = self.request('GET /api/dashboard/responses', 'GET', '/api/dashboard/responses',
+                                params={'per_page': 10, 'paging': 'cursor'})
+        if response is not None and response.status_code == 200 and response.json().get('next_cursor'):
+            self.request('GET /api/dashboard/responses', 'GET', '/api/dashboard/responses',
+                         params={'per_page': 10, 'after': response.json()['next_cursor']})
+
+    def dashboard_scores(self):
+        self.request('GET /api/dashboard/scores', 'GET', '/api/dashboard/scores', params={'days': 30})
+
+    def role_scores(self):
+        self.request('GET /api/scores/roles', 'GET', '/api/scores/roles')
+
+    def leaderboard(self):
+        self.request('GET /api/leaderboard/<role>', 'GET', f'/api/leaderboard/{self.role()}',
+                     params={'window': self.rng.choice(('7d', '30d', 'all')), 'limit': 20})
+
+    def leaderboard_rank(self):
+        self.request('GET /api/leaderboard/<role>/me', 'GET', f'/api/leaderboard/{self.role()}/me',
+                     params={'window': self.rng.choice(('7d', '30d', 'all'))})
+
+    def search_responses(self):
+        self.request('GET /api/search/responses', 'GET', '/api/search/responses', params={'q': self.rng.choice(WORDS)})
+
+    def roadmap(self):
+        self.request('GET /api/roadmap/<role>', 'GET', f'/api/roadmap/{self.role()}')
+
+    def mcqs(self):
+        params = {'per_page': 10, 'page': self.rng.randint(1, 5)}
+        if self.rng.random() < 0.5:
+            params.update(topic=self.rng.choice(TOPICS), difficulty=self.rng.choice(DIFFICULTIES))
+        self.request('GET /api/mcq/<role>', 'GET', f'/api/mcq/{self.role()}', params=params)
+
+    def mcq_topics(self):
+        self.request('GET /api/mcq/<role>/topics', 'GET', f'/api/mcq/{self.role()}/topics')
+
+    def search_mcqs(self):
+        self.request('GET /api/search/mcqs', 'GET', '/api/search/mcqs', params={'q': self.rng.choice(WORDS), 'role': self.role()})
+
+    def check_mcq(self):
+        self.request('POST /api/mcq/check/<mcq_id>', 'POST', f'/api/mcq/check/{self.mcq_id()}',
+                     json={'answer': self.rng.choice('ABCD')})
+
+    def check_quiz(self):
+        answers = [{'mcq_id': self.mcq_id(), 'answer': self.rng.choice('ABCD')} for _ in range(10)]
+        self.request('POST /api/mcq/check', 'POST', '/api/mcq/check', json={'answers': answers})
+
+    def quiz(self):
+        params = {'count': 10}
+        if self.rng.random() < 0.5:
+            params['exclude_seen'] = 'true'
+        self.request('GET /api/mcq/<role>/quiz', 'GET', f'/api/mcq/{self.role()}/quiz', params=params)
+
+    def practice(self):
+        # Ask for the next practice question and answer it, which reschedules it
+        response = self.request('GET /api/practice/next', 'GET', '/api/practice/next', params={'role': self.role()})
+        if response is not None and response.status_code == 200:
+            mcq_id = response.json()['mcq']['id']
+            self.request('POST /api/mcq/check/<mcq_id>', 'POST', f'/api/mcq/check/{mcq_id}',
+                         json={'answer': self.rng.choice('ABCD')})
+
+    def practice_mastery(self):
+        self.request('GET /api/practice/mastery', 'GET', '/api/practice/mastery', params={'role': self.role()})
+
+    def generate_mcqs(self):
+        self.request('POST /api/mcq/generate', 'POST', '/api/mcq/generate', json={
+            'role': self.role(), 'topic': self.rng.choice(TOPICS), 'difficulty': self.rng.choice(DIFFICULTIES), 'count': 5
+        })
+
+    def question(self):
+        self.request('GET /api/questions', 'GET', '/api/questions',
+                     params={'role': self.role(), 'difficulty': self.rng.choice(DIFFICULTIES)})
+
+    def stream_question(self):
+        self.request('GET /api/questions/stream', 'GET', '/api/questions/stream', stream=True,
+                     params={'role': self.role(), 'difficulty': self.rng.choice(DIFFICULTIES)})
+
+    def evaluate(self):
+        # Queue the answer, then long-poll for the result as the practice page does
+        response = self.request('POST /api/evaluate', 'POST', '/api/evaluate', json={
+            'question': f'How would you design a {self.rng.choice(WORDS)} service?', 'answer': ANSWER, 'role': self.role()
+        })
+        if response is not None and response.status_code == 202:
+            job_id = response.json()['job_id']
+            self.request('GET /api/evaluate/<job_id>', 'GET', f'/api/evaluate/{job_id}', params={'wait': 30})
+
+    def stream_evaluation(self):
+        self.request('POST /api/evaluate/stream', 'POST', '/api/evaluate/stream', stream=True, json={
+            'question': f'How would you design a {self.rng.choice(WORDS)} service?', 'answer': ANSWER, 'role': self.role()
+        })
+
+    def stats(self):
+        path = self.rng.choice(('/api/questions/pool', '/api/llm/cache', '/api/llm/client'))
+        self.request(f'GET {path}', 'GET', path)
+
+    def metrics(self):
+        # A Prometheus scrape
+        self.request('GET /api/metrics', 'GET', '/api/metrics')
+
+    def run(self, deadline, mix):
+        actions = [getattr(self, name) for name in mix]
+        weights = list(mix.values())
+        self.login()
+        while time.monotonic() < deadline:
+            if self.token is None:
+                time.sleep(0.5)
+                self.login()
+                continue
+            self.rng.choices(actions, weights)[0]()
+
+
+# Relative weight of each action in the request mix: reads dominate, as in
+# real traffic, and every route appears
+MIX = {
+    'health': 1,
+    'login': 1,
+    'logout': 0.5,
+    'signup': 0.5,
+    'current_user': 3,
+    'profile': 2,
+    'update_profile': 1,
+    'change_password': 0.5,
+    'user_details': 3,
+    'dashboard_stats': 6,
+    'dashboard_responses': 5,
+    'dashboard_scores': 3,
+    'role_scores': 1,
+    'leaderboard': 2,
+    'leaderboard_rank': 2,
+    'search_responses': 2,
+    'roadmap': 3,
+    'mcqs': 8,
+    'mcq_topics': 3,
+    'search_mcqs': 3,
+    'check_mcq': 4,
+    'quiz': 2,
+    'check_quiz': 2,
+    'practice': 3,
+    'practice_mastery': 1,
+    'generate_mcqs': 0.5,
+    'question': 3,
+    'stream_question': 1,
+    'evaluate': 2,
+    'stream_evaluation': 1,
+    'stats': 0.5,
+    'metrics': 0.2,
+}
+# Actions that wait on the LLM; left out with --no-llm
+LLM_ACTIONS = {'generate_mcqs', 'question', 'stream_question', 'evaluate', 'stream_evaluation'}
+
+
+def summarize(samples, elapsed):
+    endpoints = {}
+    for name, values in sorted(samples.items()):
+        latencies = np.array([latency for latency, _ in values])
+        statuses = {}
+        for _, status in values:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        endpoints[name] = {
+            'requests': len(values),
+            'errors': sum(1 for _, status in values if status == 0 or status >= 400),
+            'statuses': statuses,
+            'throughput_rps': round(len(values) / elapsed, 2),
+            'mean_ms': round(float(latencies.mean()), 2),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(latencies.max()), 2),
+        }
+    # Stream first-event timings are a view of the same requests, not extra ones
+    counted = [stats for name, stats in endpoints.items() if not name.endswith('(first event)')]
+    total = {
+        'requests': sum(stats['requests'] for stats in counted),
+        'errors': sum(stats['errors'] for stats in counted),
+        'throughput_rps': round(sum(stats['requests'] for stats in counted) / elapsed, 2),
+    }
+    return endpoints, total
+
+
+def print_report(results):
+    print(f"{'endpoint':<48} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, stats in results['endpoints'].items():
+        print(f"{name:<48} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+              f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms")
+    total = results['total']
+    print(f"total: {total['requests']} requests, {total['errors']} errors, {total['throughput_rps']:.1f} req/s")
+
+
+def compare(before_path, after_path, threshold):
+    """Print the p50/p95/p99 change per endpoint; returns the endpoints that regressed beyond `threshold`."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    print(f"{'endpoint':<48} {'p50':>16} {'p95':>16} {'p99':>16} {'rps':>14}")
+    regressed = []
+    for name in sorted(set(before['endpoints']) | set(after['endpoints'])):
+        old, new = before['endpoints'].get(name), after['endpoints'].get(name)
+        if not old or not new:
+            print(f"{name:<48} only in {'after' if new else 'before'}")
+            continue
+        cells = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            change = (new[key] - old[key]) / old[key] if old[key] else 0.0
+            cells.append(f"{new[key]:.1f} ({change:+.0%})")
+        print(f"{name:<48} {cells[0]:>16} {cells[1]:>16} {cells[2]:>16} {cells[3]:>14}")
+        if old['p95_ms'] and (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] > threshold:
+            regressed.append(name)
+    if regressed:
+        print(f"p95 regressed by more than {threshold:.0%}: {', '.join(regressed)}")
+    return regressed
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{url} exited with status {process.returncode}')
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not come up within {timeout}s')
+
+
+def start_servers(args, workdir):
+    """Start fake_openai.py and the app under gunicorn; returns (base_url, processes)."""
+    backend = os.path.dirname(os.path.abspath(__file__))
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    llm_port, app_port = free_port(), free_port()
+    fake = subprocess.Popen([
+        sys.executable, 'fake_openai.py', '--port', str(llm_port),
+        '--latency-ms', str(args.llm_latency_ms), '--token-ms', str(args.llm_token_ms)
+    ], cwd=backend, stdout=log, stderr=subprocess.STDOUT)
+    env = dict(
+        os.environ,
+        DATABASE_URL='sqlite:///' + os.path.abspath(args.database),
+        SQLITE_PROFILE='production',
+        OPENAI_API_BASE=f'http://127.0.0.1:{llm_port}/v1',
+        OPENAI_API_KEY='fake',
+        LLM_CACHE_PATH=os.path.join(workdir, 'llm_cache.db'),
+        METRICS_DIR=os.path.join(workdir, 'metrics'),
+    )
+    app = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{app_port}',
+        '--workers', str(args.server_workers), '--worker-class', 'gthread', '--threads', str(args.server_threads),
+        '--timeout', '120', 'app:app'
+    ], cwd=backend, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{app_port}'
+    wait_until_up(f'http://127.0.0.1:{llm_port}/_stats', fake)
+    wait_until_up(base_url + '/api/health', app)
+    print(f"Serving {args.database} at {base_url} ({args.server_workers} workers x {args.server_threads} threads), "
+          f"server log in {log.name}")
+    return base_url, [app, fake]
+
+
+def dataset_size(database):
+    connection = sqlite3.connect(database)
+    try:
+        return {table: connection.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+                for table in ('users', 'responses', 'mcqs')}
+    finally:
+        connection.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    processes = []
+    dataset = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        if not os.path.exists(args.database):
+            raise SystemExit(f"{args.database} does not exist; create it with seed_data.py first")
+        dataset = dataset_size(args.database)
+        base_url, processes = start_servers(args, workdir)
+    users = min(args.users, dataset['users']) if dataset else args.users
+    max_mcq_id = dataset['mcqs'] if dataset else args.mcqs
+
+    mix = {name: weight for name, weight in MIX.items() if not (args.no_llm and name in LLM_ACTIONS)}
+    recording = threading.Event()
+    samples = [{} for _ in range(args.concurrency)]
+    start = time.monotonic()
+    deadline = start + args.warmup + args.duration
+    threads = [threading.Thread(
+        target=VirtualUser(base_url, random.Random(args.seed + i), users, max_mcq_id, samples[i], recording).run,
+        args=(deadline, mix), daemon=True
+    ) for i in range(args.concurrency)]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(args.warmup)
+        recording.set()
+        recorded_from = time.monotonic()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - recorded_from
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    merged = {}
+    for thread_samples in samples:
+        for name, values in thread_samples.items():
+            merged.setdefault(name, []).extend(values)
+    endpoints, total = summarize(merged, elapsed)
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'url': args.url,
+            'dataset': dataset,
+            'concurrency': args.concurrency,
+            'duration_s': round(elapsed, 2),
+            'warmup_s': args.warmup,
+            'server_workers': None if args.url else args.server_workers,
+            'server_threads': None if args.url else args.server_threads,
+            'llm_latency_ms': None if args.url else args.llm_latency_ms,
+            'no_llm': args.no_llm,
+        },
+        'endpoints': endpoints,
+        'total': total,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Drive every API route at a configurable concurrency and report latency per endpoint")
+    parser.add_argument('--database', default='loadtest.db', help="Seeded SQLite file to serve (see seed_data.py)")
+    parser.add_argument('--url', help="Load an already running server instead of starting one")
+    parser.add_argument('--concurrency', type=int, default=16, help="Virtual users sending requests in parallel")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds to record for")
+    parser.add_argument('--warmup', type=float, default=5, help="Seconds to run before recording")
+    parser.add_argument('--users', type=int, default=100000, help="Log in as loadtest1..N (capped by the seeded users)")
+    parser.add_argument('--mcqs', type=int, default=100000, help="Highest MCQ id to answer, with --url")
+    parser.add_argument('--no-llm', action='store_true', help="Leave the LLM-backed routes out of the mix")
+    parser.add_argument('--server-workers', type=int, default=4)
+    parser.add_argument('--server-threads', type=int, default=8)
+    parser.add_argument('--llm-latency-ms', type=int, default=300, help="Fake OpenAI latency per completion")
+    parser.add_argument('--llm-token-ms', type=int, default=10, help="Fake OpenAI delay between streamed tokens")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="Compare two results files instead of running")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="With --compare, exit non-zero if an endpoint's p95 grew by more than this fraction")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.max_regression) else 0)
+
+    results = run(args)
+    print_report(results)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,161 @@
+"""Random, stratified MCQ draws for quizzes, from an in-memory id index.
+
+Each worker process keeps the ids of every MCQ bucketed by (role, topic,
+difficulty). A quiz of K questions is built without touching the mcqs
+table:
+
+- K is split as evenly as possible over the role's topics, and each
+  topic's share evenly over its difficulties. A bucket that can't fill its
+  share hands the rest to the others.
+- Each bucket is drawn from by a lazy Fisher-Yates shuffle that only
+  records the positions it swaps, so a draw is O(1) whatever the bucket
+  size, and never repeats an id.
+- Questions the user has already seen are rejected by an `exclude`
+  callback, asked once per round for the whole batch of candidates. Rejected
+  draws are replaced in the next round, for at most `max_rounds` rounds,
+  drawing extra in proportion to the share rejected so far.
+
+So a quiz costs O(K) draws and a few K-sized lookups, not a sort of the
+bank. MCQs are only ever added, so the index is refreshed incrementally
+(rows with an id above the last one seen) at most every
+`refresh_interval` seconds, by whichever request first notices it's due.
+The worker that adds MCQs calls invalidate() to refresh on its next draw.
+"""
+import math
+import random
+import threading
+import time
+from array import array
+
+from sqlalchemy import text
+
+
+class _Draw:
+    """Draws distinct items of `ids` in random order, swapping positions lazily."""
+    __slots__ = ('ids', 'size', 'taken', 'swaps', 'picked', 'share')
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.size = len(ids)  # ids appended after the draw started are left out
+        self.taken = 0
+        self.swaps = {}
+        self.picked = 0  # draws the caller kept
+        self.share = 0  # draws the caller wants to keep
+
+    @property
+    def remaining(self):
+        return self.size - self.taken
+
+    @property
+    def capacity(self):
+        return self.picked + self.remaining
+
+    def next(self, rng):
+        i = self.taken
+        j = rng.randrange(i, self.size)
+        position = self.swaps.get(j, j)
+        self.swaps[j] = self.swaps.pop(i, i)
+        self.taken += 1
+        return self.ids[position]
+
+
+def allocate(count, capacities, rng):
+    """Split `count` over slots as evenly as `capacities` allow; leftover units go to random slots."""
+    shares = [0] * len(capacities)
+    open_slots = [i for i, capacity in enumerate(capacities) if capacity > 0]
+    while count > 0 and open_slots:
+        each, extra = divmod(count, len(open_slots))
+        lucky = set(rng.sample(open_slots, extra))
+        for i in open_slots:
+            give = min(each + (i in lucky), capacities[i] - shares[i])
+            shares[i] += give
+            count -= give
+        open_slots = [i for i in open_slots if shares[i] < capacities[i]]
+    return shares
+
+
+class MCQSampleIndex:
+    def __init__(self, connect, refresh_interval=5, max_rounds=4):
+        self.connect = connect  # callable() -> context manager yielding a SQLAlchemy connection in a transaction
+        self.refresh_interval = refresh_interval
+        self.max_rounds = max_rounds
+
+        self._buckets = {}  # role -> {(topic, difficulty): array of ids}
+        self._last_id = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._next_refresh = 0.0
+
+    def refresh(self):
+        """Load MCQs added since the last refresh, if one is due.
+
+        Only the first load makes other requests wait; later ones are skipped
+        by requests that find another thread already refreshing.
+        """
+        if time.monotonic() < self._next_refresh or not self._lock.acquire(blocking=self._last_id is None):
+            return
+        try:
+            if time.monotonic() < self._next_refresh:
+                return
+            with self.connect() as connection:
+                rows = connection.execute(text(
+                    'SELECT id, role, topic, difficulty FROM mcqs WHERE id > :after ORDER BY id'
+                ), {'after': self._last_id or 0}).all()
+            for mcq_id, role, topic, difficulty in rows:
+                bucket = self._buckets.setdefault(role, {}).get((topic, difficulty))
+                if bucket is None:
+                    bucket = self._buckets[role][(topic, difficulty)] = array('q')
+                bucket.append(mcq_id)
+                self._last_id = mcq_id
+            if self._last_id is None:
+                self._last_id = 0
+            self._next_refresh = time.monotonic() + self.refresh_interval
+        finally:
+            self._lock.release()
+
+    def sample(self, role, count, topic=None, difficulty=None, exclude=None, rng=random):
+        """Up to `count` distinct MCQ ids of `role`, spread over topics and difficulties, in random order.
+
+        `exclude` is an optional callable(list of ids) -> set of ids to leave
+        out. Fewer than `count` ids come back when the role (or the topic and
+        difficulty filters) has fewer, or when rejected draws could not all
+        be replaced within `max_rounds` rounds.
+        """
+        self.refresh()
+        by_topic = {}
+        # list() copies the items in one step, so a concurrent refresh adding a bucket can't break the loop
+        for (t, d), ids in list(self._buckets.get(role, {}).items()):
+            if (topic is None or t == topic) and (difficulty is None or d == difficulty):
+                by_topic.setdefault(t, []).append(_Draw(ids))
+
+        topics = list(by_topic.values())
+        chosen = []
+        drawn = kept = 0
+        for _ in range(self.max_rounds):
+            if len(chosen) >= count:
+                break
+            # Draw enough that, at the rejection rate seen so far, every bucket likely fills its share
+            oversample = drawn / max(kept, 1) if drawn else 1
+            candidates = []
+            # Shares are of the whole quiz, so a rejected draw is replaced from its own bucket while it lasts
+            topic_shares = allocate(count, [sum(draw.capacity for draw in draws) for draws in topics], rng)
+            for draws, topic_share in zip(topics, topic_shares):
+                shares = allocate(topic_share, [draw.capacity for draw in draws], rng)
+                for draw, share in zip(draws, shares):
+                    draw.share = share
+                    for _ in range(min(math.ceil((share - draw.picked) * oversample), draw.remaining)):
+                        candidates.append((draw, draw.next(rng)))
+            if not candidates:
+                break
+            excluded = exclude([mcq_id for _, mcq_id in candidates]) if exclude else ()
+            drawn += len(candidates)
+            for draw, mcq_id in candidates:
+                if mcq_id not in excluded:
+                    kept += 1
+                    if draw.picked < draw.share and len(chosen) < count:
+                        draw.picked += 1
+                        chosen.append(mcq_id)
+        rng.shuffle(chosen)
+        return chosen
@@ -0,0 +1,91 @@
+import hashlib
+import json
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+OPTION_KEYS = ('A', 'B', 'C', 'D')
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def normalize_text(text):
+    return ' '.join(str(text).lower().split())
+
+
+def mcq_content_hash(role, question, options):
+    """Hash of an MCQ's normalized content, used to skip duplicate questions.
+
+    Case and whitespace differences don't count; option order does, since it
+    decides which letter is correct.
+    """
+    if isinstance(options, dict):
+        options = [options[key] for key in sorted(options)]
+    parts = [normalize_text(role), normalize_text(question)] + [normalize_text(option) for option in options]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def text_value(value, field):
+    if not isinstance(value, str):
+        raise ValidationError(f'{field} must be a string')
+    return value.strip()
+
+
+def required(row, field):
+    value = row.get(field)
+    if value is None or not text_value(value, field):
+        raise ValidationError(f'missing {field}')
+    return value.strip()
+
+
+def optional(row, field):
+    value = row.get(field)
+    if value is None:
+        return None
+    return text_value(value, field) or None
+
+
+def parse_options(row):
+    """Options as {'A': ..., 'B': ...} from a dict, a list, JSON text or option_a..option_d."""
+    options = row.get('options')
+    if isinstance(options, str) and options.strip():
+        try:
+            options = json.loads(options)
+        except json.JSONDecodeError:
+            raise ValidationError('options is not valid JSON')
+    if options in (None, ''):
+        options = [row.get(f'option_{key.lower()}') for key in OPTION_KEYS]
+        options = [option for option in options if option not in (None, '')]
+    if isinstance(options, list):
+        options = dict(zip(OPTION_KEYS, options))
+    if not isinstance(options, dict) or len(options) < 2:
+        raise ValidationError('need at least two options')
+    options = {str(key).strip().upper(): text_value(value, f'option {key}') for key, value in options.items()}
+    if not set(options) <= set(OPTION_KEYS) or any(not value for value in options.values()):
+        raise ValidationError('options must be non-empty and keyed A-D')
+    return options
+
+
+def validate_mcq(row):
+    """Validate a raw MCQ record and return the column values for an `mcqs` row."""
+    if not isinstance(row, dict):
+        raise ValidationError('row is not an object')
+    role = required(row, 'role')
+    question = required(row, 'question')
+    options = parse_options(row)
+    correct_answer = required(row, 'correct_answer').upper()
+    if correct_answer not in options:
+        raise ValidationError(f'correct_answer {correct_answer!r} is not one of the options')
+    difficulty = required(row, 'difficulty').lower()
+    if difficulty not in DIFFICULTIES:
+        raise ValidationError(f'difficulty must be one of {", ".join(DIFFICULTIES)}')
+    return {
+        'role': role,
+        'topic': required(row, 'topic'),
+        'question': question,
+        'options': options,
+        'correct_answer': correct_answer,
+        'explanation': optional(row, 'explanation'),
+        'difficulty': difficulty,
+        'content_hash': mcq_content_hash(role, question, options)
+    }
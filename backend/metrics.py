@@ -0,0 +1,270 @@
+"""In-process request metrics, shared across gunicorn workers, rendered in Prometheus text format.
+
+Each process counts into plain dicts under one lock, so recording a request
+costs a few microseconds. Every `flush_interval` seconds (and at exit) it
+writes a snapshot to `<directory>/metrics-<pid>.json`. render() sums the
+snapshots of every process, using its own live values in place of its file,
+so whichever worker answers GET /api/metrics reports totals for the whole
+server, with other workers' values up to `flush_interval` seconds old.
+
+Counters and histograms of exited workers keep counting towards the totals,
+as Prometheus expects of counters. Gauges (e.g. requests in flight) only
+count for processes whose snapshot is fresh. Clear the directory when the
+server starts (gunicorn.conf.py does) so totals begin at zero.
+"""
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+_local = threading.local()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, help, labels):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self.registry.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self.registry.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help, labels, buckets):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        # Counts are per bucket here and made cumulative when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+
+class Registry:
+    def __init__(self, directory=None, flush_interval=5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self._pid = os.getpid()
+        self._thread = None
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(self, name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(self, name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self, name, help, labels, buckets))
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def start(self):
+        """Start flushing snapshots from this process; idempotent, and safe to call after a fork."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self.lock:
+            if self._pid != os.getpid():
+                # A forked worker starts from zero; its parent's counts are its parent's
+                for metric in self.metrics.values():
+                    metric.values.clear()
+                self._pid = os.getpid()
+            elif self._thread is not None:
+                return
+            if not self.directory:
+                return
+            self._thread = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Error writing metrics snapshot: %s", e)
+
+    def snapshot(self):
+        with self.lock:
+            values = {
+                name: [[list(labels), [list(value[0]), value[1]] if metric.kind == 'histogram' else value]
+                       for labels, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+        return {'pid': os.getpid(), 'updated_at': time.time(), 'values': values}
+
+    def flush(self):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def _snapshots(self):
+        yield self.snapshot()
+        if not self.directory:
+            return
+        own = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                # Replaced or removed while we read it; it'll be there next scrape
+                continue
+
+    def collect(self):
+        """{name: {labels: value}} summed over every process's snapshot."""
+        totals = {name: {} for name in self.metrics}
+        stale_before = time.time() - 3 * self.flush_interval
+        for snapshot in self._snapshots():
+            live = snapshot['updated_at'] >= stale_before
+            for name, samples in snapshot['values'].items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == 'gauge' and not live):
+                    continue
+                merged = totals[name]
+                for labels, value in samples:
+                    labels = tuple(labels)
+                    if metric.kind == 'histogram':
+                        state = merged.setdefault(labels, [[0] * len(value[0]), 0.0])
+                        state[0] = [a + b for a, b in zip(state[0], value[0])]
+                        state[1] += value[1]
+                    else:
+                        merged[labels] = merged.get(labels, 0) + value
+        return totals
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, samples in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {escape_help(metric.help)}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(samples.items()):
+                pairs = list(zip(metric.labels, labels))
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{format_labels(pairs)} {format_value(value)}')
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(metric.buckets) + ['+Inf'], counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else format_value(bound)
+                    lines.append(f'{name}_bucket{format_labels(pairs + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(pairs)} {format_value(total)}')
+                lines.append(f'{name}_count{format_labels(pairs)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (key + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for key, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+    return str(value)
+
+
+def clear_directory(directory):
+    """Remove every process's snapshot, e.g. when the server (re)starts."""
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def start_timing():
+    """Begin accumulating DB and LLM time for the request on this thread."""
+    _local.timings = {'db': 0.0, 'llm': 0.0}
+
+
+def stop_timing():
+    timings = getattr(_local, 'timings', None)
+    _local.timings = None
+    return timings
+
+
+def add_time(kind, seconds):
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[kind] += seconds
+
+
+@contextmanager
+def timed(kind):
+    """Count the block's wall time towards the current request's `kind` time."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(kind, time.perf_counter() - start)
+
+
+def install_db_timing(engine):
+    """Count time spent executing statements on `engine` as DB time of the current request."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        add_time('db', time.perf_counter() - context._metrics_start)
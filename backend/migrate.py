@@ -0,0 +1,60 @@
+"""Versioned schema migrations for the SQLite database.
+
+Migrations are the numbered `.sql` files in `migrations/` (`0001_initial.sql`,
+`0002_query_indexes.sql`, ...). The number of the last applied file is kept in
+SQLite's `PRAGMA user_version`; each pending file runs in its own transaction
+together with the version bump, so a failed migration leaves nothing behind.
+
+Add a schema change by dropping in the next numbered file; never edit a
+migration that has already shipped.
+"""
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def available_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = re.match(r'^(\d+)_.*\.sql$', filename)
+        if match:
+            migrations.append((int(match.group(1)), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+def current_version(connection):
+    return connection.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(engine):
+    """Apply pending migrations; returns the list of versions applied."""
+    raw = engine.raw_connection()
+    try:
+        connection = raw.driver_connection
+        applied = []
+        for version, path in available_migrations():
+            if version <= current_version(connection):
+                continue
+            with open(path) as f:
+                sql = f.read()
+            try:
+                # executescript commits any open transaction first, so the
+                # explicit BEGIN/COMMIT makes the file and the version bump atomic
+                connection.executescript(f'BEGIN;\n{sql}\nPRAGMA user_version = {version};\nCOMMIT;')
+            except Exception:
+                if connection.in_transaction:
+                    connection.rollback()
+                raise
+            applied.append(version)
+            logger.info("Applied migration %s", os.path.basename(path))
+        return applied
+    finally:
+        raw.close()
+
+if __name__ == '__main__':
+    from app import app, db
+
+    with app.app_context():
+        applied = migrate(db.engine)
+        print(f"Database is at version {available_migrations()[-1][0]} ({len(applied)} migration(s) applied)")
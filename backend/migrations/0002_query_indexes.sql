@@ -0,0 +1,16 @@
+-- Indexes for the hot query shapes in app.py
+
+-- Dashboard listings: filter_by(user_id).order_by(created_at desc, id desc)
+CREATE INDEX IF NOT EXISTS ix_responses_user_created ON responses (user_id, created_at);
+
+-- Listings filtered by role, and per-role counts in rebuild_user_stats.py
+CREATE INDEX IF NOT EXISTS ix_responses_user_role_created ON responses (user_id, role, created_at);
+
+-- get_mcqs filters and the distinct-topic lookup in get_mcq_topics
+CREATE INDEX IF NOT EXISTS ix_mcqs_role_topic_difficulty ON mcqs (role, topic, difficulty);
+
+CREATE INDEX IF NOT EXISTS ix_roadmaps_role ON roadmaps (role);
+
+-- Job claiming: oldest queued (or stale running) job first
+DROP INDEX IF EXISTS ix_evaluation_jobs_status;
+CREATE INDEX IF NOT EXISTS ix_evaluation_jobs_status_created ON evaluation_jobs (status, created_at);
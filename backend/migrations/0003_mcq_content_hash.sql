@@ -0,0 +1,6 @@
+-- Normalized content hash for de-duplicating imported and generated MCQs.
+-- Existing rows are hashed by bulk_import.py (NULLs don't collide in a
+-- UNIQUE index, so the index can be created before the backfill).
+ALTER TABLE mcqs ADD COLUMN content_hash TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_mcqs_content_hash ON mcqs (content_hash);
@@ -0,0 +1,28 @@
+-- Persisted quiz submissions and the individual MCQ answers in them
+
+CREATE TABLE IF NOT EXISTS quiz_submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_quiz_submissions_user_created ON quiz_submissions (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS mcq_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    mcq_id INTEGER NOT NULL,
+    submission_id INTEGER,
+    answer TEXT NOT NULL,
+    is_correct BOOLEAN NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (mcq_id) REFERENCES mcqs(id),
+    FOREIGN KEY (submission_id) REFERENCES quiz_submissions(id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_mcq_attempts_user_created ON mcq_attempts (user_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_mcq_attempts_submission ON mcq_attempts (submission_id);
@@ -0,0 +1,17 @@
+-- MinHash/LSH near-duplicate index over MCQ question + options (see near_duplicates.py)
+
+CREATE TABLE IF NOT EXISTS mcq_signatures (
+    mcq_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL,
+    FOREIGN KEY (mcq_id) REFERENCES mcqs(id)
+);
+
+CREATE TABLE IF NOT EXISTS mcq_lsh_buckets (
+    bucket INTEGER NOT NULL,
+    mcq_id INTEGER NOT NULL,
+    PRIMARY KEY (bucket, mcq_id)
+) WITHOUT ROWID;
+
+-- Set when a question was stored despite resembling an existing one
+-- (NEAR_DUPLICATE_ACTION=flag)
+ALTER TABLE mcqs ADD COLUMN near_duplicate_of INTEGER REFERENCES mcqs(id);
@@ -0,0 +1,59 @@
+-- FTS5 full-text indexes over MCQs and responses (see search.py). Both are
+-- external-content tables: the text stays in mcqs/responses and the triggers
+-- below keep the index in step with every insert, update and delete. The
+-- prefix indexes serve search-as-you-type on 3 and 4 character prefixes.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS mcqs_fts USING fts5(
+    question, explanation, topic,
+    content='mcqs', content_rowid='id', tokenize='porter unicode61', prefix='3 4'
+);
+
+CREATE TRIGGER IF NOT EXISTS mcqs_fts_insert AFTER INSERT ON mcqs BEGIN
+    INSERT INTO mcqs_fts (rowid, question, explanation, topic)
+    VALUES (new.id, new.question, new.explanation, new.topic);
+END;
+
+CREATE TRIGGER IF NOT EXISTS mcqs_fts_delete AFTER DELETE ON mcqs BEGIN
+    INSERT INTO mcqs_fts (mcqs_fts, rowid, question, explanation, topic)
+    VALUES ('delete', old.id, old.question, old.explanation, old.topic);
+END;
+
+CREATE TRIGGER IF NOT EXISTS mcqs_fts_update AFTER UPDATE OF question, explanation, topic ON mcqs BEGIN
+    INSERT INTO mcqs_fts (mcqs_fts, rowid, question, explanation, topic)
+    VALUES ('delete', old.id, old.question, old.explanation, old.topic);
+    INSERT INTO mcqs_fts (rowid, question, explanation, topic)
+    VALUES (new.id, new.question, new.explanation, new.topic);
+END;
+
+-- user_id is indexed as a token so a user's search is a posting-list
+-- intersection inside FTS5 rather than a filter over every matching row.
+-- It comes last so snippet() prefers the text columns.
+CREATE VIRTUAL TABLE IF NOT EXISTS responses_fts USING fts5(
+    question, answer, feedback, user_id,
+    content='responses', content_rowid='id', tokenize='porter unicode61', prefix='3 4'
+);
+
+CREATE TRIGGER IF NOT EXISTS responses_fts_insert AFTER INSERT ON responses BEGIN
+    INSERT INTO responses_fts (rowid, question, answer, feedback, user_id)
+    VALUES (new.id, new.question, new.answer, new.feedback, new.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS responses_fts_delete AFTER DELETE ON responses BEGIN
+    INSERT INTO responses_fts (responses_fts, rowid, question, answer, feedback, user_id)
+    VALUES ('delete', old.id, old.question, old.answer, old.feedback, old.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS responses_fts_update AFTER UPDATE OF question, answer, feedback, user_id ON responses BEGIN
+    INSERT INTO responses_fts (responses_fts, rowid, question, answer, feedback, user_id)
+    VALUES ('delete', old.id, old.question, old.answer, old.feedback, old.user_id);
+    INSERT INTO responses_fts (rowid, question, answer, feedback, user_id)
+    VALUES (new.id, new.question, new.answer, new.feedback, new.user_id);
+END;
+
+-- Default rank: bm25 weighting question > topic > explanation, and question
+-- over answer/feedback; user_id never contributes to the score
+INSERT INTO mcqs_fts (mcqs_fts, rank) VALUES ('rank', 'bm25(3.0, 1.0, 2.0)');
+INSERT INTO responses_fts (responses_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0, 1.0, 0.0)');
+
+INSERT INTO mcqs_fts (mcqs_fts) VALUES ('rebuild');
+INSERT INTO responses_fts (responses_fts) VALUES ('rebuild');
@@ -0,0 +1,14 @@
+-- Revoked access tokens (see token_revocation.py). A row with a jti revokes
+-- that one token; a row without revokes every token of user_id issued before
+-- revoked_at, e.g. after a password change. Times are Unix seconds, as in
+-- the tokens' iat/exp claims. Rows are purged once expires_at has passed.
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jti TEXT,
+    user_id INTEGER,
+    revoked_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at ON revoked_tokens (expires_at);
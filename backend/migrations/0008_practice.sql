@@ -0,0 +1,41 @@
+-- Adaptive practice (see practice.py): per-user mastery of each topic, and
+-- each answered MCQ's spaced-repetition schedule. Both are updated in the
+-- transaction that records the answer in mcq_attempts, and can be rebuilt
+-- from it with rebuild_practice.py.
+
+-- new_cursors maps difficulty -> the highest MCQ id of this topic up to
+-- which the user has answered every question, so unseen questions are
+-- found by seeking past it in ix_mcqs_role_topic_difficulty
+CREATE TABLE IF NOT EXISTS topic_mastery (
+    user_id INTEGER NOT NULL,
+    role VARCHAR(50) NOT NULL,
+    topic VARCHAR(100) NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    mastery FLOAT NOT NULL DEFAULT 0,
+    new_cursors JSON NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, role, topic),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- The (user_id, role[, topic], due_at) indexes are the priority queue of
+-- reviews: the next due one is the first entry of the user's range
+CREATE TABLE IF NOT EXISTS mcq_reviews (
+    user_id INTEGER NOT NULL,
+    mcq_id INTEGER NOT NULL,
+    role VARCHAR(50) NOT NULL,
+    topic VARCHAR(100) NOT NULL,
+    repetitions INTEGER NOT NULL DEFAULT 0,
+    interval_seconds FLOAT NOT NULL DEFAULT 0,
+    ease FLOAT NOT NULL DEFAULT 2.5,
+    lapses INTEGER NOT NULL DEFAULT 0,
+    due_at TIMESTAMP NOT NULL,
+    last_reviewed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, mcq_id),
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (mcq_id) REFERENCES mcqs(id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_mcq_reviews_user_role_due ON mcq_reviews (user_id, role, due_at);
+CREATE INDEX IF NOT EXISTS ix_mcq_reviews_user_role_topic_due ON mcq_reviews (user_id, role, topic, due_at);
@@ -0,0 +1,10 @@
+-- Scores out of 10 parsed from the grader's reply (see grading.py), so score
+-- analytics are SQL aggregates instead of re-parsing feedback text. Rows
+-- stored before this migration are scored by backfill_scores.py.
+ALTER TABLE responses ADD COLUMN score REAL;
+ALTER TABLE responses ADD COLUMN correctness_score REAL;
+ALTER TABLE responses ADD COLUMN completeness_score REAL;
+ALTER TABLE responses ADD COLUMN communication_score REAL;
+
+-- Per-role averages and score distributions
+CREATE INDEX IF NOT EXISTS ix_responses_role_score ON responses (role, score);
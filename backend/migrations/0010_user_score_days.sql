@@ -0,0 +1,16 @@
+-- Per-user score aggregates for leaderboards and percentile ranks (see
+-- leaderboard.py): scored responses and their score total per role, user
+-- and day (days since 1970-01-01, UTC). Kept up to date by the transactions
+-- that store or backfill scores; filled here from the responses scored so far.
+CREATE TABLE IF NOT EXISTS user_score_days (
+    role TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    responses INTEGER NOT NULL,
+    score_total REAL NOT NULL,
+    PRIMARY KEY (role, user_id, day)
+) WITHOUT ROWID;
+
+INSERT INTO user_score_days (role, user_id, day, responses, score_total)
+SELECT role, user_id, CAST(julianday(created_at) - julianday('1970-01-01') AS INTEGER), COUNT(*), SUM(score)
+FROM responses WHERE score IS NOT NULL AND user_id IS NOT NULL GROUP BY 1, 2, 3;
@@ -0,0 +1,5 @@
+-- Keyset pages of get_mcqs (WHERE role = ? [AND topic = ?] AND id > ? ORDER BY id)
+-- read in index order instead of sorting every matching row per page. With
+-- a difficulty too, ix_mcqs_role_topic_difficulty already ends in the rowid.
+CREATE INDEX IF NOT EXISTS ix_mcqs_role_id ON mcqs (role, id);
+CREATE INDEX IF NOT EXISTS ix_mcqs_role_topic_id ON mcqs (role, topic, id);
@@ -0,0 +1,33 @@
+-- Fill user_stats from each user's full response history, as
+-- rebuild_user_stats.py does. Without it a database that predates the
+-- rollup starts every user from zero at their next response. Rows already
+-- written since then are recomputed too, so the result is the same either way.
+INSERT OR REPLACE INTO user_stats (user_id, total_responses, role_counts, last_practice_at, recent_activity, updated_at)
+SELECT counts.user_id, counts.total_responses, counts.role_counts, recent.last_practice_at, recent.recent_activity,
+       CURRENT_TIMESTAMP
+FROM (
+    SELECT user_id, SUM(responses) AS total_responses, json_group_object(role, responses) AS role_counts
+    FROM (SELECT user_id, role, COUNT(*) AS responses FROM responses WHERE user_id IS NOT NULL GROUP BY user_id, role)
+    GROUP BY user_id
+) AS counts
+JOIN (
+    -- The newest 5 (RECENT_ACTIVITY_SIZE) per user, newest first, shaped like recent_activity_entry
+    SELECT user_id, MAX(created_at) AS last_practice_at,
+           json_group_array(json_object(
+               'id', id, 'question', question, 'role', role,
+               -- datetime.isoformat(): a T separator, and no fraction when it is zero
+               'created_at', replace(CASE WHEN substr(created_at, 20) = '.000000' THEN substr(created_at, 1, 19)
+                                          ELSE created_at END, ' ', 'T')
+           )) AS recent_activity
+    FROM (
+        -- Ordered by user, so the grouping reads rows in this order and each array is newest first
+        SELECT * FROM (
+            SELECT id, user_id, question, role, created_at,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS position
+            FROM responses WHERE user_id IS NOT NULL
+        )
+        WHERE position <= 5
+        ORDER BY user_id, position
+    )
+    GROUP BY user_id
+) AS recent ON recent.user_id = counts.user_id;
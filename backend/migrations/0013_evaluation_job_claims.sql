@@ -0,0 +1,5 @@
+-- When the current worker claimed the job. A job left 'running' past the
+-- stale timeout is claimed again; the worker that claimed it before only
+-- finishes or requeues it while claimed_at still holds its own claim, so
+-- the job isn't graded into two responses.
+ALTER TABLE evaluation_jobs ADD COLUMN claimed_at TIMESTAMP;
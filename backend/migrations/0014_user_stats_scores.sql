@@ -0,0 +1,12 @@
+-- Each user's scored responses and their score total, so the profile's
+-- average score is read from their user_stats row rather than averaged over
+-- their whole history. Filled here from user_score_days (migration 0010).
+ALTER TABLE user_stats ADD COLUMN scored_responses INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE user_stats ADD COLUMN score_total REAL NOT NULL DEFAULT 0;
+
+UPDATE user_stats SET scored_responses = totals.responses, score_total = totals.score_total
+FROM (
+    SELECT user_id, SUM(responses) AS responses, SUM(score_total) AS score_total
+    FROM user_score_days GROUP BY user_id
+) AS totals
+WHERE totals.user_id = user_stats.user_id;
@@ -0,0 +1,108 @@
+"""Report clusters of near-duplicate MCQs across the whole question bank.
+
+    python near_duplicate_report.py [--role sde] [--threshold 0.85] [--json report.json]
+
+Walks the persisted LSH buckets (see near_duplicates.py), confirms candidate
+pairs against their MinHash signatures and joins confirmed pairs into
+clusters, so the bank can be cleaned up offline. MCQs that aren't in the
+index yet (e.g. stored before it existed) are indexed first.
+"""
+import argparse
+import json
+import numpy as np
+from app import app, db, init_db, MCQ, index_unindexed_mcqs
+from near_duplicates import NUM_PERM, load_signature
+
+def find_clusters(threshold, role=None):
+    """Return near-duplicate clusters as sorted lists of MCQ ids, largest first."""
+    query = db.session.query(MCQ.id).filter(db.text('EXISTS (SELECT 1 FROM mcq_signatures WHERE mcq_signatures.mcq_id = mcqs.id)'))
+    if role:
+        query = query.filter(MCQ.role == role)
+    wanted = {mcq_id for (mcq_id,) in query}
+
+    signatures = {}
+    for mcq_id, blob in db.session.execute(db.text('SELECT mcq_id, signature FROM mcq_signatures')):
+        if mcq_id in wanted:
+            signatures[mcq_id] = load_signature(blob)
+
+    parent = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def check_bucket(ids):
+        ids = [mcq_id for mcq_id in ids if mcq_id in signatures]
+        if len(ids) < 2:
+            return
+        matrix = np.stack([signatures[mcq_id] for mcq_id in ids])
+        for i in range(len(ids) - 1):
+            scores = (matrix[i + 1:] == matrix[i]).sum(axis=1) / NUM_PERM
+            for j in np.nonzero(scores >= threshold)[0]:
+                union(ids[i], ids[i + 1 + j])
+
+    # Rows come back in primary-key order, so each bucket's members are adjacent
+    current, members = None, []
+    for bucket, mcq_id in db.session.execute(db.text('SELECT bucket, mcq_id FROM mcq_lsh_buckets ORDER BY bucket')):
+        if bucket != current:
+            check_bucket(members)
+            current, members = bucket, []
+        members.append(mcq_id)
+    check_bucket(members)
+
+    clusters = {}
+    for mcq_id in parent:
+        clusters.setdefault(find(mcq_id), set()).add(mcq_id)
+    return sorted((sorted(ids) for ids in clusters.values() if len(ids) > 1), key=lambda ids: (-len(ids), ids[0]))
+
+def report(threshold, role=None, json_path=None, limit=20):
+    init_db()
+    with app.app_context():
+        indexed = index_unindexed_mcqs()
+        db.session.commit()
+        if indexed:
+            print(f"Added {indexed} MCQs to the near-duplicate index")
+
+        clusters = find_clusters(threshold, role)
+        questions = {}
+        shown = [mcq_id for ids in (clusters if json_path else clusters[:limit]) for mcq_id in ids]
+        for start in range(0, len(shown), 500):
+            for mcq in MCQ.query.filter(MCQ.id.in_(shown[start:start + 500])):
+                questions[mcq.id] = mcq
+
+        duplicates = sum(len(ids) - 1 for ids in clusters)
+        print(f"{len(clusters)} near-duplicate clusters, {duplicates} redundant MCQs (threshold {threshold})")
+        for ids in clusters[:limit]:
+            print(f"\ncluster of {len(ids)} (keep {ids[0]}):")
+            for mcq_id in ids:
+                mcq = questions[mcq_id]
+                print(f"  {mcq.id:>8} [{mcq.role}/{mcq.topic}/{mcq.difficulty}] {mcq.question}")
+
+        if json_path:
+            with open(json_path, 'w') as f:
+                json.dump([
+                    [{'id': mcq_id, 'role': questions[mcq_id].role, 'topic': questions[mcq_id].topic,
+                      'question': questions[mcq_id].question} for mcq_id in ids]
+                    for ids in clusters
+                ], f, indent=2)
+            print(f"\nWrote {len(clusters)} clusters to {json_path}")
+        return clusters
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report clusters of near-duplicate MCQs")
+    parser.add_argument('--role', default=None, help="Only report this role")
+    parser.add_argument('--threshold', type=float, default=app.config['NEAR_DUPLICATE_THRESHOLD'],
+                        help="Estimated Jaccard similarity at which two MCQs count as duplicates")
+    parser.add_argument('--json', dest='json_path', default=None, help="Write every cluster to this file")
+    parser.add_argument('--limit', type=int, default=20, help="Clusters to print")
+    args = parser.parse_args()
+    report(args.threshold, args.role, args.json_path, args.limit)
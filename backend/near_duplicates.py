@@ -0,0 +1,144 @@
+"""MinHash/LSH index for spotting paraphrased (near-duplicate) MCQs.
+
+Each question (with its options) is reduced to character 5-gram shingles and
+summarised by a MinHash signature of NUM_PERM values; the fraction of equal
+positions in two signatures estimates the Jaccard similarity of their
+shingle sets. The signature is cut into BANDS bands and each band is hashed
+to a bucket key. Two questions that agree on any band share a bucket, which
+makes them a candidate pair; with 16 bands of 8 rows, pairs at Jaccard 0.85
+collide with probability ~0.99 and pairs at 0.5 with ~0.06.
+
+Buckets are persisted in `mcq_lsh_buckets` (bucket -> mcq_id, primary key on
+bucket first), so finding candidates is a handful of index probes no matter
+how large the bank is. Candidates are then confirmed against their stored
+signatures in `mcq_signatures`.
+"""
+import hashlib
+import re
+import struct
+import zlib
+import numpy as np
+from sqlalchemy import text
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+_PRIME = np.uint64((1 << 61) - 1)
+_QUERY_CHUNK = 500
+
+# a * h stays below 2**64 for 32-bit a and h, so the products don't wrap
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+
+def mcq_text(question, options):
+    if isinstance(options, dict):
+        options = [options[key] for key in sorted(options)]
+    return ' '.join([question] + [str(option) for option in options or ()])
+
+
+def shingles(content, size=SHINGLE_SIZE):
+    content = ' '.join(re.findall(r'\w+', content.lower()))
+    if len(content) <= size:
+        return {content}
+    return {content[i:i + size] for i in range(len(content) - size + 1)}
+
+
+def signature(content):
+    hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles(content)), dtype=np.uint64)
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def load_signature(blob):
+    return np.frombuffer(blob, dtype=np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    return np.count_nonzero(sig_a == sig_b) / NUM_PERM
+
+
+def bucket_keys(namespace, sig):
+    """One signed 64-bit key per band; `namespace` (the role) keeps roles apart."""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(
+            namespace.encode() + struct.pack('<I', band) + sig[band * ROWS:(band + 1) * ROWS].tobytes(),
+            digest_size=8
+        ).digest()
+        keys.append(struct.unpack('<q', digest)[0])
+    return keys
+
+
+def _chunks(items, size=_QUERY_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class NearDuplicateIndex:
+    def __init__(self, threshold=0.85):
+        self.threshold = threshold
+
+    def check_batch(self, session, items):
+        """Find the closest stored or earlier-in-batch match for each item.
+
+        `items` is a list of (role, question, options). Returns one entry per
+        item: None, ('mcq', mcq_id, similarity) for a stored question, or
+        ('batch', index, similarity) for an earlier item in the same batch.
+        Also returns the computed signatures so callers can `add` them later.
+        """
+        signatures = [signature(mcq_text(question, options)) for _, question, options in items]
+        keys = [bucket_keys(role, sig) for (role, _, _), sig in zip(items, signatures)]
+
+        stored_candidates = {}
+        all_keys = {key for item_keys in keys for key in item_keys}
+        for chunk in _chunks(all_keys):
+            params = {f'k{i}': key for i, key in enumerate(chunk)}
+            rows = session.execute(text(
+                f"SELECT bucket, mcq_id FROM mcq_lsh_buckets WHERE bucket IN ({', '.join(':' + name for name in params)})"
+            ), params)
+            for bucket, mcq_id in rows:
+                stored_candidates.setdefault(bucket, []).append(mcq_id)
+
+        candidate_ids = {mcq_id for ids in stored_candidates.values() for mcq_id in ids}
+        stored_signatures = {}
+        for chunk in _chunks(candidate_ids):
+            params = {f'i{i}': mcq_id for i, mcq_id in enumerate(chunk)}
+            rows = session.execute(text(
+                f"SELECT mcq_id, signature FROM mcq_signatures WHERE mcq_id IN ({', '.join(':' + name for name in params)})"
+            ), params)
+            for mcq_id, blob in rows:
+                stored_signatures[mcq_id] = load_signature(blob)
+
+        matches = []
+        batch_buckets = {}
+        for index, (sig, item_keys) in enumerate(zip(signatures, keys)):
+            best = None
+            stored_ids = list({mcq_id for key in item_keys for mcq_id in stored_candidates.get(key, ())})
+            batch_ids = list({other for key in item_keys for other in batch_buckets.get(key, ())})
+            for kind, ids, lookup in (('mcq', stored_ids, stored_signatures), ('batch', batch_ids, signatures)):
+                if not ids:
+                    continue
+                scores = (np.stack([lookup[i] for i in ids]) == sig).sum(axis=1) / NUM_PERM
+                top = int(scores.argmax())
+                if scores[top] >= self.threshold and (best is None or scores[top] > best[2]):
+                    best = (kind, ids[top], float(scores[top]))
+            matches.append(best)
+            for key in item_keys:
+                batch_buckets.setdefault(key, []).append(index)
+        return matches, signatures
+
+    def add(self, session, entries):
+        """Index stored MCQs; `entries` is a list of (mcq_id, role, signature)."""
+        if not entries:
+            return
+        session.execute(
+            text("INSERT OR REPLACE INTO mcq_signatures (mcq_id, signature) VALUES (:mcq_id, :signature)"),
+            [{'mcq_id': mcq_id, 'signature': sig.tobytes()} for mcq_id, _, sig in entries]
+        )
+        session.execute(
+            text("INSERT OR IGNORE INTO mcq_lsh_buckets (bucket, mcq_id) VALUES (:bucket, :mcq_id)"),
+            [{'bucket': key, 'mcq_id': mcq_id} for mcq_id, role, sig in entries for key in bucket_keys(role, sig)]
+        )
@@ -0,0 +1,40 @@
+import base64
+import json
+
+MAX_PER_PAGE = 100
+
+
+def wants_cursor(args):
+    """Cursor (keyset) paging is opt-in: `?paging=cursor` or any `after` token."""
+    return 'after' in args or args.get('paging') == 'cursor'
+
+
+def encode_cursor(*values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the list of key values in `token`; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def keyset_page(query, per_page, cursor_for):
+    """Fetch one page from an already filtered and ordered query.
+
+    Reads `per_page + 1` rows to learn whether another page exists, so no
+    COUNT(*) is needed. `cursor_for(row)` builds the token for the last row.
+    """
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = cursor_for(rows[-1]) if has_more else None
+    return rows, next_cursor
@@ -0,0 +1,121 @@
+"""Password hashing on a bounded process pool, with configurable parameters and upgrade on login.
+
+A pbkdf2 or scrypt hash costs a few hundred milliseconds of CPU. Run in a
+request thread, a burst of logins ties up the worker's threads and cores,
+and every other endpoint waits. PasswordHasher runs hashes on its own pool
+of `workers` processes instead:
+
+- Hash and verify calls are submitted to a ProcessPoolExecutor, and the
+  request thread waits on the result without holding the GIL.
+- At most `workers + max_queue` hashes are running or waiting per process.
+  A call beyond that raises HashingBusyError immediately, and the route
+  answers 503, rather than queueing up behind minutes of work.
+- `method` is any werkzeug method string ("pbkdf2:sha256:600000",
+  "scrypt:32768:8:1", ...). needs_rehash() tells whether a stored hash was
+  made with other parameters, so login can upgrade it while it has the
+  plaintext.
+
+The pool is created on first use in each process, so gunicorn workers each
+get their own, and with the forkserver start method its processes don't
+inherit the worker's threads or locks. As with any multiprocessing pool, a
+script that hashes must keep its own work under `if __name__ == '__main__'`,
+since the pool processes import the main module. `workers=0` hashes in the
+calling thread.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+SALT_LENGTH = 16
+
+
+class HashingBusyError(Exception):
+    """Too many hashes are already running or waiting; retry shortly."""
+
+
+def normalize_method(method):
+    """The method string werkzeug stores in hashes made with `method`, e.g. "pbkdf2" -> "pbkdf2:sha256:600000"."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2' and len(args) <= 2:
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt' and len(args) in (0, 3):
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    raise ValueError(f'Unsupported password hash method {method!r}; use pbkdf2[:<hash>[:<iterations>]] '
+                     f'or scrypt[:<n>:<r>:<p>]')
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method, salt_length=SALT_LENGTH)
+
+
+class PasswordHasher:
+    def __init__(self, method='pbkdf2:sha256:600000', workers=2, max_queue=32, timeout=10):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self.method
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _reset(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError(f'{self.workers + self.max_queue} password hashes already in progress')
+        pool = self._executor()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM-killed); start a fresh pool for this and later calls
+            self._reset(pool)
+            pool = self._executor()
+            try:
+                future = pool.submit(fn, *args)
+            except BaseException:
+                self._slots.release()
+                raise
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot stays taken until the hash is done, even if this caller stops waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise HashingBusyError(f'Password hash took longer than {self.timeout}s') from None
+        except BrokenProcessPool:
+            self._reset(pool)
+            raise HashingBusyError('Password hashing pool restarted') from None
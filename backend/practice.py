@@ -0,0 +1,64 @@
+"""Mastery scores and spaced-repetition scheduling for MCQ practice.
+
+Every answered MCQ updates two things for the user, both in O(1):
+
+- The mastery of the MCQ's topic: the running mean of correctness over the
+  first few answers, then an exponentially weighted average, so it follows
+  recent form instead of the lifetime ratio.
+- The MCQ's review schedule, after SM-2: each correct answer in a row
+  stretches the interval (1 day, 6 days, then times the ease factor), a
+  wrong answer brings the question back within minutes and lowers its ease.
+
+The next question is the most overdue review; with nothing due, a question
+the user hasn't seen from their weakest topic, at a difficulty matching
+their mastery of it. The app reads both from indexes, so the choice never
+depends on the size of the user's history.
+"""
+from datetime import timedelta
+
+DAY = 24 * 3600
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+RELEARN_INTERVAL = 10 * 60
+MAX_INTERVAL = 365 * DAY
+
+# Lowest mastery at which each difficulty is served to the user
+DIFFICULTY_THRESHOLDS = (('hard', 0.8), ('medium', 0.5), ('easy', 0.0))
+DIFFICULTIES = tuple(reversed([difficulty for difficulty, _ in DIFFICULTY_THRESHOLDS]))
+
+
+def update_mastery(mastery, attempts, correct, weight=0.3):
+    """Mastery after an answer; `attempts` counts it. Early answers weigh 1/attempts, so the first sets the score."""
+    weight = max(weight, 1 / attempts)
+    return mastery + weight * (float(correct) - mastery)
+
+
+def target_difficulty(mastery):
+    for difficulty, threshold in DIFFICULTY_THRESHOLDS:
+        if mastery is not None and mastery >= threshold:
+            return difficulty
+    return 'easy'
+
+
+def difficulty_order(mastery):
+    """Difficulties to draw new questions from: the target one first, then its neighbours outward."""
+    target = DIFFICULTIES.index(target_difficulty(mastery))
+    return sorted(DIFFICULTIES, key=lambda difficulty: (abs(DIFFICULTIES.index(difficulty) - target),
+                                                         DIFFICULTIES.index(difficulty)))
+
+
+def schedule_review(repetitions, interval, ease, correct, now):
+    """(repetitions, interval in seconds, ease, due_at) after answering a question that had that schedule."""
+    if correct:
+        repetitions += 1
+        if repetitions == 1:
+            interval = DAY
+        elif repetitions == 2:
+            interval = 6 * DAY
+        else:
+            interval = min(interval * ease, MAX_INTERVAL)
+    else:
+        repetitions = 0
+        interval = RELEARN_INTERVAL
+        ease = max(MIN_EASE, ease - 0.2)
+    return repetitions, interval, ease, now + timedelta(seconds=interval)
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionPool:
+    """Per-(role, difficulty) buffers of pre-generated interview questions.
+
+    Requests are served from the buffer; a background thread tops each buffer
+    back up to `target_size` whenever it drops below `low_water`. At most
+    `max_pools` keys are kept; a new key evicts the least recently used one.
+    """
+
+    def __init__(self, generate, target_size=5, low_water=2, max_pools=50, retry_delay=10):
+        self.generate = generate  # callable(role, difficulty) -> question text
+        self.target_size = target_size
+        self.low_water = low_water
+        self.max_pools = max_pools
+        self.retry_delay = retry_delay
+
+        self._pools = OrderedDict()  # least recently used first
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.refill_errors = 0
+        self.evictions = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._refill_loop, name='question-pool-refill', daemon=True)
+                self._thread.start()
+
+    def get(self, role, difficulty):
+        """Pop a ready question, or return None when the buffer is empty."""
+        self.start()
+        key = (role, difficulty)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                if len(self._pools) >= self.max_pools:
+                    # Bound memory and refill work without locking out keys seen later
+                    evicted, _ = self._pools.popitem(last=False)
+                    if evicted in self._pending:
+                        self._pending.remove(evicted)
+                    self.evictions += 1
+                pool = self._pools[key] = deque()
+            else:
+                self._pools.move_to_end(key)
+
+            question = pool.popleft() if pool else None
+            if question is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            if len(pool) < self.low_water:
+                self._schedule(key)
+            return question
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'pools': [{
+                    'role': role,
+                    'difficulty': difficulty,
+                    'size': len(pool)
+                } for (role, difficulty), pool in sorted(self._pools.items())],
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else None,
+                'refill_errors': self.refill_errors,
+                'evictions': self.evictions,
+                'target_size': self.target_size,
+                'low_water': self.low_water
+            }
+
+    def _schedule(self, key):
+        # Caller holds the lock
+        if key not in self._pending:
+            self._pending.append(key)
+            self._wakeup.notify()
+
+    def _refill_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+                key = self._pending.popleft()
+
+            role, difficulty = key
+            while True:
+                with self._lock:
+                    # Evicted while waiting or refilling: nothing to top up
+                    pool = self._pools.get(key)
+                    if pool is None or len(pool) >= self.target_size:
+                        break
+                try:
+                    question = self.generate(role, difficulty)
+                except Exception as e:
+                    logger.warning("Error refilling question pool for %s/%s: %s", role, difficulty, e)
+                    with self._lock:
+                        self.refill_errors += 1
+                    # Back off; the next request for this key schedules it again
+                    time.sleep(self.retry_delay)
+                    break
+                with self._lock:
+                    pool = self._pools.get(key)
+                    if pool is None:
+                        break
+                    pool.append(question)
@@ -0,0 +1,41 @@
+import argparse
+from app import app, db, init_db, MCQ, MCQAttempt, MCQReview, TopicMastery, User, record_mcq_answers
+
+def rebuild_practice(user_id):
+    """Recompute one user's topic mastery and review schedule by replaying their MCQ attempts."""
+    TopicMastery.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    MCQReview.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    attempts = db.session.query(MCQAttempt, MCQ).join(MCQ, MCQ.id == MCQAttempt.mcq_id)\
+        .filter(MCQAttempt.user_id == user_id)\
+        .order_by(MCQAttempt.created_at, MCQAttempt.id)\
+        .all()
+    for attempt, mcq in attempts:
+        record_mcq_answers(user_id, [(mcq, attempt.is_correct)], now=attempt.created_at)
+
+def rebuild_all(user_id=None, batch_size=100):
+    init_db()
+    with app.app_context():
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+
+        try:
+            for i, uid in enumerate(user_ids, 1):
+                rebuild_practice(uid)
+                if i % batch_size == 0:
+                    db.session.commit()
+                    print(f"Rebuilt practice state for {i}/{len(user_ids)} users")
+            db.session.commit()
+            print(f"Rebuilt practice state for {len(user_ids)} users")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding practice state: {str(e)}")
+            raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill topic_mastery and mcq_reviews from the mcq_attempts table")
+    parser.add_argument('--user-id', type=int, default=None, help="Only rebuild this user")
+    parser.add_argument('--batch-size', type=int, default=100, help="Users per commit")
+    args = parser.parse_args()
+    rebuild_all(args.user_id, args.batch_size)
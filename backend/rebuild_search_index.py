@@ -0,0 +1,32 @@
+import argparse
+import time
+from app import app, db, init_db
+from search import SEARCH_TABLES, rebuild_index
+
+def rebuild(tables, check=False):
+    """Rebuild (and optionally integrity-check) the FTS5 search indexes."""
+    init_db()
+    with app.app_context():
+        try:
+            for table in tables:
+                start = time.perf_counter()
+                rebuild_index(db.session, table)
+                if check:
+                    # Raises if the index disagrees with its content table
+                    db.session.execute(db.text(f"INSERT INTO {table} ({table}, rank) VALUES ('integrity-check', 1)"))
+                db.session.commit()
+                print(f"Rebuilt {table} in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding search index: {str(e)}")
+            raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the full-text search indexes from the mcqs and responses tables")
+    parser.add_argument('tables', nargs='*', help=f"Indexes to rebuild: {', '.join(SEARCH_TABLES)} (default: all)")
+    parser.add_argument('--check', action='store_true', help="Run an integrity check after rebuilding")
+    args = parser.parse_args()
+    unknown = set(args.tables) - set(SEARCH_TABLES)
+    if unknown:
+        parser.error(f"unknown index {', '.join(sorted(unknown))}; choose from {', '.join(SEARCH_TABLES)}")
+    rebuild(args.tables or SEARCH_TABLES, args.check)
@@ -0,0 +1,58 @@
+import argparse
+from sqlalchemy import func
+from app import app, db, init_db, Response, User, UserStats, RECENT_ACTIVITY_SIZE, recent_activity_entry
+from datetime import datetime
+
+def rebuild_user_stats(user_id):
+    """Recompute one user's stats row from their full response history."""
+    role_counts = dict(db.session.query(
+        Response.role,
+        func.count(Response.id)
+    ).filter_by(user_id=user_id).group_by(Response.role).all())
+    scored_responses, score_total = db.session.query(
+        func.count(Response.score),
+        func.coalesce(func.sum(Response.score), 0.0)
+    ).filter_by(user_id=user_id).one()
+
+    recent_responses = Response.query.filter_by(user_id=user_id)\
+        .order_by(Response.created_at.desc(), Response.id.desc())\
+        .limit(RECENT_ACTIVITY_SIZE)\
+        .all()
+
+    stats = db.session.get(UserStats, user_id) or UserStats(user_id=user_id)
+    stats.total_responses = sum(role_counts.values())
+    stats.role_counts = role_counts
+    stats.recent_activity = [recent_activity_entry(response) for response in recent_responses]
+    stats.last_practice_at = recent_responses[0].created_at if recent_responses else None
+    stats.scored_responses = scored_responses
+    stats.score_total = score_total
+    stats.updated_at = datetime.utcnow()
+    db.session.add(stats)
+
+def rebuild_all(user_id=None, batch_size=500):
+    init_db()
+    with app.app_context():
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+
+        try:
+            for i, uid in enumerate(user_ids, 1):
+                rebuild_user_stats(uid)
+                if i % batch_size == 0:
+                    db.session.commit()
+                    print(f"Rebuilt stats for {i}/{len(user_ids)} users")
+            db.session.commit()
+            print(f"Rebuilt stats for {len(user_ids)} users")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding user stats: {str(e)}")
+            raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the user_stats rollup from the responses table")
+    parser.add_argument('--user-id', type=int, default=None, help="Only rebuild this user")
+    parser.add_argument('--batch-size', type=int, default=500, help="Users per commit")
+    args = parser.parse_args()
+    rebuild_all(args.user_id, args.batch_size)
@@ -1,3 +1,17 @@
+-- Reference copy of the full schema. The application builds and upgrades
+-- its database from the versioned files in migrations/ (see migrate.py).
+
+DROP TABLE IF EXISTS responses_fts;
+DROP TABLE IF EXISTS mcqs_fts;
+DROP TABLE IF EXISTS mcq_lsh_buckets;
+DROP TABLE IF EXISTS mcq_signatures;
+DROP TABLE IF EXISTS mcq_reviews;
+DROP TABLE IF EXISTS topic_mastery;
+DROP TABLE IF EXISTS mcq_attempts;
+DROP TABLE IF EXISTS quiz_submissions;
+DROP TABLE IF EXISTS user_score_days;
+DROP TABLE IF EXISTS user_stats;
+DROP TABLE IF EXISTS evaluation_jobs;
 DROP TABLE IF EXISTS responses;
 DROP TABLE IF EXISTS mcqs;
 DROP TABLE IF EXISTS roadmaps;
@@ -19,6 +33,10 @@ CREATE TABLE responses (
     role TEXT NOT NULL,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     user_id INTEGER,
+    score REAL,
+    correctness_score REAL,
+    completeness_score REAL,
+    communication_score REAL,
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
@@ -41,5 +59,196 @@ CREATE TABLE mcqs (
     explanation TEXT,
     difficulty TEXT NOT NULL,
     topic TEXT NOT NULL,
-    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-); 
\ No newline at end of file
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    content_hash TEXT,
+    near_duplicate_of INTEGER REFERENCES mcqs(id)
+);
+
+CREATE TABLE evaluation_jobs (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    role TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    feedback TEXT,
+    error TEXT,
+    response_id INTEGER,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (response_id) REFERENCES responses(id)
+);
+
+CREATE INDEX ix_evaluation_jobs_status_created ON evaluation_jobs (status, created_at);
+
+CREATE TABLE user_stats (
+    user_id INTEGER PRIMARY KEY,
+    total_responses INTEGER NOT NULL DEFAULT 0,
+    role_counts JSON NOT NULL,
+    last_practice_at TIMESTAMP,
+    recent_activity JSON NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    scored_responses INTEGER NOT NULL DEFAULT 0,
+    score_total REAL NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE user_score_days (
+    role TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    responses INTEGER NOT NULL,
+    score_total REAL NOT NULL,
+    PRIMARY KEY (role, user_id, day)
+) WITHOUT ROWID;
+
+CREATE INDEX ix_responses_user_created ON responses (user_id, created_at);
+CREATE INDEX ix_responses_user_role_created ON responses (user_id, role, created_at);
+CREATE INDEX ix_responses_role_score ON responses (role, score);
+CREATE INDEX ix_mcqs_role_topic_difficulty ON mcqs (role, topic, difficulty);
+CREATE INDEX ix_mcqs_role_id ON mcqs (role, id);
+CREATE INDEX ix_mcqs_role_topic_id ON mcqs (role, topic, id);
+CREATE INDEX ix_roadmaps_role ON roadmaps (role);
+CREATE UNIQUE INDEX ix_mcqs_content_hash ON mcqs (content_hash);
+
+CREATE TABLE quiz_submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE INDEX ix_quiz_submissions_user_created ON quiz_submissions (user_id, created_at);
+
+CREATE TABLE mcq_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    mcq_id INTEGER NOT NULL,
+    submission_id INTEGER,
+    answer TEXT NOT NULL,
+    is_correct BOOLEAN NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (mcq_id) REFERENCES mcqs(id),
+    FOREIGN KEY (submission_id) REFERENCES quiz_submissions(id)
+);
+
+CREATE INDEX ix_mcq_attempts_user_created ON mcq_attempts (user_id, created_at);
+CREATE INDEX ix_mcq_attempts_submission ON mcq_attempts (submission_id);
+
+CREATE TABLE mcq_signatures (
+    mcq_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL,
+    FOREIGN KEY (mcq_id) REFERENCES mcqs(id)
+);
+
+CREATE TABLE mcq_lsh_buckets (
+    bucket INTEGER NOT NULL,
+    mcq_id INTEGER NOT NULL,
+    PRIMARY KEY (bucket, mcq_id)
+) WITHOUT ROWID;
+
+CREATE VIRTUAL TABLE mcqs_fts USING fts5(
+    question, explanation, topic,
+    content='mcqs', content_rowid='id', tokenize='porter unicode61', prefix='3 4'
+);
+
+CREATE TRIGGER mcqs_fts_insert AFTER INSERT ON mcqs BEGIN
+    INSERT INTO mcqs_fts (rowid, question, explanation, topic)
+    VALUES (new.id, new.question, new.explanation, new.topic);
+END;
+
+CREATE TRIGGER mcqs_fts_delete AFTER DELETE ON mcqs BEGIN
+    INSERT INTO mcqs_fts (mcqs_fts, rowid, question, explanation, topic)
+    VALUES ('delete', old.id, old.question, old.explanation, old.topic);
+END;
+
+CREATE TRIGGER mcqs_fts_update AFTER UPDATE OF question, explanation, topic ON mcqs BEGIN
+    INSERT INTO mcqs_fts (mcqs_fts, rowid, question, explanation, topic)
+    VALUES ('delete', old.id, old.question, old.explanation, old.topic);
+    INSERT INTO mcqs_fts (rowid, question, explanation, topic)
+    VALUES (new.id, new.question, new.explanation, new.topic);
+END;
+
+-- user_id is indexed as a token so a user's search is a posting-list
+-- intersection inside FTS5 rather than a filter over every matching row.
+-- It comes last so snippet() prefers the text columns.
+CREATE VIRTUAL TABLE responses_fts USING fts5(
+    question, answer, feedback, user_id,
+    content='responses', content_rowid='id', tokenize='porter unicode61', prefix='3 4'
+);
+
+CREATE TRIGGER responses_fts_insert AFTER INSERT ON responses BEGIN
+    INSERT INTO responses_fts (rowid, question, answer, feedback, user_id)
+    VALUES (new.id, new.question, new.answer, new.feedback, new.user_id);
+END;
+
+CREATE TRIGGER responses_fts_delete AFTER DELETE ON responses BEGIN
+    INSERT INTO responses_fts (responses_fts, rowid, question, answer, feedback, user_id)
+    VALUES ('delete', old.id, old.question, old.answer, old.feedback, old.user_id);
+END;
+
+CREATE TRIGGER responses_fts_update AFTER UPDATE OF question, answer, feedback, user_id ON responses BEGIN
+    INSERT INTO responses_fts (responses_fts, rowid, question, answer, feedback, user_id)
+    VALUES ('delete', old.id, old.question, old.answer, old.feedback, old.user_id);
+    INSERT INTO responses_fts (rowid, question, answer, feedback, user_id)
+    VALUES (new.id, new.question, new.answer, new.feedback, new.user_id);
+END;
+
+-- Default rank: bm25 weighting question > topic > explanation, and question
+-- over answer/feedback; user_id never contributes to the score
+INSERT INTO mcqs_fts (mcqs_fts, rank) VALUES ('rank', 'bm25(3.0, 1.0, 2.0)');
+INSERT INTO responses_fts (responses_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0, 1.0, 0.0)');
+
+-- Revoked access tokens (see token_revocation.py). A row with a jti revokes
+-- that one token; a row without revokes every token of user_id issued before
+-- revoked_at. Times are Unix seconds, as in the tokens' iat/exp claims
+CREATE TABLE revoked_tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jti TEXT,
+    user_id INTEGER,
+    revoked_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE INDEX ix_revoked_tokens_expires_at ON revoked_tokens (expires_at);
+
+-- Adaptive practice (see practice.py): per-user topic mastery and each
+-- answered MCQ's spaced-repetition schedule. new_cursors maps difficulty ->
+-- the MCQ id up to which the user has answered every question of the topic
+CREATE TABLE topic_mastery (
+    user_id INTEGER NOT NULL,
+    role VARCHAR(50) NOT NULL,
+    topic VARCHAR(100) NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    mastery FLOAT NOT NULL DEFAULT 0,
+    new_cursors JSON NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, role, topic),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE mcq_reviews (
+    user_id INTEGER NOT NULL,
+    mcq_id INTEGER NOT NULL,
+    role VARCHAR(50) NOT NULL,
+    topic VARCHAR(100) NOT NULL,
+    repetitions INTEGER NOT NULL DEFAULT 0,
+    interval_seconds FLOAT NOT NULL DEFAULT 0,
+    ease FLOAT NOT NULL DEFAULT 2.5,
+    lapses INTEGER NOT NULL DEFAULT 0,
+    due_at TIMESTAMP NOT NULL,
+    last_reviewed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, mcq_id),
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (mcq_id) REFERENCES mcqs(id)
+);
+
+CREATE INDEX ix_mcq_reviews_user_role_due ON mcq_reviews (user_id, role, due_at);
+CREATE INDEX ix_mcq_reviews_user_role_topic_due ON mcq_reviews (user_id, role, topic, due_at);
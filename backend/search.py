@@ -0,0 +1,127 @@
+"""Full-text search over MCQs and a user's responses with SQLite FTS5.
+
+The `mcqs_fts` and `responses_fts` indexes (migrations/0006_search.sql) are
+kept in sync by triggers, so every write path, including bulk imports, is
+covered. A user's search restricts on the indexed `user_id` column inside the
+MATCH itself, so FTS5 only ever visits that user's rows.
+
+Results are sorted either by bm25 relevance or newest first, and paged with
+a cursor on the sort key. Relevance needs each term's document count across
+the whole table, which for a common word means reading its full posting
+list, so response history (millions of rows) defaults to `recent`, which
+stays in the low milliseconds.
+"""
+import html
+import re
+from sqlalchemy import text
+from pagination import MAX_PER_PAGE, encode_cursor
+
+MAX_TERMS = 8
+# Lengths covered by the tables' prefix indexes; longer words match whole
+PREFIX_LENGTHS = (3, 4)
+SNIPPET_TOKENS = 16
+SORTS = ('relevance', 'recent')
+# Private-use sentinels mark hits in snippets until the text has been escaped
+_OPEN, _CLOSE = '\ue000', '\ue001'
+
+SEARCH_TABLES = ('mcqs_fts', 'responses_fts')
+
+
+def match_expression(query):
+    """Turn free text into a safe FTS5 expression, or None if it has no words.
+
+    Every word has to match; a short last word also matches as a prefix so
+    results keep up while the user types.
+    """
+    terms = re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    phrases = [f'"{term}"' for term in terms]
+    if len(terms[-1]) in PREFIX_LENGTHS:
+        phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def parse_after(values, sort):
+    """Typed sort key from a decoded cursor; raises ValueError if it doesn't fit `sort`."""
+    if sort == 'relevance':
+        rank, rowid = values
+        return float(rank), int(rowid)
+    (rowid,) = values
+    return (int(rowid),)
+
+
+def highlight(snippet):
+    return html.escape(snippet or '').replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+def _search(session, table, join, match, filters, params, sort, per_page, after, snippet_column=-1):
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    conditions = [f'{table} MATCH :match'] + filters
+    params = dict(params, match=match, open=_OPEN, close=_CLOSE, tokens=SNIPPET_TOKENS, limit=per_page + 1)
+    if sort == 'relevance':
+        rank = f'{table}.rank'
+        order = f'{table}.rank, {table}.rowid'
+        if after:
+            conditions.append(f'({table}.rank > :after_rank OR ({table}.rank = :after_rank AND {table}.rowid > :after_id))')
+            params.update(after_rank=after[0], after_id=after[1])
+    else:
+        rank = 'NULL'
+        order = f'{table}.rowid DESC'
+        if after:
+            conditions.append(f'{table}.rowid < :after_id')
+            params['after_id'] = after[0]
+    rows = session.execute(text(
+        f"SELECT {table}.rowid, {rank}, snippet({table}, {int(snippet_column)}, :open, :close, '…', :tokens) "
+        f"FROM {table} {join} WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT :limit"
+    ), params).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = None
+    if has_more:
+        last_rowid, last_rank, _ = rows[-1]
+        next_cursor = encode_cursor(last_rank, last_rowid) if sort == 'relevance' else encode_cursor(last_rowid)
+    return [(rowid, highlight(snippet)) for rowid, _, snippet in rows], next_cursor
+
+
+def search_mcqs(session, query, role=None, topic=None, difficulty=None, sort='relevance', per_page=10, after=None):
+    """Search the MCQ bank; returns ([(mcq_id, snippet)], next_cursor).
+
+    `after` is the parse_after() key of the previous page's last hit.
+    Returns ([], None) when the query has no searchable words.
+    """
+    match = match_expression(query)
+    if match is None:
+        return [], None
+    # Explanations give the answer away and are never shown before answering:
+    # match and quote only the question and topic
+    match = f'{{question topic}} : ({match})'
+    filters, params = [], {}
+    for column, value in (('role', role), ('topic', topic), ('difficulty', difficulty)):
+        if value:
+            filters.append(f'mcqs.{column} = :{column}')
+            params[column] = value
+    join = 'JOIN mcqs ON mcqs.id = mcqs_fts.rowid' if filters else ''
+    return _search(session, 'mcqs_fts', join, match, filters, params, sort, per_page, after, snippet_column=0)
+
+
+def search_responses(session, user_id, query, role=None, sort='recent', per_page=10, after=None):
+    """Search one user's responses; same return shape as search_mcqs."""
+    match = match_expression(query)
+    if match is None:
+        return [], None
+    match = f'user_id : "{int(user_id)}" AND {{question answer feedback}} : ({match})'
+    filters, params = [], {}
+    if role:
+        filters.append('responses.role = :role')
+        params['role'] = role
+    join = 'JOIN responses ON responses.id = responses_fts.rowid' if filters else ''
+    return _search(session, 'responses_fts', join, match, filters, params, sort, per_page, after)
+
+
+def rebuild_index(connection, table):
+    """Re-read every row of the content table into the FTS index and merge its segments."""
+    if table not in SEARCH_TABLES:
+        raise ValueError(f'Unknown search index {table!r}')
+    connection.execute(text(f"INSERT INTO {table} ({table}) VALUES ('rebuild')"))
+    connection.execute(text(f"INSERT INTO {table} ({table}) VALUES ('optimize')"))
@@ -0,0 +1,227 @@
+"""Fill a database with synthetic users, responses and MCQs at production volumes.
+
+    python seed_data.py --database /tmp/loadtest.db [--users 100000] [--responses 10000000] [--mcqs 100000]
+
+Every user is loadtest<N>@example.com with the password LOADTEST_PASSWORD.
+Responses are spread over the users and over the last `--days` days, oldest
+first, and the user_stats and user_score_days rollups are written to match
+them, so dashboard reads and leaderboards look like they would after real
+traffic. MCQs are spread across the roles, topics and difficulties, with one
+roadmap per role.
+
+Responses go in with the search index triggers dropped, and the index is
+rebuilt once at the end; per-row trigger maintenance would make a 10M row
+seed several times slower. Seeding an already seeded database adds to it.
+Only point this at a scratch database.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+LOADTEST_PASSWORD = 'loadtest-password'
+ROLES = ('software-engineer', 'product-manager', 'data-scientist')
+TOPICS = ('Algorithms', 'System Design', 'Databases', 'Networking', 'Concurrency', 'Testing',
+          'Prioritisation', 'Metrics', 'Experimentation', 'Statistics', 'Machine Learning', 'Communication')
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+WORDS = ('cache latency index queue thread process memory heap stack pointer buffer socket '
+         'request response server client token session cookie schema table query join shard '
+         'replica leader follower consensus quorum partition stream batch window watermark '
+         'trace alert budget roadmap stakeholder sprint backlog epic feature retention churn '
+         'funnel cohort experiment variant hypothesis regression gradient tensor embedding '
+         'outlier sample variance kernel mutex semaphore deadlock scheduler compiler parser '
+         'closure iterator generator trie bloom sketch bitmap encoder decoder pipeline').split()
+FILLER = 'the a of to and in is that it for with as on be this by we would should could'.split()
+# About one word in three is a content word, the rest filler
+VOCABULARY = WORDS + FILLER
+CUM_WEIGHTS = list(itertools.accumulate([0.3 / len(WORDS)] * len(WORDS) + [0.7 / len(FILLER)] * len(FILLER)))
+
+def sentence(rng, words):
+    return ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=words))
+
+def next_id(table):
+    return db.session.execute(db.text(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}')).scalar()
+
+def seed_users(count, batch_size):
+    # One hash for everyone: hashing 100k passwords would dominate the run
+    password = generate_password_hash(LOADTEST_PASSWORD, method=app.config['PASSWORD_HASH_METHOD'])
+    first = next_id('users')
+    for offset in range(0, count, batch_size):
+        db.session.execute(db.text(
+            'INSERT INTO users (id, name, email, password, created_at) VALUES (:id, :name, :email, :password, :created_at)'
+        ), [{
+            'id': user_id,
+            'name': f'Load Test {user_id}',
+            'email': f'loadtest{user_id}@example.com',
+            'password': password,
+            'created_at': datetime.utcnow(),
+        } for user_id in range(first + offset, first + min(offset + batch_size, count))])
+        db.session.commit()
+    return list(range(first, first + count))
+
+def seed_responses(rng, user_ids, count, days, batch_size):
+    """Insert `count` responses oldest first, then reindex them and write user_stats and user_score_days to match."""
+    triggers = db.session.execute(db.text(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'responses'"
+    )).all()
+    for name, _ in triggers:
+        db.session.execute(db.text(f'DROP TRIGGER {name}'))
+    db.session.commit()
+    try:
+        insert_responses(rng, user_ids, count, days, batch_size)
+    finally:
+        for _, sql in triggers:
+            db.session.execute(db.text(sql))
+        db.session.commit()
+    rebuild_index(db.session, 'responses_fts')
+    rebuild_score_days(db.session)
+    db.session.commit()
+
+def insert_responses(rng, user_ids, count, days, batch_size):
+    first = next_id('responses')
+    start = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    role_counts = {}
+    recent = {}
+    scores = {}
+    for offset in range(0, count, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, count)):
+            user_id = rng.choice(user_ids)
+            role = rng.choice(ROLES)
+            score = rng.randint(3, 10)
+            row = {
+                'id': first + i,
+                'question': sentence(rng, 12) + '?',
+                'answer': sentence(rng, 40),
+                'feedback': f'{sentence(rng, 20)}. Score: {score}/10',
+                'score': score,
+                'role': role,
+                'created_at': start + step * i,
+                'user_id': user_id,
+            }
+            rows.append(row)
+            counts = role_counts.setdefault(user_id, {})
+            counts[role] = counts.get(role, 0) + 1
+            scores[user_id] = scores.get(user_id, 0) + score
+            recent.setdefault(user_id, deque(maxlen=RECENT_ACTIVITY_SIZE)).appendleft(row)
+        db.session.execute(db.text(
+            'INSERT INTO responses (id, question, answer, feedback, role, created_at, user_id, score) '
+            'VALUES (:id, :question, :answer, :feedback, :role, :created_at, :user_id, :score)'
+        ), rows)
+        db.session.commit()
+        done = offset + len(rows)
+        if done % (batch_size * 25) == 0:
+            print(f"  {done}/{count} responses")
+
+    # Seeded responses all belong to freshly seeded users, so these rows are complete
+    now = datetime.utcnow()
+    stats = [{
+        'user_id': user_id,
+        'total_responses': sum(counts.values()),
+        'role_counts': json.dumps(counts),
+        'last_practice_at': recent[user_id][0]['created_at'],
+        'recent_activity': json.dumps([{
+            'id': row['id'],
+            'question': row['question'],
+            'role': row['role'],
+            'created_at': row['created_at'].isoformat(),
+        } for row in recent[user_id]]),
+        'updated_at': now,
+        # Every seeded response is scored
+        'scored_responses': sum(counts.values()),
+        'score_total': scores[user_id],
+    } for user_id, counts in role_counts.items()]
+    for offset in range(0, len(stats), batch_size):
+        db.session.execute(db.text(
+            'INSERT OR REPLACE INTO user_stats (user_id, total_responses, role_counts, last_practice_at, recent_activity, '
+            'updated_at, scored_responses, score_total) '
+            'VALUES (:user_id, :total_responses, :role_counts, :last_practice_at, :recent_activity, :updated_at, '
+            ':scored_responses, :score_total)'
+        ), stats[offset:offset + batch_size])
+        db.session.commit()
+
+def seed_mcqs(rng, count, batch_size):
+    inserted = 0
+    while inserted < count:
+        rows = []
+        for _ in range(min(batch_size, count - inserted)):
+            topic = rng.choice(TOPICS)
+            n = rng.getrandbits(40)
+            row = validate_mcq({
+                'role': rng.choice(ROLES),
+                'topic': topic,
+                'difficulty': rng.choice(DIFFICULTIES),
+                'question': f'{sentence(rng, 10)} in {topic.lower()} ({n})?',
+                'options': [sentence(rng, 5) for _ in range(4)],
+                'correct_answer': rng.choice('ABCD'),
+                'explanation': sentence(rng, 15),
+            })
+            rows.append(dict(row, options=json.dumps(row['options']), created_at=datetime.utcnow()))
+        result = db.session.execute(db.text(
+            'INSERT OR IGNORE INTO mcqs (role, topic, difficulty, question, options, correct_answer, explanation, content_hash, created_at) '
+            'VALUES (:role, :topic, :difficulty, :question, :options, :correct_answer, :explanation, :content_hash, :created_at)'
+        ), rows)
+        db.session.commit()
+        inserted += result.rowcount
+
+def seed_roadmaps():
+    existing = {role for (role,) in db.session.query(Roadmap.role)}
+    for role in ROLES:
+        if role not in existing:
+            db.session.add(Roadmap(
+                role=role,
+                title=f"{role.replace('-', ' ').title()} Roadmap",
+                description=f"Synthetic roadmap for {role}",
+                topics={topic.lower().replace(' ', '_'): {'title': topic, 'items': [f'{topic} basics', f'Advanced {topic}']}
+                        for topic in TOPICS},
+                resources=[{'title': 'Reading list', 'url': 'https://example.com/reading'}]
+            ))
+    db.session.commit()
+
+def seed(users, responses, mcqs, days=365, near_duplicate_index=False, batch_size=20000, seed=7):
+    rng = random.Random(seed)
+    init_db()
+    with app.app_context():
+        step = time.perf_counter()
+        seed_roadmaps()
+        user_ids = seed_users(users, batch_size)
+        print(f"Seeded {users} users in {time.perf_counter() - step:.1f}s")
+
+        step = time.perf_counter()
+        seed_mcqs(rng, mcqs, batch_size)
+        if near_duplicate_index:
+            index_unindexed_mcqs()
+        print(f"Seeded {mcqs} MCQs in {time.perf_counter() - step:.1f}s")
+
+        step = time.perf_counter()
+        if user_ids and responses:
+            seed_responses(rng, user_ids, responses, days, batch_size)
+        elapsed = time.perf_counter() - step
+        print(f"Seeded {responses} responses in {elapsed:.1f}s ({responses / max(elapsed, 1e-9):.0f} rows/s)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fill a database with synthetic users, responses and MCQs")
+    parser.add_argument('--database', required=True, help="SQLite file to create or extend")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--responses', type=int, default=10000000)
+    parser.add_argument('--mcqs', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help="Spread responses over this many days")
+    parser.add_argument('--near-duplicate-index', action='store_true',
+                        help="Add the MCQs to the near-duplicate index now rather than at the next init_db (slow at 100k+)")
+    parser.add_argument('--batch-size', type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(args.database)
+    os.environ.setdefault('SQLITE_PROFILE', 'production')
+    from werkzeug.security import generate_password_hash
+    from app import app, db, init_db, Roadmap, RECENT_ACTIVITY_SIZE, index_unindexed_mcqs
+    from mcq_validation import validate_mcq
+    from search import rebuild_index
+    from leaderboard import rebuild_score_days
+    seed(args.users, args.responses, args.mcqs, args.days, args.near_duplicate_index, args.batch_size)
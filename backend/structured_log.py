@@ -0,0 +1,170 @@
+"""JSON logging through a background thread, with redaction and per-route request sampling.
+
+configure_logging() routes the root logger through a bounded in-memory queue
+to a listener thread that formats each record as one JSON line on stdout.
+A request thread only builds the LogRecord and enqueues it. Serialization
+and the write happen on the listener. If the queue is full, records are
+dropped and counted rather than blocking the request. Below the configured
+level, `logger.debug(...)` returns before a record is even built.
+
+Fields passed with `extra=` become top-level JSON keys. Values under
+sensitive keys (passwords, tokens, Authorization headers) are replaced with
+"[REDACTED]", and anything that looks like a JWT or bearer token is masked
+wherever it appears.
+
+RequestSampler decides which requests get an access log line. Successful
+requests are logged at a per-route rate; errors and slow requests always are.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+
+REDACTED = '[REDACTED]'
+SENSITIVE_KEYS = {'password', 'currentpassword', 'newpassword', 'token', 'access_token', 'refresh_token',
+                  'authorization', 'cookie', 'set-cookie', 'api_key', 'secret', 'jwt'}
+TOKEN_PATTERN = re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]+|(?i:bearer)\s+[\w.~+/=-]+')
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def redact(value, key=None):
+    if key is not None and str(key).lower() in SENSITIVE_KEYS:
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return TOKEN_PATTERN.sub(REDACTED, value)
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = redact(value, key)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = redact(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """Hands records to a listener thread; drops them if the queue is full.
+
+    The listener is (re)started in whichever process emits, so a gunicorn
+    worker forked from a preloaded app gets its own.
+    """
+
+    def __init__(self, target, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = target
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        self.queue = queue.Queue(self.queue_size)
+        self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Merge args and render the traceback now, while they are still valid,
+        # but leave the JSON formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self):
+        """Flush queued records; called at exit."""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+
+
+_handler = None
+
+
+def configure_logging(level='INFO', queue_size=10000, stream=None):
+    """Send all logging as JSON lines to `stream` (stdout) via a background thread; idempotent."""
+    global _handler
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _handler is not None:
+        return _handler
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(JSONFormatter())
+    _handler = QueueLogHandler(target, queue_size)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    atexit.register(_handler.stop)
+    return _handler
+
+
+def parse_sample_rates(text):
+    """"/api/health=0,/api/mcq/<role>=0.1" -> {'/api/health': 0.0, '/api/mcq/<role>': 0.1}"""
+    rates = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        route, _, rate = item.rpartition('=')
+        rate = float(rate)
+        if not route.strip() or not 0 <= rate <= 1:
+            raise ValueError(f'Invalid sample rate {item.strip()!r}; expected <route>=<0..1>')
+        rates[route.strip()] = rate
+    return rates
+
+
+class RequestSampler:
+    def __init__(self, default_rate=1.0, rates=None, slow_ms=1000):
+        self.default_rate = default_rate
+        self.rates = dict(rates or {})
+        self.slow_ms = slow_ms
+
+    def should_log(self, route, status, duration_ms):
+        if status >= 400 or duration_ms >= self.slow_ms:
+            return True
+        rate = self.rates.get(route, self.default_rate)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
@@ -0,0 +1,167 @@
+"""Revoked JWTs: persisted in the database, checked in memory on every authenticated request.
+
+Logout revokes one token by its `jti`; a password change revokes every
+token of the user issued before that moment. Both are rows in
+`revoked_tokens` carrying the latest expiry of the tokens they cover, so
+they can be deleted once those tokens would be rejected as expired anyway.
+
+Each worker process mirrors the live rows in memory:
+
+- A Bloom filter over the revoked keys answers "certainly not revoked" for
+  almost every request with a few hash probes and no lookup in a large
+  structure. Only on a (possibly false) positive is the exact dict
+  consulted.
+- The mirror is refreshed from the table incrementally (rows with an id
+  above the last one seen) at most every `refresh_interval` seconds, by
+  whichever request first notices it's due, so a revocation made by one
+  worker reaches the others within that interval. The worker that made it
+  refreshes straight away.
+- Every `purge_interval` seconds expired rows are deleted from the table,
+  dropped from the dict, and the Bloom filter is rebuilt from what's left.
+"""
+import logging
+import math
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    @staticmethod
+    def _hashes(key):
+        # Double hashing: k positions from the two 32-bit halves of the str's
+        # SipHash. It is salted per process, which is fine for a filter that
+        # never leaves the process, and much cheaper than a hashlib digest
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        return h & 0xFFFFFFFF, (h >> 32) | 1
+
+    def add(self, key):
+        h1, h2 = self._hashes(key)
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % self.size
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        # Most keys were never added, and miss on the first probe or two
+        h1, h2 = self._hashes(key)
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+
+class RevocationStore:
+    def __init__(self, connect, refresh_interval=2, purge_interval=3600, capacity=10000, error_rate=0.001):
+        self.connect = connect  # callable() -> context manager yielding a SQLAlchemy connection in a transaction
+        self.refresh_interval = refresh_interval
+        self.purge_interval = purge_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        self._entries = {}  # key -> (revoked_at, expires_at); key is a jti or user_key(user_id)
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_id = None
+        self._next_refresh = 0.0
+        self._next_purge = time.monotonic() + purge_interval
+        self._lock = threading.Lock()
+
+    def revoke_token(self, session, jti, user_id, expires_at):
+        """Add a row revoking one token; visible once `session` commits and refresh() runs."""
+        session.execute(text(
+            'INSERT INTO revoked_tokens (jti, user_id, revoked_at, expires_at) VALUES (:jti, :user_id, :now, :expires_at)'
+        ), {'jti': jti, 'user_id': user_id, 'now': time.time(), 'expires_at': expires_at})
+
+    def revoke_user(self, session, user_id, expires_at):
+        """Add a row revoking every token of `user_id` issued before now (whole seconds, like `iat`)."""
+        session.execute(text(
+            'INSERT INTO revoked_tokens (jti, user_id, revoked_at, expires_at) VALUES (NULL, :user_id, :now, :expires_at)'
+        ), {'user_id': user_id, 'now': int(time.time()), 'expires_at': expires_at})
+
+    def is_revoked(self, payload):
+        if time.monotonic() >= self._next_refresh:
+            self.refresh(wait=self._last_id is None)
+        if not self._entries:
+            return False
+        jti = payload.get('jti')
+        if jti is not None and jti in self._bloom and jti in self._entries:
+            return True
+        key = user_key(payload.get('sub'))
+        if key in self._bloom:
+            entry = self._entries.get(key)
+            return entry is not None and payload.get('iat', 0) < entry[0]
+        return False
+
+    def refresh(self, wait=True):
+        """Load rows added since the last refresh, and purge when due.
+
+        With wait=False, return straight away if another thread is already
+        refreshing. The first refresh (full load) always waits, and until it
+        succeeds every check retries it.
+        """
+        if not self._lock.acquire(blocking=wait):
+            return
+        try:
+            self._refresh()
+        except SQLAlchemyError:
+            if self._last_id is None:
+                raise
+            # Keep answering from the mirror we have; try again next interval
+            logger.warning("Error refreshing token revocations", exc_info=True)
+        finally:
+            if self._last_id is not None:
+                self._next_refresh = time.monotonic() + self.refresh_interval
+            self._lock.release()
+
+    def _refresh(self):
+        now = time.time()
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self.purge_interval
+            self._purge(now)
+        with self.connect() as connection:
+            rows = connection.execute(text(
+                'SELECT id, jti, user_id, revoked_at, expires_at FROM revoked_tokens '
+                'WHERE id > :after AND expires_at > :now ORDER BY id'
+            ), {'after': self._last_id or 0, 'now': now}).all()
+        for row_id, jti, user_id, revoked_at, expires_at in rows:
+            key = jti if jti is not None else user_key(user_id)
+            previous = self._entries.get(key)
+            if previous is not None:
+                revoked_at, expires_at = max(revoked_at, previous[0]), max(expires_at, previous[1])
+            self._entries[key] = (revoked_at, expires_at)
+            self._bloom.add(key)
+            self._last_id = row_id
+        if self._last_id is None:
+            self._last_id = 0
+        if len(self._entries) > self._bloom.capacity:
+            self._rebuild_bloom()
+
+    def _purge(self, now):
+        with self.connect() as connection:
+            deleted = connection.execute(text('DELETE FROM revoked_tokens WHERE expires_at <= :now'), {'now': now}).rowcount
+        self._entries = {key: entry for key, entry in self._entries.items() if entry[1] > now}
+        self._rebuild_bloom()
+        if deleted:
+            logger.info("Purged expired token revocations", extra={'deleted': deleted, 'live': len(self._entries)})
+
+    def _rebuild_bloom(self):
+        # Grow ahead of the live set so inserts don't push the error rate up
+        bloom = BloomFilter(max(self.capacity, 2 * len(self._entries)), self.error_rate)
+        for key in self._entries:
+            bloom.add(key)
+        self._bloom = bloom
@@ -0,0 +1,57 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """A fixed number of daemon threads draining a durable job queue.
+
+    `run_next` claims and processes a single job, returning True if it found
+    one. Workers sleep when the queue is empty and are woken either by
+    `notify()` (a job was enqueued in this process) or by the poll interval
+    (a job was enqueued by another process, or a stale job became claimable).
+    """
+
+    def __init__(self, run_next, num_workers=4, poll_interval=2.0, name='worker'):
+        self.run_next = run_next
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.name = name
+
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._finished = threading.Condition()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._loop, name=f'{self.name}-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        self._wakeup.set()
+
+    def job_finished(self):
+        with self._finished:
+            self._finished.notify_all()
+
+    def wait_for_finish(self, timeout):
+        """Block until any job finishes in this process or `timeout` expires."""
+        with self._finished:
+            self._finished.wait(timeout)
+
+    def _loop(self):
+        while True:
+            try:
+                found = self.run_next()
+            except Exception as e:
+                logger.exception("Error in %s worker", self.name)
+                found = False
+            if not found:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
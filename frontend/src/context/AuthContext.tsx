@@ -63,6 +63,14 @@ export function AuthProvider({ children }: { children: ReactNode }) {
   };
 
   const logout = () => {
+    const token = localStorage.getItem('token');
+    if (token) {
+      // Revoke the token server-side too; signing out locally doesn't wait on it
+      fetch('http://localhost:5000/api/auth/logout', {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}` }
+      }).catch((error) => console.error('Logout error:', error));
+    }
     localStorage.removeItem('token');
     setUser(null);
   };
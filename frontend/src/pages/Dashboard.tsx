@@ -238,7 +238,7 @@ const Dashboard: React.FC = () => {
 
     try {
       const token = localStorage.getItem('token');
-      await axios.post('http://localhost:5000/api/user/change-password',
+      const response = await axios.post('http://localhost:5000/api/user/change-password',
         {
           currentPassword: passwordData.currentPassword,
           newPassword: passwordData.newPassword
@@ -250,6 +250,8 @@ const Dashboard: React.FC = () => {
           }
         }
       );
+      // Changing the password revokes every earlier token, this one included
+      localStorage.setItem('token', response.data.token);
       setShowPasswordForm(false);
       setPasswordData({ currentPassword: '', newPassword: '', confirmPassword: '' });
       setUpdateMessage({ type: 'success', text: 'Password updated successfully' });
@@ -59,8 +59,8 @@ const MCQPractice: React.FC<{ role: string }> = ({ role }) => {
         topic: selectedTopic === 'all' ? undefined : selectedTopic,
         difficulty: selectedDifficulty === 'all' ? undefined : selectedDifficulty
       });
-      if (response.data.question) {
-        setMcqs(prev => [...prev, response.data]);
+      if (response.data.mcqs?.length) {
+        setMcqs(prev => [...prev, ...response.data.mcqs]);
       }
     } catch (err) {
       setError('Failed to generate new question');
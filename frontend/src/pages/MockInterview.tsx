@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
@@ -9,6 +9,10 @@ interface Question {
   role: string;
 }
 
+// Give up on an evaluation after this long, or this many long-polls
+const EVALUATION_TIMEOUT_MS = 3 * 60 * 1000;
+const MAX_POLL_ATTEMPTS = 10;
+
 interface Feedback {
   feedback: string;
   score?: number;
@@ -22,11 +26,14 @@ const MockInterview = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [isRecording, setIsRecording] = useState(false);
+  const pollController = useRef<AbortController | null>(null);
 
   const selectedRole = sessionStorage.getItem('selectedRole') || 'sde';
 
   useEffect(() => {
     fetchNextQuestion();
+    // Stop polling for an evaluation once the page is left
+    return () => pollController.current?.abort();
   }, []);
 
   const fetchNextQuestion = async () => {
@@ -60,14 +67,38 @@ const MockInterview = () => {
         }
       };
 
+      const controller = new AbortController();
+      pollController.current?.abort();
+      pollController.current = controller;
+
       const response = await axios.post('http://localhost:5000/api/evaluate', {
         question: currentQuestion?.question,
         answer,
         role: selectedRole,
-      }, config);
+      }, { ...config, signal: controller.signal });
 
-      setFeedback(response.data);
+      let job = response.data;
+      // Evaluation runs in the background; long-poll until it finishes or the deadline passes
+      const deadline = Date.now() + EVALUATION_TIMEOUT_MS;
+      let attempts = 0;
+      while (job.status === 'queued' || job.status === 'running') {
+        const remaining = deadline - Date.now();
+        if (remaining <= 0 || attempts >= MAX_POLL_ATTEMPTS) {
+          controller.abort();
+          setError('Evaluation is taking too long. Please try again later.');
+          return;
+        }
+        attempts += 1;
+        const wait = Math.max(1, Math.min(25, Math.floor(remaining / 1000)));
+        const poll = await axios.get(`http://localhost:5000/api/evaluate/${job.job_id}?wait=${wait}`,
+                                     { ...config, signal: controller.signal });
+        job = poll.data;
+      }
+      if (job.status === 'failed') throw new Error(job.error);
+      setFeedback(job);
     } catch (err) {
+      // Unmounted, or replaced by a newer submission: nothing left to update
+      if (axios.isCancel(err)) return;
       setError('Failed to evaluate answer. Please try again.');
     } finally {
       setIsLoading(false);
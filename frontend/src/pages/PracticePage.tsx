@@ -14,6 +14,13 @@ interface Feedback {
   score?: number;
 }
 
+// The grader's reply ends in a JSON score line (maybe in a ```json fence) that
+// the done event strips; hold back a tail that may be its start so it never
+// flashes on screen. Mirrors _TRAILING_JSON in backend/grading.py.
+const PARTIAL_SCORE_LINE = /(^|\n)[ \t]*(```(json)?\s*)?(\{[^{}]*\}?\s*(```)?)?$/i;
+
+const withoutScoreLine = (text: string) => text.replace(PARTIAL_SCORE_LINE, '$1');
+
 const PracticePage = () => {
   const { role } = useParams<{ role: string }>();
   const navigate = useNavigate();
@@ -44,7 +51,7 @@ const PracticePage = () => {
     try {
       setIsLoading(true);
       const token = localStorage.getItem('token');
-      const response = await fetch('http://localhost:5000/api/evaluate', {
+      const response = await fetch('http://localhost:5000/api/evaluate/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -57,9 +64,27 @@ const PracticePage = () => {
         }),
       });
 
-      if (!response.ok) throw new Error('Failed to submit answer');
-      const data = await response.json();
-      setFeedback(data);
+      if (!response.ok || !response.body) throw new Error('Failed to submit answer');
+      // Feedback arrives as Server-Sent Events; show it as it is written
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let text = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop() ?? '';
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? '{}');
+          if (event === 'error') throw new Error(data.error);
+          text = event === 'done' ? data.feedback : text + data.content;
+          setFeedback({ feedback: event === 'done' ? text : withoutScoreLine(text) });
+          setIsLoading(false);
+        }
+      }
     } catch (err) {
       setError('Failed to submit answer. Please try again.');
     } finally {